@@ -0,0 +1,83 @@
+"""
+fogbox_frame_range
+
+stand-in benchmark for the cost of the fogbox FrameHold 'first_frame' expressions as the card count grows.
+runs without nuke: the upstream tree is modelled as a chain of nodes and each card evaluation either
+walks to the top node four times (as [topnode this.parent.input] did) or reads the two range knobs
+cached on the group by fogbox.refresh_input_range.
+
+usage: python benchmarks/fogbox_frame_range.py [upstream_depth]
+"""
+
+import sys
+import time
+
+CARD_COUNTS = (10, 100, 1000, 5000)
+
+
+class StandInNode(object):
+
+    def __init__(self, upstream=None, first=1001, last=1100):
+        self.upstream = upstream
+        self.knobs = {'first': first, 'last': last}
+
+    def input(self, idx):
+        return self.upstream
+
+    def knob(self, name):
+        return self.knobs.get(name)
+
+
+def build_chain(depth):
+    node = StandInNode()
+    for _ in range(depth):
+        node = StandInNode(node)
+    return node
+
+
+def topnode(node):
+    while node.input(0) is not None:
+        node = node.input(0)
+    return node
+
+
+def eval_topnode_expression(group_input, seed):
+    # seq_input is off, so the fmod branch with its four topnode lookups is the one evaluated
+    first = topnode(group_input).knob('first')
+    span = topnode(group_input).knob('last') - topnode(group_input).knob('first')
+    return first + (abs(seed) + topnode(group_input).knob('last') - first) % span
+
+
+def eval_cached_expression(group, seed):
+    first = group.knob('input_first')
+    span = group.knob('input_last') - first
+    return first + (abs(seed) + group.knob('input_last') - first) % span
+
+
+def run(depth=20):
+    group_input = build_chain(depth)
+    group = StandInNode()
+    group.knobs['input_first'] = topnode(group_input).knob('first')
+    group.knobs['input_last'] = topnode(group_input).knob('last')
+
+    print('upstream depth: {}'.format(depth))
+    print('{:>8} {:>14} {:>14} {:>8}'.format('cards', 'topnode (ms)', 'cached (ms)', 'ratio'))
+
+    for count in CARD_COUNTS:
+        seeds = [1000 + i for i in range(count)]
+
+        start = time.time()
+        for seed in seeds:
+            eval_topnode_expression(group_input, seed)
+        walked = (time.time() - start) * 1000.0
+
+        start = time.time()
+        for seed in seeds:
+            eval_cached_expression(group, seed)
+        cached = (time.time() - start) * 1000.0
+
+        print('{:>8} {:>14.3f} {:>14.3f} {:>8.1f}'.format(count, walked, cached, walked / max(cached, 1e-9)))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,1426 @@
+"""
+nuke stand-in
+
+in-memory stand-in for the part of the nuke API the Isotope tools use, so they can be benchmarked without
+a licence: nodes and group contexts, knobs with per-channel values, animation curves and expressions,
+connections, selection, the current frame, nodeCopy/nodePaste through utils.nk_script, and no-op undo,
+progress and dialogs.
+
+expressions are stored but only plain knob references (Camera1.world_matrix) are evaluated, anything else
+evaluates to the knob's animation or static value. world_matrix follows the node's translate (or matrix,
+with useMatrix) and its parent input. gizmos are registered with createGizmo().
+
+every public call is counted in calls, by name, so benchmarks can report API traffic next to timings.
+dialogs answer from responses, which the caller can set.
+
+stand-in only: reset(), setThis(), createGizmo(), calls, responses, messages
+"""
+
+import math as _math
+import re as _re
+import sys as _sys
+from collections import Counter as _Counter
+
+from utils import nk_script as _nk_script
+
+NUKE_VERSION_STRING = '12.2v5'
+NUKE_VERSION_MAJOR = 12
+GUI = False
+
+# writeKnobs flags
+WRITE_ALL = 1
+WRITE_NON_DEFAULT_ONLY = 2
+TO_SCRIPT = 4
+TO_VALUE = 8
+
+calls = _Counter()
+
+# answers given by ask, getInput, getFilename, getFramesAndViews and Panel.show
+responses = {'ask': True, 'getInput': None, 'getFilename': None, 'getFramesAndViews': None}
+
+# text shown with nuke.message
+messages = []
+
+_state = {'frame': 1, 'this_node': None, 'this_knob': None}
+
+# {gizmo class: node classes chained between its Input and Output}
+_gizmo_definitions = {}
+
+
+def _counted(func):
+    name = func.__name__
+
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return func(*args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def reset():
+    """
+    stand-in only: starts a new empty script and clears the call counts
+    """
+    global _root
+    _root = RootNode()
+    _context[:] = [_root]
+    _state.update(frame=1, this_node=None, this_knob=None)
+    _gizmo_definitions.clear()
+    calls.clear()
+    del messages[:]
+
+
+def setThis(node=None, knob=None):
+    """
+    stand-in only: sets what thisNode() and thisKnob() return, as a callback would see them
+    """
+    _state['this_node'] = node
+    _state['this_knob'] = knob
+
+
+def fireKnobChanged(node, knob):
+    """
+    stand-in only: runs node's knobChanged script as nuke does once knob changed, with nothing but nuke
+    in its namespace
+    """
+    setThis(node, knob)
+    try:
+        exec(node['knobChanged'].value(), {'nuke': _sys.modules[__name__]})
+    finally:
+        setThis()
+
+
+# -- animation --
+
+class AnimationKey(object):
+
+    def __init__(self, x, y):
+        self.x = float(x)
+        self.y = float(y)
+
+
+class AnimationCurve(object):
+    """keys kept sorted by frame, evaluated with linear interpolation"""
+
+    def __init__(self):
+        self._keys = []
+
+    @_counted
+    def addKey(self, keys):
+        for key in keys:
+            self._set_key(key.x, key.y)
+
+    @_counted
+    def setKey(self, x, y):
+        return self._set_key(x, y)
+
+    def _set_key(self, x, y):
+        x = float(x)
+        keys = self._keys
+        if not keys or keys[-1].x < x:
+            keys.append(AnimationKey(x, y))
+            return keys[-1]
+        for key in keys:
+            if key.x == x:
+                key.y = float(y)
+                return key
+        keys.append(AnimationKey(x, y))
+        keys.sort(key=lambda k: k.x)
+        return keys[-1]
+
+    def keys(self):
+        return list(self._keys)
+
+    def size(self):
+        return len(self._keys)
+
+    def clear(self):
+        del self._keys[:]
+
+    @_counted
+    def evaluate(self, t):
+        return self._evaluate(t)
+
+    def _evaluate(self, t):
+        keys = self._keys
+        if t <= keys[0].x:
+            return keys[0].y
+        if t >= keys[-1].x:
+            return keys[-1].y
+        lo, hi = 0, len(keys) - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if keys[mid].x <= t:
+                lo = mid
+            else:
+                hi = mid
+        a, b = keys[lo], keys[hi]
+        return a.y + (b.y - a.y) * (t - a.x) / (b.x - a.x)
+
+
+# -- knobs --
+
+_RE_REFERENCE = _re.compile(r'^\s*([A-Za-z_][\w.]*)\.([A-Za-z_]\w*)\s*$')
+
+
+class Knob(object):
+    """
+    a knob of one or more channels. each channel has a static value and optionally
+    an animation curve and an expression
+    """
+
+    size = 1
+    default = 0
+
+    def __init__(self, name, label=None, value=None):
+        self._name = name
+        self._label = label or name
+        self._node = None
+        self._user = False
+        self._values = self._initial(value)
+        self._defaults = list(self._values)
+        self._curves = [None] * len(self._values)
+        self._expressions = [None] * len(self._values)
+        self._visible = True
+        self._enabled = True
+        self._tooltip = ''
+
+    def _initial(self, value):
+        if value is None:
+            value = self.default
+        if isinstance(value, (list, tuple)):
+            return [self._cast(v) for v in value]
+        return [self._cast(value)] * self.size
+
+    def _cast(self, value):
+        return value
+
+    def name(self):
+        return self._name
+
+    def label(self):
+        return self._label
+
+    def node(self):
+        return self._node
+
+    def setVisible(self, visible):
+        self._visible = visible
+
+    def setEnabled(self, enabled):
+        self._enabled = enabled
+
+    def setTooltip(self, tooltip):
+        self._tooltip = tooltip
+
+    def setFlag(self, flag):
+        pass
+
+    def setRange(self, minimum, maximum):
+        pass
+
+    def arraySize(self):
+        return len(self._values)
+
+    @_counted
+    def value(self, idx=None):
+        return self._value_at(_state['frame'], idx)
+
+    @_counted
+    def getValue(self, idx=None):
+        return self._value_at(_state['frame'], idx)
+
+    @_counted
+    def valueAt(self, frame, idx=None):
+        return self._value_at(frame, idx)
+
+    @_counted
+    def getValueAt(self, frame, idx=None):
+        return self._value_at(frame, idx)
+
+    def _value_at(self, frame, idx=None):
+        if idx is None:
+            if len(self._values) == 1:
+                return self._channel_at(frame, 0)
+            return [self._channel_at(frame, i) for i in range(len(self._values))]
+        return self._channel_at(frame, idx)
+
+    def _channel_at(self, frame, idx):
+        expression = self._expressions[idx]
+        if expression is not None:
+            resolved = self._resolve(expression, frame, idx)
+            if resolved is not None:
+                return resolved
+        curve = self._curves[idx]
+        if curve is not None and curve._keys:
+            return self._cast(curve._evaluate(frame))
+        return self._values[idx]
+
+    def _resolve(self, expression, frame, idx):
+        # only references to another knob are evaluated
+        match = _RE_REFERENCE.match(expression)
+        if match is None:
+            return None
+        group = self._node._parent if self._node is not None else None
+        node = _lookup(match.group(1), group or thisGroup())
+        knob = node._knob_map.get(match.group(2)) if node is not None else None
+        if knob is None or knob is self:
+            return None
+        return knob._channel_at(frame, min(idx, len(knob._values) - 1))
+
+    @_counted
+    def setValue(self, value, idx=None):
+        if isinstance(value, (list, tuple)):
+            for i, v in enumerate(value[:len(self._values)]):
+                self._set_channel(i, v)
+        elif idx is None:
+            for i in range(len(self._values)):
+                self._set_channel(i, value)
+        else:
+            self._set_channel(idx, value)
+        self._changed()
+        return True
+
+    def _set_channel(self, idx, value):
+        curve = self._curves[idx]
+        if curve is not None and curve._keys:
+            curve._set_key(_state['frame'], value)
+        else:
+            self._values[idx] = self._cast(value)
+
+    @_counted
+    def setValueAt(self, value, frame, idx=None):
+        for i in (range(len(self._values)) if idx is None else [idx]):
+            if self._curves[i] is None:
+                self._curves[i] = AnimationCurve()
+            self._curves[i]._set_key(frame, value)
+        return True
+
+    @_counted
+    def setExpression(self, expression, channel=-1, view=None):
+        for i in (range(len(self._values)) if channel < 0 else [channel]):
+            self._expressions[i] = expression
+        return True
+
+    def hasExpression(self, idx=-1):
+        channels = range(len(self._values)) if idx < 0 else [idx]
+        return any(self._expressions[i] is not None for i in channels)
+
+    def isAnimated(self, idx=-1):
+        channels = range(len(self._values)) if idx < 0 else [idx]
+        return any(self._curves[i] is not None or self._expressions[i] is not None for i in channels)
+
+    @_counted
+    def setAnimated(self, idx=-1):
+        for i in (range(len(self._values)) if idx < 0 else [idx]):
+            if self._curves[i] is None:
+                self._curves[i] = AnimationCurve()
+        return True
+
+    @_counted
+    def clearAnimated(self, idx=-1):
+        for i in (range(len(self._values)) if idx < 0 else [idx]):
+            self._curves[i] = None
+            self._expressions[i] = None
+        return True
+
+    def animation(self, idx):
+        return self._curves[idx]
+
+    def animations(self):
+        return [curve for curve in self._curves if curve is not None]
+
+    def notDefault(self):
+        return (self._values != self._defaults or any(c is not None for c in self._curves)
+                or any(e is not None for e in self._expressions))
+
+    @_counted
+    def toScript(self, quote=False, context=None):
+        channels = [self._channel_script(i) for i in range(len(self._values))]
+        if len(channels) == 1 and not channels[0].startswith('{'):
+            return channels[0]
+        return '{' + ' '.join(channels) + '}'
+
+    def _channel_script(self, idx):
+        expression = self._expressions[idx]
+        curve = self._curves[idx]
+        if expression is not None:
+            return '{"%s"}' % expression.replace('"', '\\"')
+        if curve is not None:
+            return '{curve %s}' % ' '.join('x%g %r' % (key.x, key.y) for key in curve._keys)
+        return self._format(self._values[idx])
+
+    def _format(self, value):
+        return repr(value) if isinstance(value, float) else str(value)
+
+    @_counted
+    def fromScript(self, text):
+        channels = _nk_script.knob_channels(text)
+        if len(channels) == 1 and len(self._values) > 1 and not channels[0].startswith('{'):
+            channels = channels * len(self._values)
+        for idx, channel in enumerate(channels[:len(self._values)]):
+            self._curves[idx] = None
+            self._expressions[idx] = None
+            if channel.lstrip('{').startswith('curve'):
+                curve = self._curves[idx] = AnimationCurve()
+                for frame, value in sorted(_nk_script.parse_curve(channel).items()):
+                    curve._set_key(frame, value)
+            elif channel.startswith('{'):
+                expression = channel[1:-1].strip()
+                if expression.startswith('"'):
+                    expression = expression[1:-1].replace('\\"', '"')
+                self._expressions[idx] = expression
+            else:
+                self._values[idx] = self._parse(channel)
+        self._changed()
+        return True
+
+    def fromUserText(self, text):
+        return self.fromScript(text)
+
+    def _parse(self, text):
+        try:
+            return self._cast(float(text))
+        except ValueError:
+            return self._cast(text)
+
+    def _changed(self):
+        node = self._node
+        if node is not None and node._knob_changed is not None:
+            node._knob_changed(node, self)
+
+
+class Array_Knob(Knob):
+    default = 0.0
+
+    def _cast(self, value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+
+
+class Double_Knob(Array_Knob):
+    pass
+
+
+class WH_Knob(Array_Knob):
+    pass
+
+
+class Int_Knob(Array_Knob):
+    default = 0
+
+    def _cast(self, value):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return value
+
+
+class Boolean_Knob(Int_Knob):
+
+    def _cast(self, value):
+        if value in ('true', 'false'):
+            return value == 'true'
+        return bool(float(value))
+
+    def _format(self, value):
+        return 'true' if value else 'false'
+
+
+class XYZ_Knob(Array_Knob):
+    size = 3
+
+
+class XY_Knob(Array_Knob):
+    size = 2
+
+
+class BBox_Knob(Array_Knob):
+    size = 4
+
+
+class Color_Knob(Array_Knob):
+    size = 3
+
+
+class AColor_Knob(Array_Knob):
+    size = 4
+
+
+class Box3_Knob(Array_Knob):
+    size = 6
+
+
+class Matrix_Knob(Array_Knob):
+    """4x4 matrix, row major, identity by default"""
+    size = 16
+
+    def _initial(self, value):
+        if value is None:
+            return _identity()
+        return Array_Knob._initial(self, value)
+
+
+class String_Knob(Knob):
+    default = ''
+
+    def _initial(self, value):
+        return [self._cast(self.default if value is None else value)]
+
+    def _cast(self, value):
+        return '' if value is None else str(value)
+
+    def _format(self, value):
+        if value and not any(c in value for c in ' "{}\n\\'):
+            return value
+        return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _parse(self, text):
+        if len(text) > 1 and text[0] == text[-1] == '"':
+            return _re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), text[1:-1])
+        return text
+
+
+class File_Knob(String_Knob):
+    pass
+
+
+class Multiline_Eval_String_Knob(String_Knob):
+    pass
+
+
+class Text_Knob(String_Knob):
+    pass
+
+
+class PyScript_Knob(String_Knob):
+    pass
+
+
+class Format_Knob(String_Knob):
+    pass
+
+
+class Tab_Knob(String_Knob):
+    pass
+
+
+class Enumeration_Knob(String_Knob):
+
+    def __init__(self, name, label=None, values=None):
+        String_Knob.__init__(self, name, label, (values or [''])[0])
+        self._options = list(values or [])
+
+    def values(self):
+        return list(self._options)
+
+
+class _WorldMatrixKnob(Matrix_Knob):
+    """
+    read only: the parent input's world matrix times the node's local matrix, which is its 'matrix'
+    knob with useMatrix on and its translation otherwise
+    """
+
+    def _channel_at(self, frame, idx):
+        return self._world(frame)[idx]
+
+    def _value_at(self, frame, idx=None):
+        world = self._world(frame)
+        return world if idx is None else world[idx]
+
+    def _world(self, frame):
+        knobs = self._node._knob_map
+        if knobs['useMatrix']._channel_at(frame, 0):
+            local = knobs['matrix']._value_at(frame)
+        else:
+            tx, ty, tz = knobs['translate']._value_at(frame)
+            local = [1.0, 0.0, 0.0, tx, 0.0, 1.0, 0.0, ty, 0.0, 0.0, 1.0, tz, 0.0, 0.0, 0.0, 1.0]
+        parent = self._node._inputs[0] if self._node._inputs else None
+        if parent is not None and 'world_matrix' in parent._knob_map:
+            return _multiply(parent._knob_map['world_matrix']._world(frame), local)
+        return list(local)
+
+
+# numeric ids nuke writes in addUserKnob lines
+USER_KNOB_IDS = {Int_Knob: 3, Double_Knob: 7, Array_Knob: 7, Boolean_Knob: 6, XYZ_Knob: 13, XY_Knob: 12,
+                 Color_Knob: 18, AColor_Knob: 19, String_Knob: 1, File_Knob: 2, Enumeration_Knob: 4,
+                 Tab_Knob: 20, Text_Knob: 26, PyScript_Knob: 22, Multiline_Eval_String_Knob: 41,
+                 Matrix_Knob: 7, Box3_Knob: 7, BBox_Knob: 15, WH_Knob: 14}
+_USER_KNOB_CLASSES = dict((knob_id, knob_class) for knob_class, knob_id in USER_KNOB_IDS.items()
+                          if knob_class not in (Array_Knob, Matrix_Knob, Box3_Knob))
+
+
+def _identity():
+    return [1.0 if i % 5 == 0 else 0.0 for i in range(16)]
+
+
+def _multiply(a, b):
+    return [a[row] * b[col] + a[row + 1] * b[col + 4] + a[row + 2] * b[col + 8] + a[row + 3] * b[col + 12]
+            for row in (0, 4, 8, 12) for col in (0, 1, 2, 3)]
+
+
+class math(object):
+    """nuke.math"""
+
+    class Matrix4(object):
+
+        def __init__(self, values=None):
+            self._m = list(values) if values is not None else _identity()
+
+        def __getitem__(self, idx):
+            return self._m[idx]
+
+        def __setitem__(self, idx, value):
+            self._m[idx] = float(value)
+
+        def __mul__(self, other):
+            return math.Matrix4(_multiply(self._m, other._m))
+
+        def __imul__(self, other):
+            self._m = _multiply(self._m, other._m)
+            return self
+
+        def makeIdentity(self):
+            self._m = _identity()
+
+    class Vector3(object):
+
+        def __init__(self, x=0.0, y=0.0, z=0.0):
+            self.x, self.y, self.z = x, y, z
+
+        def length(self):
+            return _math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+
+# -- formats and bboxes --
+
+class Format(object):
+
+    def __init__(self, width=2048, height=1556, name='2K_Super_35(full-ap)'):
+        self._width = width
+        self._height = height
+        self._name = name
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def name(self):
+        return self._name
+
+
+class BBox(object):
+
+    def __init__(self, x, y, w, h):
+        self._box = (x, y, w, h)
+
+    def x(self):
+        return self._box[0]
+
+    def y(self):
+        return self._box[1]
+
+    def w(self):
+        return self._box[2]
+
+    def h(self):
+        return self._box[3]
+
+
+# -- nodes --
+
+_TRANSFORM_KNOBS = (('translate', XYZ_Knob, None), ('rotate', XYZ_Knob, None), ('scaling', XYZ_Knob, 1.0),
+                    ('uniform_scale', Double_Knob, 1.0), ('pivot', XYZ_Knob, None),
+                    ('useMatrix', Boolean_Knob, False), ('matrix', Matrix_Knob, None))
+
+# knobs each class starts with besides the common ones: (name, knob class, default)
+CLASS_KNOBS = {
+    'Root': (('first_frame', Int_Knob, 1), ('last_frame', Int_Knob, 100), ('fps', Double_Knob, 24.0),
+             ('format', Format_Knob, 'HD_1080'), ('luts', String_Knob, 'linear sRGB rec709 Cineon Gamma1.8')),
+    'Read': (('file', File_Knob, None), ('first', Int_Knob, 1), ('last', Int_Knob, 1),
+             ('origfirst', Int_Knob, 1), ('origlast', Int_Knob, 1), ('colorspace', String_Knob, 'default'),
+             ('postage_stamp', Boolean_Knob, True)),
+    'Write': (('file', File_Knob, None), ('colorspace', String_Knob, 'default')),
+    'Camera2': _TRANSFORM_KNOBS + (('world_matrix', _WorldMatrixKnob, None), ('focal', Double_Knob, 50.0)),
+    'Axis2': _TRANSFORM_KNOBS + (('world_matrix', _WorldMatrixKnob, None),),
+    'TransformGeo': _TRANSFORM_KNOBS,
+    'Card': _TRANSFORM_KNOBS + (('image_aspect', Boolean_Knob, True),),
+    'Cube': _TRANSFORM_KNOBS + (('cube', Box3_Knob, [-0.5, -0.5, -0.5, 0.5, 0.5, 0.5]),
+                                ('display', Enumeration_Knob, 'solid'), ('render_mode', Enumeration_Knob, 'textured'),
+                                ('cast_shadow', Boolean_Knob, True), ('receive_shadow', Boolean_Knob, True),
+                                ('rows', Int_Knob, 4), ('columns', Int_Knob, 4)),
+    'FrameHold': (('first_frame', Int_Knob, 1),),
+    'TimeWarp': (('lookup', Double_Knob, 1.0),),
+    'BakedPointCloud': (('serializePoints', String_Knob, None),),
+    'ParticleEmitter': (('emit_from', Enumeration_Knob, 'points'), ('emit_order', Enumeration_Knob, 'randomly'),
+                        ('lifetime', Double_Knob, 20.0), ('velocity', Double_Knob, 1.0),
+                        ('spread', Double_Knob, 0.0), ('start_at', Enumeration_Knob, 'first frame'),
+                        ('rate', Double_Knob, 1.0), ('size', Double_Knob, 1.0),
+                        ('size_variation', Double_Knob, 0.0), ('start_frame', Int_Knob, 1)),
+    'ParticleExpression': (('size', String_Knob, 'size'),),
+    'BackdropNode': (('bdwidth', Int_Knob, 200), ('bdheight', Int_Knob, 200), ('note_font_size', Int_Knob, 14)),
+    'Blur': (('size', Double_Knob, 0.0),),
+    'Grade': (('white', Color_Knob, 1.0), ('multiply', Color_Knob, 1.0)),
+    'Transform': (('translate', XY_Knob, None), ('scale', Double_Knob, 1.0), ('rotate', Double_Knob, 0.0)),
+}
+CLASS_KNOBS['Camera'] = CLASS_KNOBS['Camera2']
+CLASS_KNOBS['Axis'] = CLASS_KNOBS['Axis2']
+CLASS_KNOBS['DeepRead'] = CLASS_KNOBS['Read']
+
+# inputs of each class, anything else takes one
+MAX_INPUTS = {'Merge2': 2, 'TransformGeo': 3, 'Scene': 1000, 'ParticleEmitter': 3, 'Viewer': 10, 'Group': 0}
+
+DEFAULT_TILE_COLORS = {'Read': 0xcccccc00, 'Blur': 0xcc804e00, 'Grade': 0x7aa9ff00, 'Merge2': 0x4b5ec600,
+                       'Camera2': 0xcc4c4c00, 'Card': 0xcc4c4c00, 'Group': 0xd3d3d300}
+
+GROUP_CLASSES = ('Group', 'LiveGroup')
+
+
+class Node(object):
+
+    def __init__(self, node_class, parent=None):
+        self._class = node_class
+        self._parent = parent
+        self._knobs = []
+        self._knob_map = {}
+        self._inputs = []
+        self._knob_changed = None
+
+        for knob in (String_Knob('name'), Int_Knob('xpos'), Int_Knob('ypos'), Boolean_Knob('selected'),
+                     Int_Knob('tile_color', 'tile color', DEFAULT_TILE_COLORS.get(node_class, 0)),
+                     String_Knob('label'), Boolean_Knob('disable'), PyScript_Knob('knobChanged')):
+            self._add_knob(knob)
+        for knob_name, knob_class, default in CLASS_KNOBS.get(node_class, ()):
+            self._add_knob(knob_class(knob_name, knob_name, default))
+
+    def Class(self):
+        return self._class
+
+    def clones(self):
+        # clones aren't modelled
+        return 0
+
+    @_counted
+    def name(self):
+        return self._knob_map['name']._values[0]
+
+    @_counted
+    def fullName(self):
+        return _full_name(self)
+
+    @_counted
+    def setName(self, name, uncollide=True):
+        siblings = self._parent._names if self._parent is not None else {}
+        current = self._knob_map['name']._values[0]
+        if name == current:
+            return
+        if uncollide and name in siblings:
+            name = _unique(name.rstrip('0123456789') or name, siblings)
+        siblings.pop(current, None)
+        siblings[name] = self
+        self._knob_map['name']._values[0] = name
+
+    @_counted
+    def knob(self, name):
+        if isinstance(name, int):
+            return self._knobs[name]
+        return self._knob_map.get(name)
+
+    def __getitem__(self, name):
+        calls['knob'] += 1
+        knob = self._knob_map.get(name)
+        if knob is None:
+            raise NameError('knob {} does not exist'.format(name))
+        return knob
+
+    @_counted
+    def knobs(self):
+        return dict(self._knob_map)
+
+    def numKnobs(self):
+        return len(self._knobs)
+
+    @_counted
+    def addKnob(self, knob):
+        knob._user = True
+        self._add_knob(knob)
+
+    def _add_knob(self, knob):
+        knob._node = self
+        self._knobs.append(knob)
+        self._knob_map[knob._name] = knob
+
+    def removeKnob(self, knob):
+        self._knobs.remove(knob)
+        del self._knob_map[knob._name]
+
+    # connections
+
+    @_counted
+    def input(self, idx):
+        return self._inputs[idx] if idx < len(self._inputs) else None
+
+    @_counted
+    def setInput(self, idx, node):
+        inputs = self._inputs
+        if idx >= len(inputs):
+            inputs.extend([None] * (idx + 1 - len(inputs)))
+        inputs[idx] = node
+        while inputs and inputs[-1] is None:
+            inputs.pop()
+        return True
+
+    @_counted
+    def inputs(self):
+        return len(self._inputs)
+
+    def maxInputs(self):
+        return MAX_INPUTS.get(self._class, 0 if self._class in _nk_script.ZERO_INPUT_CLASSES else 1)
+
+    @_counted
+    def dependent(self, what=None, forceEvaluate=True):
+        siblings = self._parent._children if self._parent is not None else []
+        return [n for n in siblings if self in n._inputs]
+
+    @_counted
+    def dependencies(self, what=None):
+        return [n for n in self._inputs if n is not None]
+
+    # position
+
+    @_counted
+    def xpos(self):
+        return self._knob_map['xpos']._values[0]
+
+    @_counted
+    def ypos(self):
+        return self._knob_map['ypos']._values[0]
+
+    @_counted
+    def setXpos(self, x):
+        self._knob_map['xpos']._values[0] = int(x)
+
+    @_counted
+    def setYpos(self, y):
+        self._knob_map['ypos']._values[0] = int(y)
+
+    @_counted
+    def setXYpos(self, x, y):
+        self._knob_map['xpos']._values[0] = int(x)
+        self._knob_map['ypos']._values[0] = int(y)
+
+    def screenWidth(self):
+        return 80
+
+    def screenHeight(self):
+        return 18
+
+    # selection
+
+    def isSelected(self):
+        return bool(self._knob_map['selected']._values[0])
+
+    def setSelected(self, selected):
+        self._knob_map['selected']._values[0] = bool(selected)
+
+    # image
+
+    @_counted
+    def format(self):
+        return _root._format
+
+    @_counted
+    def bbox(self):
+        # a Blur grows the bbox by its size, everything else is the format
+        size = self._knob_map.get('size')
+        grow = int(abs(size._channel_at(_state['frame'], 0))) if size is not None else 0
+        fmt = _root._format
+        return BBox(-grow, -grow, fmt.width() + 2 * grow, fmt.height() + 2 * grow)
+
+    def firstFrame(self):
+        return int(_root._knob_map['first_frame']._values[0])
+
+    def lastFrame(self):
+        return int(_root._knob_map['last_frame']._values[0])
+
+    # serialisation
+
+    @_counted
+    def writeKnobs(self, flags=WRITE_ALL):
+        lines = []
+        for knob in self._knobs:
+            if isinstance(knob, _WorldMatrixKnob):
+                continue
+            if flags & WRITE_NON_DEFAULT_ONLY and not knob.notDefault():
+                continue
+            lines.append('{} {}'.format(knob._name, knob.toScript()))
+        return '\n'.join(lines)
+
+    @_counted
+    def readKnobs(self, text):
+        for name, value in _nk_script.parse_knobs(text.split('\n')):
+            knob = self._knob_map.get(name)
+            if knob is not None:
+                knob.fromScript(value)
+
+    def parent(self):
+        return self._parent
+
+    def __repr__(self):
+        return '<{} {}>'.format(self._class, self._knob_map['name']._values[0])
+
+
+class Group(Node):
+
+    def __init__(self, node_class='Group', parent=None):
+        Node.__init__(self, node_class, parent)
+        self._children = []
+        self._names = {}
+
+    @_counted
+    def begin(self):
+        _context.append(self)
+        return self
+
+    @_counted
+    def end(self):
+        if len(_context) > 1 and _context[-1] is self:
+            _context.pop()
+
+    @_counted
+    def nodes(self):
+        return list(self._children)
+
+    def node(self, name):
+        return self._names.get(name)
+
+    def maxInputs(self):
+        return len([n for n in self._children if n._class == 'Input'])
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, *exc):
+        self.end()
+
+
+class Gizmo(Group):
+
+    @_counted
+    def makeGroup(self):
+        script = _serialise([self], expand_gizmos=True)
+        script = script.replace('{} {{'.format(self._class), 'Group {', 1)
+        for node in _context[-1]._children:
+            node.setSelected(False)
+        return _paste(script, self._parent)[0]
+
+
+class RootNode(Group):
+
+    def __init__(self):
+        Group.__init__(self, 'Root', None)
+        self._knob_map['name']._values[0] = 'root'
+        self._format = Format()
+
+
+class _Nodes(object):
+    """nuke.nodes: nuke.nodes.Blur(size=2) creates a node without connecting or selecting it"""
+
+    def __getattr__(self, node_class):
+        if node_class.startswith('__'):
+            raise AttributeError(node_class)
+
+        def create(**knobs):
+            calls['nodes.' + node_class] += 1
+            node = _create(node_class, _context[-1])
+            for name, value in knobs.items():
+                if name not in node._knob_map:
+                    node._add_knob(String_Knob(name) if isinstance(value, str) else Double_Knob(name))
+                node._knob_map[name].setValue(value)
+            return node
+
+        return create
+
+
+nodes = _Nodes()
+
+
+def _create(node_class, parent, name=None):
+    if node_class in _gizmo_definitions:
+        node = Gizmo(node_class, parent)
+    elif node_class in GROUP_CLASSES:
+        node = Group(node_class, parent)
+    else:
+        node = Node(node_class, parent)
+
+    if not name or name in parent._names:
+        base = name.rstrip('0123456789') if name else node_class.rstrip('0123456789') or node_class
+        name = _unique(base, parent._names)
+    node._knob_map['name']._values[0] = name
+    parent._names[name] = node
+    parent._children.append(node)
+
+    if node_class in _gizmo_definitions:
+        _build_contents(node, _gizmo_definitions[node_class])
+    return node
+
+
+def _build_contents(group, node_classes):
+    upstream = _create('Input', group)
+    for node_class in node_classes:
+        node = _create(node_class, group)
+        node._inputs = [upstream]
+        upstream = node
+    _create('Output', group)._inputs = [upstream]
+
+
+def _unique(base, taken, start=1):
+    idx = start
+    while '{}{}'.format(base, idx) in taken:
+        idx += 1
+    return '{}{}'.format(base, idx)
+
+
+def _full_name(node):
+    names = []
+    while node is not None and node._parent is not None:
+        names.append(node._knob_map['name']._values[0])
+        node = node._parent
+    return '.'.join(reversed(names)) or 'root'
+
+
+def _lookup(name, group):
+    # 'root.Group1.Blur1' or 'Group1.Blur1' from the root, 'Blur1' in group
+    if name == 'root':
+        return _root
+    if name.startswith('root.'):
+        name, group = name[5:], _root
+    elif '.' in name:
+        group = _root
+    node = None
+    for part in name.split('.'):
+        node = group._names.get(part) if isinstance(group, Group) else None
+        if node is None:
+            return None
+        group = node
+    return node
+
+
+@_counted
+def createGizmo(node_class, contents=('Blur', 'Grade')):
+    """
+    stand-in only: defines a gizmo class holding the contents node classes chained between an Input and
+    an Output, and creates one in the current context. later copies are created the usual ways
+    @return: the gizmo
+    """
+    _gizmo_definitions[node_class] = tuple(contents)
+    return _create(node_class, _context[-1])
+
+
+# -- script level --
+
+_root = RootNode()
+_context = [_root]
+
+
+@_counted
+def root():
+    return _root
+
+
+Root = root
+
+
+def thisGroup():
+    return _context[-1]
+
+
+@_counted
+def thisNode():
+    return _state['this_node'] or _context[-1]
+
+
+@_counted
+def thisKnob():
+    return _state['this_knob']
+
+
+@_counted
+def thisParent():
+    node = _state['this_node']
+    return node._parent if node is not None else _context[-1]
+
+
+@_counted
+def frame(f=None):
+    if f is not None:
+        _state['frame'] = f
+    return _state['frame']
+
+
+@_counted
+def allNodes(filter=None, group=None, recurseGroups=False):
+    return _all_nodes(filter, group or _context[-1], recurseGroups)
+
+
+def _all_nodes(filter, group, recurse):
+    found = []
+    for node in group._children:
+        if filter is None or node._class == filter:
+            found.append(node)
+        if recurse and isinstance(node, Group) and not isinstance(node, Gizmo):
+            found.extend(_all_nodes(filter, node, True))
+    return found
+
+
+@_counted
+def toNode(name):
+    return _lookup(name, _context[-1])
+
+
+@_counted
+def selectedNodes(filter=None):
+    return [n for n in _context[-1]._children
+            if n._knob_map['selected']._values[0] and (filter is None or n._class == filter)]
+
+
+@_counted
+def selectedNode():
+    selected = [n for n in _context[-1]._children if n._knob_map['selected']._values[0]]
+    if not selected:
+        raise ValueError('no node selected')
+    return selected[-1]
+
+
+@_counted
+def createNode(node_class, knobs='', inpanel=True):
+    selected = [n for n in _context[-1]._children if n._knob_map['selected']._values[0]]
+    node = _create(node_class, _context[-1])
+    if knobs:
+        node.readKnobs(knobs)
+    if selected:
+        if node.maxInputs():
+            node._inputs = [selected[-1]]
+        node.setXYpos(selected[-1].xpos(), selected[-1].ypos() + 60)
+    for other in selected:
+        other.setSelected(False)
+    node.setSelected(True)
+    return node
+
+
+@_counted
+def delete(node):
+    parent = node._parent
+    if parent is None or parent._names.get(node._knob_map['name']._values[0]) is not node:
+        raise ValueError('node already deleted')
+    parent._children.remove(node)
+    del parent._names[node._knob_map['name']._values[0]]
+    for other in parent._children:
+        if node in other._inputs:
+            other._inputs = [None if n is node else n for n in other._inputs]
+            while other._inputs and other._inputs[-1] is None:
+                other._inputs.pop()
+
+
+@_counted
+def filename(node, filenameFilter=None):
+    knob = node._knob_map.get('file')
+    return knob._values[0] if knob is not None else None
+
+
+@_counted
+def nodeCopy(path):
+    with open(path, 'w') as f:
+        f.write(_serialise(selectedNodes()))
+    return True
+
+
+@_counted
+def nodePaste(path):
+    with open(path) as f:
+        script = f.read()
+    group = _context[-1]
+    for node in group._children:
+        node.setSelected(False)
+    for node in _paste(script, group):
+        node.setSelected(True)
+
+
+def _serialise(selection, expand_gizmos=False):
+    """
+    writes nodes as stack-format .nk text: each node's inputs are pushed (input 0 last, so it ends up on
+    top of the stack) before its block, and the node is saved to a variable for the nodes below it.
+    the contents of groups follow them, up to an end_group. gizmos are written without their contents
+    """
+    lines = []
+    _serialise_nodes(selection, '', lines, [0], expand_gizmos)
+    return '\n'.join(lines) + '\n'
+
+
+def _serialise_nodes(selection, indent, lines, counter, expand_gizmos):
+    variables = {}
+    for node in _topological(selection):
+        for upstream in reversed(node._inputs):
+            lines.append('{}push {}'.format(indent, '$' + variables[upstream] if upstream in variables else '0'))
+
+        lines.append('{}{} {{'.format(indent, node._class))
+        if len(node._inputs) != (0 if node._class in _nk_script.ZERO_INPUT_CLASSES else 1):
+            lines.append('{} inputs {}'.format(indent, len(node._inputs)))
+        lines.extend(_knob_lines(node, indent + ' '))
+        lines.append('{}}}'.format(indent))
+
+        if isinstance(node, Group) and (expand_gizmos or not isinstance(node, Gizmo)):
+            _serialise_nodes(node._children, indent + ' ', lines, counter, False)
+            lines.append('{}end_group'.format(indent))
+
+        counter[0] += 1
+        variables[node] = 'N{}'.format(counter[0])
+        lines.append('{}set {} [stacks 0]'.format(indent, variables[node]))
+
+
+def _knob_lines(node, indent):
+    lines = []
+    for knob in node._knobs:
+        if isinstance(knob, _WorldMatrixKnob):
+            continue
+        if knob._user:
+            lines.append('{}addUserKnob {{{} {} l "{}"}}'.format(
+                indent, USER_KNOB_IDS.get(type(knob), 1), knob._name, knob._label))
+        if knob.notDefault() or knob._name in ('name', 'xpos', 'ypos'):
+            lines.append('{}{} {}'.format(indent, knob._name, knob.toScript()))
+    return lines
+
+
+def _topological(selection):
+    # inputs before the nodes they feed, otherwise in selection order
+    selected = set(selection)
+    order = []
+    seen = set()
+    for node in selection:
+        stack = [(node, False)]
+        while stack:
+            current, done = stack.pop()
+            if done:
+                order.append(current)
+                continue
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.append((current, True))
+            stack.extend((n, False) for n in reversed(current._inputs) if n in selected and n not in seen)
+    return order
+
+
+def _paste(script, parent):
+    """
+    creates the nodes of a script under parent, renaming top-level nodes whose names are taken
+    @return: the top-level nodes created
+    """
+    created = {}
+    top_level = []
+    groups = {'': parent}
+
+    for script_node in _nk_script.iter_nodes(script.split('\n')):
+        container = groups.get(script_node.parent, parent)
+        knobs = script_node.knobs()
+        name = dict(knobs).get('name')
+
+        node = _create(script_node.node_class, container, name)
+
+        for knob_name, value in knobs:
+            if knob_name in ('name', 'inputs'):
+                continue
+            if knob_name == 'addUserKnob':
+                tokens = value.strip('{}').split()
+                knob_class = _USER_KNOB_CLASSES.get(int(tokens[0]), String_Knob)
+                label = value.split(' l ', 1)[1].strip('{}" ') if ' l ' in value else None
+                node.addKnob(knob_class(tokens[1], label))
+                continue
+            knob = node._knob_map.get(knob_name)
+            if knob is None:
+                knob = String_Knob(knob_name)
+                node._add_knob(knob)
+            knob.fromScript(value)
+
+        created[script_node.name] = node
+        node._inputs = [created.get(upstream) for upstream in script_node.inputs]
+        while node._inputs and node._inputs[-1] is None:
+            node._inputs.pop()
+
+        if isinstance(node, Group) and not isinstance(node, Gizmo):
+            groups[script_node.name] = node
+        if container is parent:
+            top_level.append(node)
+
+    return top_level
+
+
+# -- ui --
+
+class Undo(object):
+
+    _disabled = [0]
+
+    @_counted
+    def begin(self, name=None):
+        pass
+
+    @_counted
+    def end(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    @staticmethod
+    def disable():
+        Undo._disabled[0] += 1
+
+    @staticmethod
+    def enable():
+        Undo._disabled[0] -= 1
+
+    @staticmethod
+    def disabled():
+        return Undo._disabled[0] > 0
+
+
+class ProgressTask(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.progress = 0
+        self.message = ''
+
+    def setProgress(self, progress):
+        self.progress = progress
+
+    def setMessage(self, message):
+        self.message = message
+
+    def isCancelled(self):
+        return False
+
+
+class Panel(object):
+
+    def __init__(self, title):
+        self.title = title
+        self._values = {}
+
+    def setWidth(self, width):
+        pass
+
+    def addEnumerationPulldown(self, name, values):
+        self._values[name] = values.split(' ')[0]
+
+    def addBooleanCheckBox(self, name, value):
+        self._values[name] = value
+
+    def addMultilineTextInput(self, name, value):
+        self._values[name] = value
+
+    def value(self, name):
+        return self._values.get(name)
+
+    def show(self):
+        return responses['ask']
+
+
+@_counted
+def message(text):
+    messages.append(text)
+
+
+@_counted
+def ask(text):
+    return responses['ask']
+
+
+@_counted
+def getInput(prompt, default=None):
+    return responses['getInput'] if responses['getInput'] is not None else default
+
+
+@_counted
+def getFilename(prompt, pattern=None, default=None, **kwargs):
+    return responses['getFilename']
+
+
+@_counted
+def getFramesAndViews(label, default):
+    return responses['getFramesAndViews'] or [default, ['main']]
+
+
+def executeInMainThread(call, args=(), kwargs=None):
+    call(*args, **(kwargs or {}))
+
+
+def executeInMainThreadWithResult(call, args=(), kwargs=None):
+    return call(*args, **(kwargs or {}))
+
+
+class Menu(object):
+
+    def __init__(self, name):
+        self._name = name
+        self._items = []
+
+    def name(self):
+        return self._name
+
+    def items(self):
+        return list(self._items)
+
+    def addMenu(self, name, **kwargs):
+        return self.findItem(name) or self._add(Menu(name))
+
+    @_counted
+    def addCommand(self, name, command=None, shortcut=None, **kwargs):
+        path, _, leaf = name.rpartition('/')
+        menu = self
+        for part in path.split('/') if path else ():
+            menu = menu.addMenu(part)
+        return menu._add(MenuItem(leaf, command, shortcut))
+
+    def findItem(self, name):
+        item = self
+        for part in name.split('/'):
+            item = next((i for i in item._items if i.name() == part), None) if isinstance(item, Menu) else None
+        return item
+
+    def _add(self, item):
+        self._items.append(item)
+        return item
+
+
+class MenuItem(object):
+
+    def __init__(self, name, command, shortcut=None):
+        self._name = name
+        self._command = command
+        self._shortcut = shortcut
+
+    def name(self):
+        return self._name
+
+    def invoke(self):
+        if callable(self._command):
+            return self._command()
+        return eval(compile(self._command, self._name, 'exec'), {'nuke': __import__('nuke')})
+
+
+_menus = {}
+
+
+@_counted
+def menu(name):
+    if name not in _menus:
+        _menus[name] = Menu(name)
+    return _menus[name]
@@ -0,0 +1,236 @@
+"""
+tools_bench
+
+benchmarks the tool entry points at scaled sizes against the in-memory nuke stand-in in benchmarks/standin,
+reporting the wall time and the nuke API calls each run made. the stand-in's knobs evaluate far faster than
+nuke's, so the call counts are the figure to compare between changes, the timings only show how a tool scales.
+
+a benchmark whose tool can't be imported with this interpreter (dag_utils needs python 2, the compact fogbox
+numpy) is skipped with the reason.
+
+usage: python benchmarks/tools_bench.py [benchmark ...] [--scale N] [--top N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, 'standin'), os.path.dirname(HERE)]
+
+import nuke  # noqa: E402 - the stand-in, found through the path above
+
+FRAME_RANGES = (100, 1000)
+CARD_COUNTS = (10, 100, 500)
+NODE_COUNTS = (100, 1000)
+GIZMO_COUNTS = (10, 100)
+
+
+def bench_camera_bake(frames):
+    from tools import camera_bake
+
+    _frame_range(frames)
+    axis = nuke.nodes.Axis2()
+    _animate(axis['translate'], frames)
+    camera = nuke.nodes.Camera2()
+    camera.setInput(0, axis)
+    _animate(camera['rotate'], frames)
+    tail = camera
+    for _ in range(2):
+        transform = nuke.nodes.TransformGeo()
+        transform.setInput(0, tail)
+        tail = transform
+
+    return lambda: camera_bake.bake_out_new_cam(tail)
+
+
+def bench_fogbox_run(cards):
+    from tools import fogbox
+    return lambda: fogbox.run(cards)
+
+
+def bench_fogbox_compact(cards):
+    import numpy  # noqa: F401 - the compact layout is computed with numpy
+    from tools import fogbox
+    return lambda: fogbox.run(cards, compact=True)
+
+
+def bench_fogbox_update(cards):
+    from tools import fogbox
+
+    grp = fogbox.run(cards)
+    grp['num_cards'].setValue(cards * 2)
+    return lambda: fogbox.update(grp)
+
+
+def bench_duplicate_nodes(count):
+    from tools.Duplicator import Duplicator
+
+    _frame_range(100)
+    tail = None
+    for _ in range(count):
+        node = nuke.nodes.Blur()
+        _animate(node['size'], 100)
+        if tail is not None:
+            node.setInput(0, tail)
+        node.setSelected(True)
+        tail = node
+
+    return Duplicator().duplicateNode
+
+
+def bench_bake_camera_static(frames):
+    from tools.Duplicator import Duplicator
+
+    _frame_range(frames)
+    axis = nuke.nodes.Axis2()
+    _animate(axis['translate'], frames)
+    camera = nuke.nodes.Camera2()
+    camera.setInput(0, axis)
+    camera.setSelected(True)
+
+    return lambda: Duplicator().bakeCameraSpace(static=True)
+
+
+def bench_chan_export(frames):
+    from tools import chan_export
+
+    knob = nuke.nodes.Blur()['size']
+    _animate(knob, frames)
+    handle, path = tempfile.mkstemp(suffix='.chan')
+    os.close(handle)
+
+    def run():
+        try:
+            chan_export.export_chan_file(1, frames, knob, path)
+        finally:
+            os.remove(path)
+
+    return run
+
+
+def bench_dag_index(count):
+    from utils.node_utils import DagIndex
+
+    _chain('Blur', count)
+    return DagIndex
+
+
+def bench_bbox_scan(count):
+    from utils import dag_utils
+
+    for idx, node in enumerate(_chain('Blur', count)):
+        node['size'].setValue(idx % 200)
+    return lambda: dag_utils.scanForExtremeBBox(0.1)
+
+
+def bench_reset_colours(count):
+    from utils import dag_utils
+
+    nodes = _chain('Blur', count)
+    for node in nodes:
+        node['tile_color'].setValue(3942580479)
+    return lambda: dag_utils.resetNodesToDefaultColours(nodes)
+
+
+def bench_replace_gizmos(count):
+    from utils import dag_utils
+
+    tail = nuke.nodes.Read()
+    for idx in range(count):
+        gizmo = nuke.createGizmo('Glow_{}'.format(idx % 4))
+        gizmo.setInput(0, tail)
+        tail = gizmo
+    nuke.nodes.Write().setInput(0, tail)
+    for node in nuke.allNodes():
+        node.setSelected(False)
+
+    return dag_utils.replace_gizmos_batch
+
+
+# name: (setup, sizes, size label). setup builds the script for a size and returns the call timed
+BENCHMARKS = (
+    ('camera_bake', bench_camera_bake, FRAME_RANGES, 'frames'),
+    ('fogbox.run', bench_fogbox_run, CARD_COUNTS, 'cards'),
+    ('fogbox.run compact', bench_fogbox_compact, CARD_COUNTS, 'cards'),
+    ('fogbox.update', bench_fogbox_update, CARD_COUNTS, 'cards'),
+    ('Duplicator.duplicateNode', bench_duplicate_nodes, NODE_COUNTS, 'nodes'),
+    ('Duplicator.bakeCameraSpace static', bench_bake_camera_static, FRAME_RANGES, 'frames'),
+    ('chan_export', bench_chan_export, FRAME_RANGES, 'frames'),
+    ('DagIndex', bench_dag_index, NODE_COUNTS, 'nodes'),
+    ('scanForExtremeBBox', bench_bbox_scan, NODE_COUNTS, 'nodes'),
+    ('resetNodesToDefaultColours', bench_reset_colours, NODE_COUNTS, 'nodes'),
+    ('replace_gizmos_batch', bench_replace_gizmos, GIZMO_COUNTS, 'gizmos'),
+)
+
+
+def measure(setup, size):
+    """
+    builds a fresh script for size and runs the benchmark once
+    @return: (seconds, total api calls, Counter of api calls) of the timed call only
+    """
+    nuke.reset()
+    call = setup(size)
+    nuke.calls.clear()
+
+    start = time.time()
+    call()
+    elapsed = time.time() - start
+
+    calls = nuke.calls.copy()
+    return elapsed, sum(calls.values()), calls
+
+
+def run(names=None, scale=1, top=3):
+    print('{:<36} {:>12} {:>10} {:>10}  {}'.format('benchmark', 'size', 'time (ms)', 'api calls', 'most called'))
+
+    for name, setup, sizes, unit in BENCHMARKS:
+        if names and name.split(' ')[0] not in names and name not in names:
+            continue
+
+        for size in sizes:
+            size *= scale
+            label = '{} {}'.format(size, unit)
+            try:
+                elapsed, total, calls = measure(setup, size)
+            except (ImportError, SyntaxError) as e:
+                print('{:<36} {:>12}  skipped: {}'.format(name, '', e))
+                break
+
+            most = ', '.join('{} {}'.format(call, count) for call, count in calls.most_common(top))
+            print('{:<36} {:>12} {:>10.1f} {:>10}  {}'.format(name, label, elapsed * 1000.0, total, most))
+
+
+# helpers
+
+def _frame_range(frames):
+    nuke.root()['first_frame'].setValue(1)
+    nuke.root()['last_frame'].setValue(frames)
+
+
+def _animate(knob, frames):
+    for frame in range(1, frames + 1):
+        for idx in range(knob.arraySize()):
+            knob.setValueAt(frame * (idx + 1) * 0.1, frame, idx)
+
+
+def _chain(node_class, count):
+    nodes = []
+    for _ in range(count):
+        node = getattr(nuke.nodes, node_class)()
+        if nodes:
+            node.setInput(0, nodes[-1])
+        nodes.append(node)
+    return nodes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the tools against the nuke stand-in.')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run, all of them when none are given')
+    parser.add_argument('--scale', type=int, default=1, help='multiply every size by this')
+    parser.add_argument('--top', type=int, default=3, help='number of most called functions listed')
+    args = parser.parse_args()
+
+    run(args.benchmarks, args.scale, args.top)
@@ -0,0 +1,63 @@
+"""
+menu
+
+Isotope's menus and panels. only utils.registry is imported here: each tool is imported the first time one
+of its commands runs, and the Qt tools aren't added at all in terminal and render sessions.
+set ISOTOPE_IMPORTTIME to log how long the menus and each tool took to import.
+"""
+
+import nuke
+
+from utils import registry
+
+MENU = 'Nuke/Isotope/'
+
+
+def _fogbox(fogbox):
+    card_count = nuke.getInput('Number of cards', '20')
+    if card_count:
+        return fogbox.run(int(card_count))
+
+
+def _bbox_scan(dag_utils):
+    tolerance = nuke.getInput('BBox tolerance (0.1 to 1)', '0.5')
+    if tolerance:
+        return dag_utils.scanForExtremeBBoxRange(float(tolerance))
+
+
+# 3D
+registry.register_command(MENU + '3D/Bake Camera Through Transforms', 'tools.camera_bake',
+                          lambda camera_bake: camera_bake.bake_out_new_cam(nuke.selectedNode()))
+registry.register_command(MENU + '3D/Bake Camera World Space', 'tools.Duplicator',
+                          lambda duplicator: duplicator.Duplicator().bakeCameraSpace())
+registry.register_command(MENU + '3D/Bake Camera World Space (static)', 'tools.Duplicator',
+                          lambda duplicator: duplicator.Duplicator().bakeCameraSpaceStatic())
+registry.register_command(MENU + '3D/Duplicate Nodes', 'tools.Duplicator',
+                          lambda duplicator: duplicator.Duplicator().duplicateNode())
+registry.register_command(MENU + '3D/FogBox', 'tools.fogbox', _fogbox)
+
+# reads
+registry.register_command(MENU + 'Read/Read from Write', 'read.read', 'read_from_write')
+registry.register_command(MENU + 'Read/Update Reads to Latest', 'tools.version_update', 'update_reads_to_latest')
+registry.register_command(MENU + 'Read/Directory Load', 'utils.dag_utils', 'directory_load')
+registry.register_command(MENU + 'Read/Colorspace Manager', 'tools.colorspace_manager',
+                          'display_colorspace_manager', gui=True)
+
+# script
+registry.register_command(MENU + 'Script/Preflight', 'tools.preflight', 'preflight')
+registry.register_command(MENU + 'Script/Replace Gizmos with Groups', 'utils.dag_utils', 'replace_gizmos_batch')
+registry.register_command(MENU + 'Script/Scan for Extreme BBoxes', 'utils.dag_utils', _bbox_scan)
+registry.register_command(MENU + 'Script/Toggle Postage Stamps', 'utils.dag_utils', 'postageStampsToggle')
+
+# netcopy
+registry.register_command(MENU + 'NetCopy/Copy', 'tools.netcopy', 'netcopy', gui=True)
+registry.register_command(MENU + 'NetCopy/Paste Browser', 'tools.netcopy', 'display_netpaste_buffer', gui=True)
+
+# knob context menu
+registry.register_command('Animation/Export .chan', 'tools.chan_export', 'execute')
+
+registry.register_panel('com.mattgreig.NetPasteWidget', 'NetPaste Browser', 'tools.netcopy', 'NetPasteWidget')
+registry.register_panel('com.mattgreig.ColorspaceManager', 'Colorspace Manager', 'tools.colorspace_manager',
+                        'ColorspaceManager')
+
+registry.install()
@@ -1,10 +1,12 @@
 import nuke
 import logging
 from utils import sequence
+from utils.instrument import instrumented
 
 logger = logging.getLogger(__name__)
 
 
+@instrumented()
 def read_from_write():
 
     """
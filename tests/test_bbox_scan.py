@@ -0,0 +1,54 @@
+"""
+tests for utils.bbox_scan, run against the nuke stand-in in benchmarks/standin: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'benchmarks', 'standin'), ROOT]
+
+import nuke  # noqa: E402 - the stand-in
+from utils import bbox_scan  # noqa: E402
+
+
+class UpstreamHashesTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+        self.read = nuke.nodes.Read()
+        self.blur = nuke.nodes.Blur()
+        self.blur.setInput(0, self.read)
+
+    def test_upstream_edits_change_downstream_hashes(self):
+        before = bbox_scan.upstream_hashes([self.blur])
+        self.read['first'].setValue(1001)
+        after = bbox_scan.upstream_hashes([self.blur])
+
+        self.assertNotEqual(before[self.blur.fullName()], after[self.blur.fullName()])
+
+    def test_layout_knobs_are_ignored(self):
+        before = bbox_scan.upstream_hashes([self.blur])
+        self.read.setXpos(self.read.xpos() + 100)
+
+        self.assertEqual(before, bbox_scan.upstream_hashes([self.blur]))
+
+    def test_edits_inside_a_group_change_its_hash(self):
+        grp = nuke.nodes.Group()
+        grp.setInput(0, self.blur)
+        with grp:
+            inner = nuke.nodes.Blur()
+            inner.setInput(0, nuke.nodes.Input())
+            nuke.nodes.Output().setInput(0, inner)
+
+        before = bbox_scan.upstream_hashes([grp])
+        inner['size'].setValue(50)
+        after = bbox_scan.upstream_hashes([grp])
+
+        self.assertNotEqual(before[grp.fullName()], after[grp.fullName()])
+        self.assertEqual(before[self.blur.fullName()], after[self.blur.fullName()])
+
+
+if __name__ == '__main__':
+    unittest.main()
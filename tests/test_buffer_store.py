@@ -0,0 +1,82 @@
+"""
+tests for utils.buffer_store: python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from utils.buffer_store import BufferStore  # noqa: E402
+
+
+class BufferStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BufferStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def put(self, data, user, age=0):
+        # backdates the entry by age seconds
+        entry = self.store.put(data, user)
+        history = self.store.history(user)
+        history[0]['time'] -= age
+        self.store._write_manifest(user, history)
+        return entry
+
+    def test_identical_buffers_are_stored_once(self):
+        first = self.store.put(b'Blur {\n name Blur1\n}', 'mg')
+        second = self.store.put(b'Blur {\n name Blur1\n}', 'jd')
+
+        self.assertEqual(first['path'], second['path'])
+        self.assertEqual(self.store.get(first['digest']), b'Blur {\n name Blur1\n}')
+        self.assertEqual(len(self.store.entries()), 2)
+
+    def test_evict_keeps_the_newest_entries(self):
+        old = self.put(b'old', 'mg', age=60)
+        new = self.put(b'new', 'mg')
+
+        evicted = self.store.evict('mg', max_entries=1)
+
+        self.assertEqual([entry['digest'] for entry in evicted], [old['digest']])
+        self.assertEqual([entry['digest'] for entry in self.store.history('mg')], [new['digest']])
+        self.assertIsNone(self.store.object_path(old['digest']))
+
+    def test_evict_by_age_and_size(self):
+        self.put(b'a' * 10, 'mg', age=3600)
+        self.put(b'b' * 10, 'mg', age=10)
+        self.put(b'c' * 10, 'mg')
+
+        self.assertEqual(len(self.store.evict('mg', max_age=600)), 1)
+        self.assertEqual(len(self.store.evict('mg', max_bytes=15)), 1)
+        self.assertEqual([entry['size'] for entry in self.store.history('mg')], [10])
+
+    def test_buffers_another_user_copied_are_kept(self):
+        shared = self.put(b'shared', 'mg', age=60)
+        self.put(b'mine', 'mg')
+        self.store.put(b'shared', 'jd')
+
+        self.store.evict('mg', max_entries=1)
+
+        self.assertEqual(self.store.get(shared['digest']), b'shared')
+
+    def test_nothing_is_deleted_when_a_manifest_is_unreadable(self):
+        old = self.put(b'old', 'mg', age=60)
+        self.put(b'new', 'mg')
+        with open(self.store.manifest_path('jd'), 'w') as f:
+            f.write('{not json')
+
+        self.store.evict('mg', max_entries=1)
+
+        self.assertIsNotNone(self.store.object_path(old['digest']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+tests for utils.dependency_check: python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from utils import dependency_check  # noqa: E402
+from utils.dependency_check import Dependency  # noqa: E402
+from utils.path import path_object  # noqa: E402
+
+
+class FrameRangesTest(unittest.TestCase):
+
+    def test_frames_collapse_into_ranges(self):
+        self.assertEqual(dependency_check.frame_ranges([7, 1, 2, 3, 9, 10]), '1-3, 7, 9-10')
+        self.assertEqual(dependency_check.frame_ranges([]), '')
+
+
+class CheckTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for frame in (1001, 1002, 1004, 1010):
+            with open(os.path.join(self.folder, 'plate.{}.exr'.format(frame)), 'w') as f:
+                f.write('' if frame == 1002 else 'pixels')
+        self.sequence = os.path.join(self.folder, 'plate.%04d.exr')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def check_sequence(self, first, last):
+        dependency = Dependency(self.sequence)
+        dependency.add('Read1', first, last)
+        listing = dependency_check.list_directory(self.folder)
+        return dependency_check._check_sequence(dependency, path_object(self.sequence), listing)
+
+    def test_missing_outside_and_empty_frames(self):
+        report = self.check_sequence(1001, 1005)
+
+        self.assertTrue(report.exists)
+        self.assertEqual(report.missing, [1003, 1005])
+        self.assertEqual(report.outside, [1010])
+        self.assertEqual(report.empty, [1002])
+
+    def test_without_a_range_holes_on_disk_are_missing(self):
+        report = self.check_sequence(None, None)
+
+        self.assertEqual((report.first, report.last), (1001, 1010))
+        self.assertEqual(dependency_check.frame_ranges(report.missing), '1003, 1005-1009')
+
+    def test_reads_of_the_same_path_widen_its_range(self):
+        dependencies = dependency_check.collect([('Read1', self.sequence, 1001, 1002),
+                                                 ('Read2', self.sequence, 1004, 1010),
+                                                 ('Read3', '', 1, 1)])
+
+        self.assertEqual([(d.nodes, d.first, d.last) for d in dependencies], [(['Read1', 'Read2'], 1001, 1010)])
+
+    def test_check_puts_failures_first(self):
+        still = os.path.join(self.folder, 'still.exr')
+        with open(still, 'w') as f:
+            f.write('pixels')
+        missing = os.path.join(self.folder, 'gone.exr')
+
+        reports = dependency_check.check(dependency_check.collect([('Read1', still, None, None),
+                                                                   ('Read2', missing, None, None)]))
+
+        self.assertEqual([(report.path, report.exists) for report in reports], [(missing, False), (still, True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
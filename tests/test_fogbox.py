@@ -0,0 +1,165 @@
+"""
+tests for tools.fogbox, run against the nuke stand-in in benchmarks/standin: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'benchmarks', 'standin'), ROOT]
+
+import nuke  # noqa: E402 - the stand-in
+from tools import fogbox  # noqa: E402
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class CardParamsTest(unittest.TestCase):
+
+    def test_card_frames(self):
+        self.assertEqual(fogbox.card_frames([5, 12, -3], 1001, 1011), [1006, 1003, 1004])
+        self.assertEqual(fogbox.card_frames([5, 12, -3], 1001, 1011, seq_input=True), [1001, 1002, 1003])
+        self.assertEqual(fogbox.card_frames([5, 12], 7, 7), [7, 7])
+
+    def test_params_are_reproducible_from_the_master_seed(self):
+        params = fogbox.generate_card_params(42, 5)
+
+        self.assertEqual(params, fogbox.generate_card_params(42, 5))
+        self.assertNotEqual(params['seed'], fogbox.generate_card_params(43, 5)['seed'])
+        # adding cards leaves the existing ones alone
+        self.assertEqual(fogbox.generate_card_params(42, 3)['seed'], params['seed'][:3])
+        self.assertEqual(params['card_id'], [1, 2, 3, 4, 5])
+        self.assertTrue(set(params['seed_sign']) <= set([-1, 1]))
+
+
+@unittest.skipIf(numpy is None, 'the static layout is computed with numpy')
+class StaticLayoutTest(unittest.TestCase):
+
+    def layout(self, exp_scale=1.0, xyz_var=(0, 0, 0), scale_var=0.0):
+        return fogbox.compute_static_layout((-1, -1, -1, 1, 1, 1), [1, 2, 3], [10, 20, 30], [1, -1, 1], 3,
+                                            exp_scale, xyz_var, 1.0, scale_var)
+
+    def test_cards_are_spread_evenly_through_the_cube(self):
+        layout = self.layout()
+
+        self.assertEqual(layout['translate'].tolist(), [[0, 0, 0.5], [0, 0, 0], [0, 0, -0.5]])
+        self.assertEqual(layout['scaling'].tolist(), [2, 2, 2])
+        self.assertEqual(layout['uniform_scale'].tolist(), [1, 1, 1])
+
+    def test_exp_scale_pulls_cards_towards_card1(self):
+        self.assertEqual(self.layout(exp_scale=2.0)['translate'][:, 2].tolist(), [0.5, 0, -0.25])
+
+    def test_variation_comes_from_the_seeds(self):
+        layout = self.layout(xyz_var=(1, 0, 0), scale_var=0.5)
+        again = self.layout(xyz_var=(1, 0, 0), scale_var=0.5)
+
+        self.assertEqual(layout['translate'].tolist(), again['translate'].tolist())
+        self.assertEqual(len(set(layout['translate'][:, 0].tolist())), 3)
+        self.assertTrue(all(0.5 <= scale <= 1.5 for scale in layout['uniform_scale'].tolist()))
+
+
+class KnobChangedTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+        self.grp = fogbox.run(5)
+
+    def test_num_cards_resizes_the_group(self):
+        self.grp['num_cards'].setValue(8)
+        nuke.fireKnobChanged(self.grp, self.grp['num_cards'])
+
+        self.assertEqual(sorted(fogbox._cards_by_id(self.grp)), list(range(1, 9)))
+
+    @unittest.skipIf(numpy is None, 'the static layout is computed with numpy')
+    def test_static_layout_follows_the_cube(self):
+        self.grp['static_layout'].setValue(True)
+        nuke.fireKnobChanged(self.grp, self.grp['static_layout'])
+        card = self.grp.node('Card1')
+        before = card['translate'].value()
+
+        cube = self.grp.node('Cube1')
+        cube['cube'].setValue([-10, -10, -10, 10, 10, 10])
+        nuke.fireKnobChanged(cube, cube['cube'])
+
+        self.assertFalse(card['translate'].hasExpression())
+        self.assertNotEqual(card['translate'].value(), before)
+
+
+
+class InputRangeTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+        self.grp = fogbox.run(3)
+
+    def test_read_range_is_followed_by_an_expression(self):
+        read = nuke.nodes.Read()
+        read['first'].setValue(1001)
+        read['last'].setValue(1100)
+        blur = nuke.nodes.Blur()
+        blur.setInput(0, read)
+        self.grp.setInput(0, blur)
+        nuke.fireKnobChanged(self.grp, nuke.Knob('inputChange'))
+
+        self.assertEqual(self.grp['input_first'].value(), 1001)
+        self.assertEqual(self.grp['input_last'].value(), 1100)
+        self.assertTrue(self.grp['input_first'].hasExpression())
+
+    def test_without_input_the_script_range_is_cached(self):
+        nuke.root()['first_frame'].setValue(10)
+        nuke.root()['last_frame'].setValue(20)
+        fogbox.refresh_input_range(self.grp)
+
+        self.assertEqual((self.grp['input_first'].value(), self.grp['input_last'].value()), (10, 20))
+        self.assertFalse(self.grp['input_first'].hasExpression())
+
+
+
+@unittest.skipIf(numpy is None, 'the compact layout is computed with numpy')
+class CompactBuildTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+        self.grp = fogbox.run(6, compact=True)
+        self.grp['scale_var'].setValue(0.5)
+        nuke.fireKnobChanged(self.grp, self.grp['scale_var'])
+
+    def keys(self, node_name, knob_name):
+        with self.grp:
+            curve = nuke.toNode(node_name).knob(knob_name).animation(0)
+        return [(key.x, key.y) for key in curve.keys()]
+
+    def test_node_count_is_constant(self):
+        count = len(self.grp.nodes())
+        self.grp['num_cards'].setValue(60)
+        nuke.fireKnobChanged(self.grp, self.grp['num_cards'])
+
+        self.assertEqual(len(self.grp.nodes()), count)
+        self.assertEqual(len(self.keys(fogbox.CARD_SCALES, 'scales')), 60)
+
+    def test_each_particle_holds_its_card_frame(self):
+        first = self.grp['input_first'].value()
+        seeds, _ = fogbox._card_seeds(self.grp, 6)
+        held = fogbox.card_frames(seeds, first, self.grp['input_last'].value())
+
+        self.assertEqual(self.keys(fogbox.CARD_FRAMES, 'lookup'),
+                         [(first + idx, frame) for idx, frame in enumerate(held)])
+        with self.grp:
+            self.assertTrue(nuke.toNode(fogbox.CARD_EMITTER).knob('start_frame').hasExpression())
+
+    def test_scales_follow_the_master_seed(self):
+        before = [scale for _, scale in self.keys(fogbox.CARD_SCALES, 'scales')]
+        self.grp['master_seed'].setValue(self.grp['master_seed'].value() + 1)
+        nuke.fireKnobChanged(self.grp, self.grp['master_seed'])
+        after = [scale for _, scale in self.keys(fogbox.CARD_SCALES, 'scales')]
+
+        self.assertEqual(len(set(before)), 6)
+        self.assertNotEqual(before, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+tests for utils.layout: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from utils import layout  # noqa: E402
+
+
+class LayeredLayoutTest(unittest.TestCase):
+
+    def test_nodes_sit_below_their_inputs(self):
+        edges = [('read', 'blur'), ('read', 'grade'), ('blur', 'merge'), ('grade', 'merge'), ('read', 'merge')]
+        positions, clusters = layout.layered_layout(['read', 'blur', 'grade', 'merge'], edges)
+
+        for upstream, downstream in edges:
+            self.assertGreater(positions[downstream][1], positions[upstream][1])
+        self.assertEqual(len(set(positions.values())), 4)
+        self.assertEqual(len(clusters), 1)
+
+    def test_a_node_is_centred_under_its_inputs(self):
+        positions, _ = layout.layered_layout(['a', 'b', 'c'], [('a', 'c'), ('b', 'c'), ('outside', 'a')],
+                                             origin=(100, 50))
+
+        self.assertEqual(positions, {'a': (100, 50), 'b': (210, 50), 'c': (155, 130)})
+
+    def test_clusters_are_packed_into_shelves(self):
+        positions, clusters = layout.layered_layout(list('abcdef'), [('a', 'b'), ('c', 'd'), ('e', 'f')],
+                                                    max_width=200)
+
+        self.assertEqual([cluster.bounds for cluster in clusters],
+                         [(0, 0, 0, 80), (150, 0, 150, 80), (0, 230, 0, 310)])
+        self.assertEqual(positions['e'], (0, 230))
+
+    def test_given_clusters_are_laid_out_separately(self):
+        _, clusters = layout.layered_layout(list('abcd'), [('a', 'b'), ('b', 'c'), ('c', 'd')],
+                                            clusters={'a': 1, 'b': 1, 'c': 2, 'd': 2})
+
+        self.assertEqual(sorted(sorted(cluster.nodes) for cluster in clusters), [['a', 'b'], ['c', 'd']])
+
+
+if __name__ == '__main__':
+    unittest.main()
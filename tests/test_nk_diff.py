@@ -0,0 +1,93 @@
+"""
+tests for tools.nk_diff: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from tools import nk_diff  # noqa: E402
+from tools.nk_diff import Change  # noqa: E402
+
+
+class DiffKnobsTest(unittest.TestCase):
+
+    def test_changed_added_and_removed_knobs(self):
+        changes = nk_diff.diff_knobs('Blur1', [('size', '3'), ('channels', 'rgb')], [('size', '4'), ('mix', '0.5')])
+
+        self.assertEqual(changes, [Change('Blur1', 'knob', 'channels: rgb -> (unset)'),
+                                   Change('Blur1', 'knob', 'mix: (unset) -> 0.5'),
+                                   Change('Blur1', 'knob', 'size: 3 -> 4')])
+
+    def test_numbers_within_tolerance_are_the_same(self):
+        self.assertEqual(nk_diff.diff_knobs('Blur1', [('size', '3')], [('size', '3.0000001')]), [])
+
+    def test_array_knobs_are_compared_channel_by_channel(self):
+        changes = nk_diff.diff_knobs('Grade1', [('white', '{1 1 1 1}')], [('white', '{1 2 1 1}')])
+
+        self.assertEqual(changes, [Change('Grade1', 'knob', 'white[1]: 1 -> 2')])
+
+    def test_curves_are_compared_key_by_key(self):
+        old = [('size', '{{curve x1 2 x10 5}}')]
+
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, [('size', '{{curve x1 2.0 x10 5.0}}')]), [])
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, [('size', '{{curve x1 2 x10 6}}')]),
+                         [Change('Blur1', 'animation', 'size: keys changed at 10')])
+
+    def test_expressions_are_compared_as_text(self):
+        changes = nk_diff.diff_knobs('Blur1', [('size', '{{parent.size}}')], [('size', '{{parent.size*2}}')])
+
+        self.assertEqual([change.kind for change in changes], ['expression'])
+
+
+class DiffRepeatedKnobsTest(unittest.TestCase):
+
+    def test_user_knob_inserted_mid_block_is_one_addition(self):
+        old = [('addUserKnob', '{20 User}'), ('addUserKnob', '{7 mix l Mix}')]
+        new = [('addUserKnob', '{20 User}'), ('addUserKnob', '{3 count}'), ('addUserKnob', '{7 mix l Mix}')]
+
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, new),
+                         [Change('Blur1', 'knob', 'addUserKnob: added {3 count}')])
+
+    def test_removed_and_added_user_knobs(self):
+        old = [('addUserKnob', '{20 User}'), ('addUserKnob', '{6 flag}')]
+        new = [('addUserKnob', '{20 User}'), ('addUserKnob', '{3 count}')]
+
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, new),
+                         [Change('Blur1', 'knob', 'addUserKnob: removed {6 flag}'),
+                          Change('Blur1', 'knob', 'addUserKnob: added {3 count}')])
+
+    def test_duplicate_values_are_counted(self):
+        old = [('addUserKnob', '{26 ""}'), ('addUserKnob', '{26 ""}')]
+        new = [('addUserKnob', '{26 ""}')]
+
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, new),
+                         [Change('Blur1', 'knob', 'addUserKnob: removed {26 ""}')])
+
+    def test_reordering_is_not_a_change(self):
+        old = [('addUserKnob', '{3 a}'), ('addUserKnob', '{3 b}')]
+
+        self.assertEqual(nk_diff.diff_knobs('Blur1', old, old[::-1]), [])
+
+
+class DiffGraphsTest(unittest.TestCase):
+
+    def graph(self, nodes):
+        # {(name, class): (digest, inputs, knobs)}, the digest only has to differ when the node does
+        return dict(((name, node_class), (repr((inputs, knobs)), inputs, knobs))
+                    for name, node_class, inputs, knobs in nodes)
+
+    def test_added_removed_and_reconnected_nodes(self):
+        old = self.graph([('Read1', 'Read', [], []), ('Blur1', 'Blur', ['Read1'], []), ('Dot1', 'Dot', [None], [])])
+        new = self.graph([('Read1', 'Read', [], []), ('Blur1', 'Blur', [None], []), ('Grade1', 'Grade', [], [])])
+
+        self.assertEqual(nk_diff.diff_graphs(old, new), [Change('Blur1', 'connection', 'input 0: Read1 -> None'),
+                                                         Change('Dot1', 'removed', 'Dot'),
+                                                         Change('Grade1', 'added', 'Grade')])
+
+
+if __name__ == '__main__':
+    unittest.main()
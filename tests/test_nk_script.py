@@ -0,0 +1,97 @@
+"""
+tests for utils.nk_script's script reader: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from utils import nk_script  # noqa: E402
+
+SCRIPT = '''Root {
+ inputs 0
+ name /tmp/script.nk
+}
+Read {
+ inputs 0
+ file /shots/a/plate.%04d.exr
+ name Read1
+}
+set N1 [stack 0]
+Blur {
+ size {{curve x1 2 x10 5}}
+ label {two
+lines}
+ name Blur1
+}
+push $N1
+Group {
+ inputs 1
+ name Group1
+}
+ Input {
+  inputs 0
+  name Input1
+ }
+ Grade {
+  white 2
+  name Grade1
+ }
+ Output {
+  name Output1
+ }
+end_group
+Merge2 {
+ inputs 2
+ name Merge1
+}
+push 0
+Dot {
+ name Dot1
+}'''
+
+
+class IterNodesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = dict((node.name, node) for node in nk_script.iter_nodes(SCRIPT.split('\n')))
+
+    def test_nodes_are_connected_through_the_stack(self):
+        connections = [(name, node.node_class, node.inputs) for name, node in sorted(self.nodes.items())]
+
+        self.assertEqual(connections, [('Blur1', 'Blur', ['Read1']),
+                                       ('Dot1', 'Dot', [None]),
+                                       ('Group1', 'Group', ['Read1']),
+                                       ('Group1.Grade1', 'Grade', ['Group1.Input1']),
+                                       ('Group1.Input1', 'Input', []),
+                                       ('Group1.Output1', 'Output', ['Group1.Grade1']),
+                                       ('Merge1', 'Merge2', ['Group1', 'Blur1']),
+                                       ('Read1', 'Read', [])])
+
+    def test_group_contents_know_their_parent(self):
+        self.assertEqual(self.nodes['Group1.Grade1'].parent, 'Group1')
+        self.assertEqual(self.nodes['Group1'].parent, '')
+
+    def test_knob_values_keep_braces_and_line_breaks(self):
+        blur = self.nodes['Blur1']
+
+        self.assertEqual(blur.knob('size'), '{{curve x1 2 x10 5}}')
+        self.assertEqual(blur.knob('label'), '{two\nlines}')
+        self.assertEqual(blur.knob('mix', 'unset'), 'unset')
+
+
+class KnobValuesTest(unittest.TestCase):
+
+    def test_knob_channels(self):
+        self.assertEqual(nk_script.knob_channels('{1 {curve x1 2} 3}'), ['1', '{curve x1 2}', '3'])
+        self.assertEqual(nk_script.knob_channels('0.5'), ['0.5'])
+
+    def test_parse_curve(self):
+        self.assertEqual(nk_script.parse_curve('{curve x1 2 x10 5}'), {1.0: 2.0, 10.0: 5.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
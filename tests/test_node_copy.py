@@ -0,0 +1,75 @@
+"""
+tests for utils.node_copy and the script rewriting it relies on, run against the nuke stand-in in
+benchmarks/standin: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'benchmarks', 'standin'), ROOT]
+
+import nuke  # noqa: E402 - the stand-in
+from utils import nk_script, node_copy  # noqa: E402
+
+CLONE_SCRIPT = '''clone node7f1a2b00|Blur|4242 {
+ size 10
+ name Blur1
+ xpos 10
+ ypos 20
+}
+set C7f1a2b00 [stack 0]
+clone $C7f1a2b00 {
+ xpos 110
+ ypos 20
+}'''
+
+
+class RewriteTopLevelKnobsTest(unittest.TestCase):
+
+    def test_clone_blocks_are_node_blocks(self):
+        seen = []
+
+        def rewrite(node_class, knob, value):
+            seen.append((node_class, knob))
+            if knob == 'xpos':
+                return str(int(value) - 200)
+            return None
+
+        lines = list(nk_script.rewrite_top_level_knobs(CLONE_SCRIPT.split('\n'), rewrite))
+
+        self.assertIn((nk_script.CLONE_CLASS, 'name'), seen)
+        self.assertEqual([line for line in lines if line.startswith(' xpos')], [' xpos -190', ' xpos -90'])
+
+    def test_multi_line_values_and_group_contents(self):
+        script = ['Group {', ' label {line one', 'line two}', ' name Group1', '}', ' Blur {', '  name Blur1', ' }',
+                  'end_group', 'Blur {', ' name Blur1', '}']
+
+        rename = lambda node_class, knob, value: value + '_copy' if knob in ('name', 'label') else None
+        lines = list(nk_script.rewrite_top_level_knobs(script, rename))
+
+        self.assertEqual(lines, ['Group {', ' label {line one\nline two}_copy', ' name Group1_copy', '}', ' Blur {',
+                                 '  name Blur1', ' }', 'end_group', 'Blur {', ' name Blur1_copy', '}'])
+
+
+class DuplicateNodesTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+
+    def test_duplicates_a_selection_holding_a_clone(self):
+        read = nuke.nodes.Read()
+        blur = nuke.nodes.Blur()
+        blur.setInput(0, read)
+        # the stand-in doesn't model clones, the blur reports being one
+        blur.clones = lambda: 1
+
+        duplicates = node_copy.duplicate_nodes([read, blur])
+
+        self.assertEqual([node.name() for node in duplicates], ['Read1_duplicate', 'Blur1_duplicate'])
+        self.assertEqual(duplicates[1].xpos(), blur.xpos() - 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+tests for utils.path's VersionIndex: python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from utils import path  # noqa: E402
+
+
+class VersionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.index = path.VersionIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def touch(self, *names):
+        for name in names:
+            open(os.path.join(self.folder, name), 'w').close()
+
+    def join(self, name):
+        return os.path.join(self.folder, name)
+
+    def test_latest_version_then_take(self):
+        self.touch('comp_v003_t02.nk', 'comp_v004_t01.nk', 'comp_v004_t03.nk', 'comp_v002_t09.nk')
+
+        self.assertEqual(self.index.find_latest(self.join('comp_v003_t02.nk')), self.join('comp_v004_t03.nk'))
+
+    def test_sequences_keep_the_frame_pattern_given(self):
+        self.touch('plate_v001.1001.exr', 'plate_v002.1001.exr', 'plate_v002.1002.exr')
+
+        self.assertEqual(self.index.find_latest(self.join('plate_v001.%04d.exr')), self.join('plate_v002.%04d.exr'))
+        self.assertEqual(self.index.find_latest(self.join('plate_v001.####.exr')), self.join('plate_v002.####.exr'))
+        self.assertEqual(self.index.frame_range(self.join('plate_v002.%04d.exr')), (1001, 1002))
+
+    def test_nothing_on_disk(self):
+        self.assertIsNone(self.index.find_latest(self.join('comp_v001.nk')))
+        self.assertEqual(self.index.frame_range(self.join('plate_v001.%04d.exr')), (None, None))
+
+    def test_each_folder_is_listed_once(self):
+        self.touch('comp_v001.nk')
+        self.index.find_latest(self.join('comp_v001.nk'))
+        self.touch('comp_v002.nk')
+
+        # the new version isn't seen, the first listing is reused
+        self.assertEqual(self.index.find_latest(self.join('comp_v001.nk')), self.join('comp_v001.nk'))
+        self.assertEqual(path.VersionIndex().find_latest(self.join('comp_v001.nk')), self.join('comp_v002.nk'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+tests for tools.version_update, run against the nuke stand-in in benchmarks/standin:
+python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'benchmarks', 'standin'), ROOT]
+
+import nuke  # noqa: E402 - the stand-in
+from tools import version_update  # noqa: E402
+
+
+class FindUpdatesTest(unittest.TestCase):
+
+    def setUp(self):
+        nuke.reset()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def render(self, name, frames=(1001, 1002)):
+        for frame in frames:
+            open(os.path.join(self.folder, name % frame), 'w').close()
+
+    def read(self, name):
+        node = nuke.nodes.Read()
+        node['file'].setValue(os.path.join(self.folder, name))
+        return node
+
+    def test_newer_version_is_found(self):
+        self.render('shot_v003.%04d.exr')
+        self.render('shot_v004.%04d.exr', (1001, 1002, 1003))
+        self.read('shot_v003.%04d.exr')
+
+        updates = version_update.find_updates()
+
+        self.assertEqual([os.path.basename(update.new_path) for update in updates], ['shot_v004.%04d.exr'])
+        self.assertEqual(updates[0].new_range, (1001, 1003))
+
+    def test_older_version_is_not_proposed(self):
+        # v005 isn't rendered yet, v003 is the latest on disk
+        self.render('shot_v003.%04d.exr')
+        self.read('shot_v005.%04d.exr')
+
+        self.assertEqual(version_update.find_updates(), [])
+
+    def test_same_version_of_another_user_is_not_proposed(self):
+        self.render('comp_v004_t01_mg.%04d.exr')
+        self.render('comp_v004_t01_jd.%04d.exr')
+        self.read('comp_v004_t01_mg.%04d.exr')
+
+        self.assertEqual(version_update.find_updates(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
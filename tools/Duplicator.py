@@ -1,4 +1,12 @@
+import time
+import logging
+
 import nuke
+from utils import instrument, node_copy
+from utils.instrument import instrumented
+
+logger = logging.getLogger(__name__)
+
 
 class Duplicator():
     """
@@ -6,56 +14,130 @@ class Duplicator():
     and to concatenate world-space matrices into local-space matrices
     """
 
+    @instrumented()
     def duplicateNode(self):
-        """ duplicates an exact copy of the selected node, including all animations """
+        """ duplicates an exact copy of the selected nodes, including all animations """
 
-        try:
-            self.__duplicate(nuke.selectedNode())
-        except:
+        nodes = nuke.selectedNodes()
+        if not nodes:
             nuke.message("Error - no node selected")
+            return
+
+        node_copy.duplicate_nodes(nodes)
 
-    def bakeCameraSpace(self):
+    @instrumented()
+    def bakeCameraSpace(self, static=False, keepExpression=False):
         """
         takes a camera that has had it's position altered (typically by an axis) and bakes it's altered world
         space into a new camera node
+
+        static: sample the world_matrix over the script frame range and write it as keyframes instead of
+                linking the new camera to the source with a live expression
+        keepExpression: only used with static - frames outside the baked range fall back to the live expression
         """
 
         try:
-            if nuke.selectedNode().Class() == "Camera2":
-                self.__bakeWorldSpace(nuke.selectedNode())
-            else:
-                nuke.message("Selected node must be a Camera node")
-        except:
+            camNode = nuke.selectedNode()
+        except ValueError:
             nuke.message("Error - no node selected.")
+            return
 
-    # "private" methods
+        if camNode.Class() != "Camera2":
+            nuke.message("Selected node must be a Camera node")
+            return
 
-    def __duplicate(self, node):
+        try:
+            self.__bakeWorldSpace(camNode, static, keepExpression)
+        except (NameError, RuntimeError, ValueError) as e:
+            # knob errors from the bake are reported rather than mistaken for an empty selection
+            logger.exception("baking %s failed" % camNode.name())
+            nuke.message("Error - could not bake %s: %s" % (camNode.name(), e))
 
-        old = node
-        new = nuke.createNode(old.Class())
+    def bakeCameraSpaceStatic(self):
+        """ menu-friendly shortcut for bakeCameraSpace(static=True, keepExpression=True) """
 
-        # duplicate all knobs
-        newKnobs = new.knobs()
-        oldKnobs = old.knobs()
+        self.bakeCameraSpace(static=True, keepExpression=True)
 
-        for knob in newKnobs:
-            # get the same knob and copy values across
-            new[knob].fromScript(old[knob].toScript())
+    def benchmarkBakeModes(self, iterations=3):
+        """
+        bakes the selected camera once per mode and times how long it takes to evaluate the new camera's matrix
+        over the script frame range. The temporary cameras are deleted afterwards.
+        @return: dict of {mode: seconds}
+        """
+
+        camNode = nuke.selectedNode()
+        first, last = _rootFrameRange()
+
+        modes = (('expression', False, False),
+                 ('static', True, False),
+                 ('static+expression', True, True))
+        results = {}
 
-        # set new DAG position for Node
-        new.setXpos(old.xpos() - 200)
-        new.setYpos(old.ypos())
+        for mode, static, keepExpression in modes:
+            newCam = self.__bakeWorldSpace(camNode, static, keepExpression)
+            matrix = newCam["matrix"]
 
-        newNodeName = old.name() + '_duplicate'
-        new['name'].setValue(newNodeName)
-        new.setInput(0, None)
+            start = time.time()
+            for _ in range(iterations):
+                for frame in range(first, last + 1):
+                    matrix.valueAt(frame)
+            results[mode] = time.time() - start
 
-        return new
+            nuke.delete(newCam)
+            logger.info("%s: %.4fs for %d evaluations" % (mode, results[mode], iterations * (last - first + 1)))
 
-    def __bakeWorldSpace(self, camNode):
+        return results
+
+    # "private" methods
+
+    def __duplicate(self, node):
+        # serialised copy/paste keeps all animation without copying knobs one by one
+        return node_copy.duplicate_nodes([node])[0]
+
+    def __bakeWorldSpace(self, camNode, static=False, keepExpression=False):
         # takes a camera and bake a new local matrix
         newCam = self.__duplicate(camNode)
         newCam["useMatrix"].setValue(True)
-        newCam["matrix"].setExpression("%s.world_matrix" % camNode.name())
-        return
+
+        if not static:
+            newCam["matrix"].setExpression("%s.world_matrix" % camNode.name())
+            return newCam
+
+        first, last = _rootFrameRange()
+        samples = sampleMatrix(camNode["world_matrix"], first, last)
+        writeMatrixKeys(newCam["matrix"], samples, first)
+
+        if keepExpression:
+            # 'curve' is the baked animation, the live link is only evaluated outside of the baked range
+            newCam["matrix"].setExpression("frame < %d || frame > %d ? %s.world_matrix : curve"
+                                           % (first, last, camNode.name()))
+
+        return newCam
+
+
+def sampleMatrix(knob, first, last):
+    """
+    samples a 4x4 matrix knob once per frame, reading all 16 values in a single call
+    @return: list of 16-element lists, one per frame from first to last
+    """
+    instrument.count('nuke.valueAt', last - first + 1)
+    return [list(knob.valueAt(frame)) for frame in range(first, last + 1)]
+
+
+def writeMatrixKeys(knob, samples, first):
+    """
+    replaces any existing animation/expression on a matrix knob with keyframes built from samples.
+    keys are added per channel in one call rather than with a setValueAt per frame
+    """
+    knob.clearAnimated()
+    knob.setAnimated()
+
+    for i in range(16):
+        keys = [nuke.AnimationKey(first + offset, values[i]) for offset, values in enumerate(samples)]
+        knob.animation(i).addKey(keys)
+    instrument.count('nuke.addKey', 16)
+
+
+def _rootFrameRange():
+    root = nuke.root()
+    return int(root['first_frame'].value()), int(root['last_frame'].value())
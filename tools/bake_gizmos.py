@@ -0,0 +1,62 @@
+"""
+bake_gizmos
+
+command line tool that replaces the gizmos of a .nk script with inline groups, without nuke.
+the script is streamed, so memory use doesn't grow with its size. each gizmo becomes a Group holding
+the gizmo's contents and the instance's knob values, named as dag_utils.convert_to_group names it.
+
+usage: python -m tools.bake_gizmos input.nk output.nk [--gizmo-path DIR ...]
+"""
+
+import argparse
+import logging
+import sys
+
+from utils import nk_script
+
+logger = logging.getLogger(__name__)
+
+
+def bake_gizmos(input_path, output_path, gizmo_paths=None):
+    """
+    writes input_path to output_path with every gizmo found on gizmo_paths expanded to a group
+    @param gizmo_paths: directories searched for .gizmo files, defaults to NUKE_PATH and ~/.nuke
+    @return: dict of {gizmo class: number of instances expanded}
+    """
+    if gizmo_paths is None:
+        gizmo_paths = nk_script.default_gizmo_paths()
+
+    library = nk_script.GizmoLibrary(gizmo_paths)
+    counts = {}
+
+    with open(input_path) as src:
+        with open(output_path, 'w') as dst:
+            for line in nk_script.expand_gizmos(src, library, counts):
+                dst.write(line + '\n')
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replace the gizmos of a Nuke script with groups.')
+    parser.add_argument('input', help='script to read')
+    parser.add_argument('output', help='script to write (must not be the input)')
+    parser.add_argument('--gizmo-path', action='append', dest='gizmo_paths',
+                        help='directory to search for .gizmo files, can be repeated (default: NUKE_PATH and ~/.nuke)')
+    args = parser.parse_args(argv)
+
+    if args.input == args.output:
+        parser.error('the output has to be a different file from the input')
+
+    counts = bake_gizmos(args.input, args.output, args.gizmo_paths)
+
+    for gizmo_class in sorted(counts):
+        logger.info('{}: {} replaced'.format(gizmo_class, counts[gizmo_class]))
+    logger.info('{} gizmos replaced in total'.format(sum(counts.values())))
+
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -5,6 +5,8 @@ concatenates all downstream world-space transforms and bakes it out to a new cam
 """
 
 import nuke
+from utils import instrument, node_copy
+from utils.instrument import instrumented
 
 
 def get_concat_matrices_at_frame(node_list):
@@ -22,6 +24,7 @@ def get_concat_matrices_at_frame(node_list):
             new_mat = nuke.math.Matrix4()
             for i in range(0, 16):
                 new_mat[i] = each[req_matrix[this_class]].valueAt(nuke.frame())[i]
+            instrument.count('nuke.valueAt', 16)
             mat_list.append(new_mat)
 
             # check if it's transformgeo and if so... get the parent axis world_matrix too
@@ -34,6 +37,7 @@ def get_concat_matrices_at_frame(node_list):
 
                         for i in range(0, 16):
                             axis_mat[i] = in_node[req_matrix[in_node.Class()]].valueAt(nuke.frame())[i]
+                        instrument.count('nuke.valueAt', 16)
 
                         mat_list.append(axis_mat)
 
@@ -48,6 +52,7 @@ def get_concat_matrices_at_frame(node_list):
     return result_mat
 
 
+@instrumented()
 def bake_out_new_cam(sel_node):
     """
         walk back up the tree until you find the camera
@@ -62,12 +67,12 @@ def bake_out_new_cam(sel_node):
 
     tree_list = []
 
-    while 'Camera' not in this_node.Class():
+    while this_node is not None and 'Camera' not in this_node.Class():
 
         tree_list.append(this_node)
         this_node = this_node.input(0)
 
-    if this_node.Class() == 'Camera2' or this_node.Class() == 'Camera':
+    if this_node is not None and this_node.Class() in ('Camera2', 'Camera'):
         cam_node = this_node
         tree_list.append(cam_node)
 
@@ -87,33 +92,10 @@ def bake_out_new_cam(sel_node):
 
         for i in range(0, 16):
             concat_cam['matrix'].setValueAt(result_mat[i], nuke.frame(), i)
+        instrument.count('nuke.setValueAt', 16)
 
 # helper methods
 
 
 def _duplicate(node):
-    old = node
-    new = nuke.createNode(old.Class())
-
-    # duplicate all knobs
-    newKnobs = new.knobs()
-    oldKnobs = old.knobs()
-
-    for knob in newKnobs:
-        # get the same knob and copy values across
-        new[knob].fromScript(old[knob].toScript())
-
-    # set new DAG position for Node
-    new.setXpos(old.xpos() - 200)
-    new.setYpos(old.ypos())
-
-    idx = ''
-
-    newNodeName = old.name() + '_duplicate' + idx
-    new.setName(newNodeName, uncollide=True)
-
-    new.setInput(0, None)
-
-    return new
-
-
+    return node_copy.duplicate_nodes([node])[0]
@@ -0,0 +1,313 @@
+"""
+colorspace manager
+
+lists every Read in the script with its colorspace so they can be filtered by path or colorspace,
+grouped by sequence and changed in bulk. replaces the checkbox panel in dag_utils.changeColorPanel
+"""
+
+import os
+import re
+import logging
+
+import nuke
+from Qt import QtCore
+from Qt.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, QLineEdit, QComboBox,
+                          QCheckBox, QPushButton, QLabel, QAbstractItemView)
+
+from utils.path import Sequence
+from utils.dag_utils import lutList
+
+logger = logging.getLogger(__name__)
+
+ALL_COLORSPACES = 'all colorspaces'
+
+COLUMNS = ('Read', 'File', 'Colorspace')
+
+# {file knob value: (label, sequence key)} - shared by every panel, file paths don't change their label
+_labels = {}
+
+
+def read_label(file_path):
+    """
+    @return: (label, sequence key) for a Read's file path, computed once per path
+    """
+    cached = _labels.get(file_path)
+    if cached is None:
+        seq = Sequence(file_path)
+        if seq.is_valid():
+            cached = (seq.basename(), seq.to_sync_path())
+        else:
+            cached = (os.path.basename(file_path).split('.')[0], file_path)
+        _labels[file_path] = cached
+    return cached
+
+
+class ReadRow(object):
+    """
+    one row of the table: a single Read, or every Read of a sequence when grouped
+    """
+
+    __slots__ = ('names', 'label', 'file', 'key', 'colorspace')
+
+    def __init__(self, names, label, file_path, key, colorspace):
+        self.names = names
+        self.label = label
+        self.file = file_path
+        self.key = key
+        self.colorspace = colorspace
+
+
+def collect_reads(grouped=False):
+    """
+    reads the file and colorspace of every Read in one pass
+    @param grouped: one row per sequence instead of one per Read. Reads of a sequence with different
+                    colorspaces get a row per colorspace
+    @rtype: list of L{ReadRow}
+    """
+    rows = []
+    groups = {}
+
+    for node in nuke.allNodes('Read'):
+        file_path = node['file'].value()
+        colorspace = node['colorspace'].value()
+        label, key = read_label(file_path)
+
+        if grouped:
+            row = groups.get((key, colorspace))
+            if row is not None:
+                row.names.append(node.name())
+                continue
+            row = groups[(key, colorspace)] = ReadRow([node.name()], label, key, key, colorspace)
+        else:
+            row = ReadRow([node.name()], label, file_path, key, colorspace)
+        rows.append(row)
+
+    return rows
+
+
+def set_colorspace(node_names, colorspace):
+    """
+    sets the colorspace of the named Reads in a single undo step
+    @return: the names of the Reads changed
+    """
+    changed = []
+
+    undo = nuke.Undo()
+    undo.begin('Change Read colorspace')
+    try:
+        for name in node_names:
+            node = nuke.toNode(name)
+            if node is None:
+                logger.warning('{} no longer exists, skipping'.format(name))
+                continue
+            node['colorspace'].setValue(colorspace)
+            changed.append(name)
+    finally:
+        undo.end()
+
+    return changed
+
+
+class ReadTableModel(QtCore.QAbstractTableModel):
+
+    def __init__(self, parent=None):
+        QtCore.QAbstractTableModel.__init__(self, parent)
+        self.rows = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self.rows[index.row()]
+        column = index.column()
+
+        if role == QtCore.Qt.DisplayRole:
+            if column == 0:
+                if len(row.names) > 1:
+                    return '{} ({} Reads)'.format(row.label, len(row.names))
+                return '{} [{}]'.format(row.label, row.names[0])
+            if column == 1:
+                return row.file
+            return row.colorspace
+
+        if role == QtCore.Qt.ToolTipRole:
+            return '\n'.join(row.names)
+
+        return None
+
+    def refresh(self, grouped=False):
+        self.beginResetModel()
+        self.rows = collect_reads(grouped)
+        self.endResetModel()
+
+    def colorspaces(self):
+        return sorted(set(row.colorspace for row in self.rows))
+
+    def set_colorspace(self, row_numbers, colorspace):
+        """
+        changes the Reads of the given rows and updates the rows in place
+        """
+        names = []
+        for row_number in row_numbers:
+            names.extend(self.rows[row_number].names)
+
+        changed = set(set_colorspace(names, colorspace))
+
+        for row_number in row_numbers:
+            row = self.rows[row_number]
+            if changed.intersection(row.names):
+                row.colorspace = colorspace
+                index = self.index(row_number, COLUMNS.index('Colorspace'))
+                self.dataChanged.emit(index, index)
+
+
+class ReadFilterModel(QtCore.QSortFilterProxyModel):
+    """
+    filters on a path pattern (glob style, matched against the file and label) and a colorspace
+    """
+
+    def __init__(self, parent=None):
+        QtCore.QSortFilterProxyModel.__init__(self, parent)
+        self.pattern = None
+        self.colorspace = None
+
+    def set_pattern(self, text):
+        text = text.strip()
+        if text:
+            # plain words match anywhere, * and ? work like a glob
+            self.pattern = re.compile('.*'.join(re.escape(part) for part in text.split('*')).replace('\\?', '.'),
+                                      re.IGNORECASE)
+        else:
+            self.pattern = None
+        self.invalidateFilter()
+
+    def set_colorspace(self, colorspace):
+        self.colorspace = None if colorspace == ALL_COLORSPACES else colorspace
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        row = self.sourceModel().rows[source_row]
+        if self.colorspace is not None and row.colorspace != self.colorspace:
+            return False
+        if self.pattern is not None and not (self.pattern.search(row.file) or self.pattern.search(row.label)):
+            return False
+        return True
+
+
+class ColorspaceManager(QWidget):
+
+    def __init__(self, parent=None):
+        QWidget.__init__(self, parent)
+
+        self.setLayout(QVBoxLayout())
+
+        self.model = ReadTableModel(self)
+        self.proxy = ReadFilterModel(self)
+        self.proxy.setSourceModel(self.model)
+
+        # filters
+        self.pattern_edit = QLineEdit()
+        self.pattern_edit.setPlaceholderText('filter by path, eg. */plates/*')
+        self.pattern_edit.textChanged.connect(self.proxy.set_pattern)
+
+        self.colorspace_filter = QComboBox()
+        self.colorspace_filter.currentIndexChanged.connect(self._filter_colorspace)
+
+        self.group_check = QCheckBox('group by sequence')
+        self.group_check.toggled.connect(lambda checked: self.refresh())
+
+        refresh_button = QPushButton('Refresh')
+        refresh_button.clicked.connect(lambda: self.refresh())
+
+        filters = QHBoxLayout()
+        filters.addWidget(self.pattern_edit)
+        filters.addWidget(self.colorspace_filter)
+        filters.addWidget(self.group_check)
+        filters.addWidget(refresh_button)
+
+        # the table only creates the rows in view, so it stays quick with hundreds of Reads
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setDefaultSectionSize(20)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        # bulk apply
+        self.new_colorspace = QComboBox()
+        self.new_colorspace.addItems(lutList())
+        apply_button = QPushButton('Apply to selected')
+        apply_button.clicked.connect(self.apply)
+
+        apply_row = QHBoxLayout()
+        apply_row.addWidget(QLabel('new colorspace'))
+        apply_row.addWidget(self.new_colorspace)
+        apply_row.addStretch()
+        apply_row.addWidget(apply_button)
+
+        self.layout().addLayout(filters)
+        self.layout().addWidget(self.table)
+        self.layout().addLayout(apply_row)
+
+        self.refresh()
+
+    def refresh(self):
+        self.model.refresh(self.group_check.isChecked())
+        self._update_colorspace_filter()
+
+    def apply(self):
+        rows = sorted(set(self.proxy.mapToSource(index).row()
+                          for index in self.table.selectionModel().selectedRows()))
+        if not rows:
+            return
+        self.model.set_colorspace(rows, self.new_colorspace.currentText())
+        self._update_colorspace_filter()
+
+    def closeEvent(self, event):
+        global cm
+        if cm is not None:
+            cm = None
+
+    def _filter_colorspace(self, idx):
+        self.proxy.set_colorspace(self.colorspace_filter.itemText(idx))
+
+    def _update_colorspace_filter(self):
+        current = self.colorspace_filter.currentText() or ALL_COLORSPACES
+        self.colorspace_filter.blockSignals(True)
+        self.colorspace_filter.clear()
+        self.colorspace_filter.addItems([ALL_COLORSPACES] + self.model.colorspaces())
+        idx = self.colorspace_filter.findText(current)
+        self.colorspace_filter.setCurrentIndex(max(idx, 0))
+        self.colorspace_filter.blockSignals(False)
+        self._filter_colorspace(self.colorspace_filter.currentIndex())
+
+
+# standard Nuke-fu to persist the window. the dockable panel is registered by menu.py
+cm = None
+
+
+def display_colorspace_manager():
+    global cm
+
+    if cm is None:
+        cm = ColorspaceManager()
+        cm.show()
+
+    else:
+        cm.refresh()
+        cm.activateWindow()
@@ -16,12 +16,38 @@ Card1.translate - (1 * pow(Card1.translate-Card4.translate, -NoOp1.scalar))
 
 """
 
+import json
+import time
 import nuke
 import logging
-from random import randint, choice
+from random import Random, randint, choice
+
+from utils import instrument, node_copy, node_utils
+from utils.instrument import instrumented
 
 logger = logging.getLogger(__name__)
 
+# name given to the Scene node gathering the cards, used to find it again on update
+CARDS_SCENE = 'cards_scene'
+
+# names of the compact build's point cloud, emitter, frame lookup and per-card scales, used to find them
+# again on update
+CARD_POINTS = 'card_points'
+CARD_EMITTER = 'card_emitter'
+CARD_FRAMES = 'card_frames'
+CARD_SCALES = 'card_scales'
+
+# knobChanged scripts run where nothing has bound this module, so they load it through the registry, importing
+# it on the first callback of a session
+KNOB_CHANGED = '__import__("utils.registry").registry.load("tools.fogbox").knob_changed()'
+CUBE_CHANGED = '__import__("utils.registry").registry.load("tools.fogbox").cube_changed()'
+
+# group knobs that a static layout has to be recomputed for
+LAYOUT_KNOBS = ('master_seed', 'num_cards', 'card_scale', 'scale_var', 'xyz_var', 'exp_scale', 'static_layout')
+
+# group knobs saved alongside an exported layout
+LAYOUT_SETTINGS = ('master_seed', 'num_cards', 'card_scale', 'scale_var', 'xyz_var', 'exp_scale', 'seq_input', 'compact')
+
 
 def create_cube():
     logger.debug("creating cube")
@@ -41,12 +67,17 @@ def create_cube():
     cube.knob('pivot').setExpression('cube.y - ((cube.y - cube.t)/2)', 1)
     cube.knob('pivot').setExpression('cube.f - ((cube.f - cube.n)/2)', 2)
 
+    # a static card layout has to follow the cube bounds
+    cube.knob('knobChanged').setValue(CUBE_CHANGED)
+
     return cube
 
 
-def create_card(cube, group, card_idx=1, ):
+def create_card(cube, group, card_idx=1, seed=None, sign=None):
     logger.debug("creating card with index: {}".format(card_idx))
     card = nuke.nodes.Card()
+    # other cards refer to Card1 by name, so keep names in step with the card index
+    card.setName('Card{}'.format(card_idx))
 
     # get the cube 'name' as we'll need it a few times
     c_name = cube.name()
@@ -57,24 +88,34 @@ def create_card(cube, group, card_idx=1, ):
     card.addKnob(card_id_knob)
 
     card_seed_knob = nuke.Int_Knob('seed', 'seed')
-    card_seed_knob.setValue(generate_seed())
+    card_seed_knob.setValue(generate_seed() if seed is None else seed)
     card.addKnob(card_seed_knob)
 
     card_trans_z_formula = nuke.Double_Knob('card_trans_z')
-    card_trans_z_formula.setExpression("(({0}.cube.f - (((abs({0}.cube.f - {0}.cube.n)/{1})*card_id)) / exp_scale) + (random(seed) * seed_sign) * xyz_var.z)".format(c_name, int(group.knob('num_cards').value()) + 1))
     card_trans_z_formula.setVisible(False)
     card.addKnob(card_trans_z_formula)
 
     seed_sign = nuke.Int_Knob('seed_sign')
-    seed_sign.setValue(choice([-1, 1]))
+    seed_sign.setValue(choice([-1, 1]) if sign is None else sign)
     seed_sign.setVisible(False)
 
     card.addKnob(seed_sign)
+    instrument.count('nuke.setValue', 3)
+
+    if group.knob('static_layout') is None or not group.knob('static_layout').value():
+        _set_card_expressions(card, c_name)
+
+    return card
+
+
+def _set_card_expressions(card, c_name):
+
+    card.knob('card_trans_z').setExpression("(({0}.cube.f - (((abs({0}.cube.f - {0}.cube.n)/(num_cards + 1))*card_id)) / exp_scale) + (random(seed) * seed_sign) * xyz_var.z)".format(c_name))
 
     # setup the expressions for the transforms
     t_knob = card.knob('translate')
-    if card_idx == 1:
-        t_knob.setExpression("(({0}.cube.f - ((abs({0}.cube.f - {0}.cube.n)/{1})*card_id)) + (random(seed) * seed_sign) * xyz_var.z)".format(c_name, int(group.knob('num_cards').value()) + 1), 2)
+    if card.knob('card_id').value() == 1:
+        t_knob.setExpression("(({0}.cube.f - ((abs({0}.cube.f - {0}.cube.n)/(num_cards + 1))*card_id)) + (random(seed) * seed_sign) * xyz_var.z)".format(c_name), 2)
     else:
         t_knob.setExpression("card_trans_z < Card1.translate ? card_trans_z : Card1.translate", 2)
 
@@ -88,8 +129,369 @@ def create_card(cube, group, card_idx=1, ):
     s_knob.setExpression("abs({0}.cube.f - {0}.cube.n)".format(c_name), 2)
 
     card.knob('uniform_scale').setExpression("card_scale + (scale_var * (random(seed) * seed_sign))")
+    instrument.count('nuke.setExpression', 9)
 
-    return card
+
+def compute_static_layout(cube_bounds, card_ids, seeds, signs, card_count, exp_scale, xyz_var, card_scale, scale_var):
+    """
+    computes the placement of every card in one vectorised pass. this mirrors the TCL expressions
+    set by _set_card_expressions, except that random(seed) is replaced by a hash of the seed,
+    so a static layout won't match the expression layout card for card.
+
+    @param cube_bounds: (x, y, n, r, t, f) of the cube
+    @param card_ids, seeds, signs: sequences with one entry per card
+    @return: dict of numpy arrays - 'translate' (N, 3), 'scaling' (3,), 'uniform_scale' (N,)
+    """
+    import numpy as np
+
+    x, y, n, r, t, f = [float(v) for v in cube_bounds]
+    ids = np.asarray(card_ids, dtype=np.float64)
+    rand = _seed_random(seeds) * np.asarray(signs, dtype=np.float64)
+
+    tx = (r - abs(r - x) / 2) + ((r - x) / 2 * rand) * xyz_var[0]
+    ty = (t - abs(t - y) / 2) + ((t - y) / 2 * rand) * xyz_var[1]
+
+    step = abs(f - n) / (card_count + 1)
+    first_z = (f - step * ids) + rand * xyz_var[2]
+    trans_z = ((f - step * ids) / exp_scale) + rand * xyz_var[2]
+
+    # every card is clamped in front of Card1, which is never scaled by exp_scale
+    is_first = ids == 1
+    card1_z = first_z[is_first][0] if is_first.any() else np.inf
+    tz = np.where(is_first, first_z, np.minimum(trans_z, card1_z))
+
+    return {
+        'translate': np.column_stack((tx, ty, tz)),
+        'scaling': np.array([abs(x - r), abs(y - t), abs(f - n)]),
+        'uniform_scale': card_scale + scale_var * rand,
+    }
+
+
+def apply_static_layout(grp):
+    """
+    replaces the card expressions with static values computed by compute_static_layout
+    """
+    grp.begin()
+
+    cards = _cards_by_id(grp)
+    card_ids = sorted(cards)
+    ordered = [cards[card_idx] for card_idx in card_ids]
+
+    layout = compute_static_layout(
+        nuke.toNode('Cube1').knob('cube').value(),
+        card_ids,
+        [card.knob('seed').value() for card in ordered],
+        [card.knob('seed_sign').value() for card in ordered],
+        int(grp.knob('num_cards').value()),
+        grp.knob('exp_scale').value(),
+        grp.knob('xyz_var').value(),
+        grp.knob('card_scale').value(),
+        grp.knob('scale_var').value())
+
+    scaling = layout['scaling'].tolist()
+    for card, translate, uniform_scale in zip(ordered, layout['translate'].tolist(), layout['uniform_scale'].tolist()):
+        for knob_name in ('card_trans_z', 'translate', 'scaling', 'uniform_scale'):
+            card.knob(knob_name).clearAnimated()
+
+        card.knob('translate').setValue(translate)
+        card.knob('scaling').setValue(scaling)
+        card.knob('uniform_scale').setValue(uniform_scale)
+    instrument.count('nuke.clearAnimated', 4 * len(ordered))
+    instrument.count('nuke.setValue', 3 * len(ordered))
+
+    grp.end()
+
+
+def restore_expression_layout(grp):
+    """
+    puts the live TCL expressions back on every card
+    """
+    grp.begin()
+
+    c_name = nuke.toNode('Cube1').name()
+    for card in _cards_by_id(grp).values():
+        _set_card_expressions(card, c_name)
+
+    grp.end()
+
+
+def knob_changed():
+    """
+    knobChanged callback for the fogbox group
+    """
+    grp = nuke.thisNode()
+    knob = nuke.thisKnob()
+
+    if knob.name() == 'inputChange':
+        refresh_input_range(grp)
+
+    if _is_compact(grp):
+        # held frames follow the input range and seq_input as well as the seeds
+        if knob.name() in LAYOUT_KNOBS + ('seq_input', 'inputChange'):
+            apply_compact_layout(grp)
+        return
+
+    if knob.name() == 'master_seed':
+        reseed_cards(grp)
+
+    if knob.name() == 'num_cards':
+        logger.debug("changing card numbers to {}".format(knob.value()))
+        update()
+
+    if knob.name() == 'static_layout' and not knob.value():
+        restore_expression_layout(grp)
+
+    elif knob.name() in LAYOUT_KNOBS and _is_static(grp):
+        apply_static_layout(grp)
+
+
+def cube_changed():
+    """
+    knobChanged callback for the cube inside the group: a static layout follows the cube bounds
+    """
+    if nuke.thisKnob().name() != 'cube':
+        return
+
+    if _is_compact(nuke.thisParent()):
+        apply_compact_layout(nuke.thisParent())
+    elif _is_static(nuke.thisParent()):
+        apply_static_layout(nuke.thisParent())
+
+
+def refresh_input_range(grp):
+    """
+    points the hidden input_first/input_last knobs read by the cards' FrameHolds at the frame range of the
+    top node above the group's input. a top node with first/last knobs, like a Read, is followed by an
+    expression on the group, so edits to its range or file reach every card without an update. any other
+    top node's range, or the script's without an input, is cached until the input changes
+    """
+    _ensure_input_range_knobs(grp)
+
+    top = _top_node(grp)
+    first, last = _input_range(top)
+    for knob_name, value, source in (('input_first', first, 'first'), ('input_last', last, 'last')):
+        knob = grp.knob(knob_name)
+        knob.clearAnimated()
+        knob.setValue(value)
+        if top is not None and top.knob(source) is not None:
+            # evaluated once for the group rather than on every card
+            knob.setExpression('[topnode this.input].{}'.format(source))
+
+
+def _top_node(grp):
+    # same node as [topnode this.input], None without an input
+    node = grp.input(0)
+    while node is not None and node.input(0) is not None:
+        node = node.input(0)
+    return node
+
+
+def _input_range(top):
+    if top is None:
+        return int(nuke.root()['first_frame'].value()), int(nuke.root()['last_frame'].value())
+
+    if top.knob('first') is not None and top.knob('last') is not None:
+        return int(top.knob('first').value()), int(top.knob('last').value())
+
+    return top.firstFrame(), top.lastFrame()
+
+
+def _ensure_input_range_knobs(grp):
+    for knob_name in ('input_first', 'input_last'):
+        if grp.knob(knob_name) is None:
+            knob = nuke.Int_Knob(knob_name)
+            knob.setVisible(False)
+            grp.addKnob(knob)
+
+
+def _is_static(grp):
+    return grp.knob('static_layout') is not None and grp.knob('static_layout').value()
+
+
+def _seed_random(seeds):
+    """
+    vectorised stand-in for TCL's random(seed): hashes each seed to a float in [0, 1)
+    """
+    import numpy as np
+
+    h = np.asarray(seeds, dtype=np.int64).astype(np.uint64) & np.uint64(0xffffffff)
+    for _ in range(2):
+        h = ((h >> np.uint64(16)) ^ h) * np.uint64(0x45d9f3b) & np.uint64(0xffffffff)
+    h = (h >> np.uint64(16)) ^ h
+
+    return h.astype(np.float64) / float(2 ** 32)
+
+
+def card_frames(seeds, first, last, seq_input=False):
+    """
+    the frame of the input each card holds, as set on the per-card FrameHolds by _add_card:
+    in card order with seq_input, otherwise picked by the card's seed
+    @param seeds: one seed per card, in card order
+    @return: list of int
+    """
+    if seq_input:
+        return [first + idx for idx in range(len(seeds))]
+
+    span = last - first
+    if span <= 0:
+        return [first] * len(seeds)
+    return [first + int((abs(seed) + span) % span) for seed in seeds]
+
+
+def generate_card_params(master_seed, card_count):
+    """
+    draws every card's seed and seed sign in one pass from master_seed. this is plain python, so the
+    expression build doesn't need numpy. values are drawn card by card, so the first N cards get the
+    same values whatever the card count. only random() is used, which gives the same sequence for a seed
+    on python 2 and 3
+    @return: dict of lists of length card_count - 'card_id', 'seed', 'seed_sign'
+    """
+    rng = Random(int(master_seed))
+    seeds = []
+    signs = []
+
+    for _ in range(card_count):
+        # same range and sign rule as generate_seed
+        seed = 1000 + int(rng.random() * 9000)
+        seeds.append(-seed if seed % 2 == 0 else seed)
+        signs.append(-1 if rng.random() < 0.5 else 1)
+
+    return {'card_id': list(range(1, card_count + 1)), 'seed': seeds, 'seed_sign': signs}
+
+
+def reseed_cards(grp):
+    """
+    gives every card of the group the seed and sign generated from the group's master seed
+    """
+    grp.begin()
+
+    cards = _cards_by_id(grp)
+    seeds, signs = _card_seeds(grp, max(cards) if cards else 0)
+    for card_idx, card in cards.items():
+        card.knob('seed').setValue(seeds[card_idx - 1])
+        card.knob('seed_sign').setValue(signs[card_idx - 1])
+    instrument.count('nuke.setValue', 2 * len(cards))
+
+    grp.end()
+
+
+def export_layout(grp, file_path):
+    """
+    saves the finished layout of a fogbox - the group settings and every card's seed, sign and transforms -
+    so it can be reloaded with import_layout without regenerating anything. held frames aren't saved,
+    they follow from the seeds and the input's frame range.
+    the format is picked from the extension: .npz, otherwise json
+    """
+    import numpy as np
+
+    settings = dict((name, grp.knob(name).value()) for name in LAYOUT_SETTINGS if grp.knob(name) is not None)
+    cards = _read_layout(grp)
+
+    if file_path.endswith('.npz'):
+        np.savez_compressed(file_path, settings=json.dumps(settings), **cards)
+    else:
+        with open(file_path, 'w') as f:
+            json.dump({'settings': settings, 'cards': dict((k, v.tolist()) for k, v in cards.items())}, f)
+
+
+def import_layout(grp, file_path):
+    """
+    applies a layout written by export_layout to a fogbox group of the same kind (compact or not).
+    the card values are written as a static layout
+    """
+    import numpy as np
+
+    if file_path.endswith('.npz'):
+        data = np.load(file_path)
+        settings = json.loads(str(data['settings']))
+        cards = dict((k, data[k]) for k in data.files if k != 'settings')
+    else:
+        with open(file_path) as f:
+            data = json.load(f)
+        settings = data['settings']
+        cards = dict((k, np.asarray(v)) for k, v in data['cards'].items())
+
+    if bool(settings.get('compact')) != bool(_is_compact(grp)):
+        raise ValueError('{} holds a {}compact layout'.format(file_path, '' if settings.get('compact') else 'non-'))
+
+    for name, value in settings.items():
+        if name != 'compact' and grp.knob(name) is not None:
+            grp.knob(name).setValue(value)
+
+    if _is_compact(grp):
+        grp.begin()
+        try:
+            coords = ' '.join('{:.6f}'.format(v) for v in cards['translate'].ravel())
+            _set_knob(nuke.toNode(CARD_POINTS), 'serializePoints', '{} {}'.format(len(cards['translate']), coords))
+            if 'uniform_scale' in cards and nuke.toNode(CARD_SCALES) is not None:
+                _set_keys(nuke.toNode(CARD_SCALES).knob('scales'), cards['uniform_scale'].tolist())
+        finally:
+            grp.end()
+        return
+
+    update(grp)
+    grp.knob('static_layout').setValue(True)
+
+    grp.begin()
+
+    nodes = _cards_by_id(grp)
+    for row, card_idx in enumerate(cards['card_id'].tolist()):
+        card = nodes[card_idx]
+        for knob_name in ('card_trans_z', 'translate', 'scaling', 'uniform_scale'):
+            card.knob(knob_name).clearAnimated()
+
+        card.knob('seed').setValue(int(cards['seed'][row]))
+        card.knob('seed_sign').setValue(int(cards['seed_sign'][row]))
+        card.knob('translate').setValue(cards['translate'][row].tolist())
+        card.knob('scaling').setValue(cards['scaling'][row].tolist())
+        card.knob('uniform_scale').setValue(float(cards['uniform_scale'][row]))
+
+    grp.end()
+
+
+def _read_layout(grp):
+    import numpy as np
+
+    grp.begin()
+
+    if _is_compact(grp):
+        card_count = int(grp.knob('num_cards').value())
+        params = generate_card_params(grp.knob('master_seed').value(), card_count)
+        points = nuke.toNode(CARD_POINTS).knob('serializePoints').value().split()
+        layout = {
+            'card_id': np.asarray(params['card_id']),
+            'seed': np.asarray(params['seed'], dtype=np.int64),
+            'seed_sign': np.asarray(params['seed_sign'], dtype=np.int64),
+            'translate': np.asarray(points[1:], dtype=np.float64).reshape(-1, 3),
+        }
+        scales = nuke.toNode(CARD_SCALES)
+        if scales is not None and scales.knob('scales').isAnimated():
+            layout['uniform_scale'] = np.array([key.y for key in scales.knob('scales').animation(0).keys()])
+
+    else:
+        cards = _cards_by_id(grp)
+        ordered = [cards[card_idx] for card_idx in sorted(cards)]
+        layout = {
+            'card_id': np.array(sorted(cards)),
+            'seed': np.array([card.knob('seed').value() for card in ordered], dtype=np.int64),
+            'seed_sign': np.array([card.knob('seed_sign').value() for card in ordered], dtype=np.int64),
+            'translate': np.array([card.knob('translate').value() for card in ordered]),
+            'scaling': np.array([card.knob('scaling').value() for card in ordered]),
+            'uniform_scale': np.array([card.knob('uniform_scale').value() for card in ordered]),
+        }
+
+    grp.end()
+
+    return layout
+
+
+def _card_seeds(grp, card_count):
+    # groups built before master_seed existed keep drawing from python's random
+    if grp.knob('master_seed') is None:
+        return [generate_seed() for _ in range(card_count)], [choice([-1, 1]) for _ in range(card_count)]
+
+    params = generate_card_params(grp.knob('master_seed').value(), card_count)
+    return params['seed'], params['seed_sign']
 
 
 def generate_seed():
@@ -103,20 +505,39 @@ def generate_seed():
     return seed
 
 
-def update():
+@instrumented()
+def update(grp=None):
 
-    # delete all cards and re-populate with the card count
+    # add or remove cards so the group matches the card count
 
-    grp = nuke.thisNode()
+    if grp is None:
+        grp = nuke.thisNode()
+    card_count = int(grp.knob('num_cards').value())
+
+    if _is_compact(grp):
+        apply_compact_layout(grp)
+        return
 
     grp.begin()
 
-    for node in grp.nodes():
-        if node.Class() != "Cube":
-            nuke.delete(node)
+    cards_scene = nuke.toNode(CARDS_SCENE)
+
+    if cards_scene is None:
+        # group was built before its internals were named - rebuild everything
+        for node in grp.nodes():
+            if node.Class() != "Cube":
+                nuke.delete(node)
+
+        _make_internals(card_count, grp)
 
-    _make_internals(grp.knob('num_cards').value(), grp)
-    grp.knob('exp_scale').setRange(1, grp.knob('num_cards').value())
+    else:
+        _resize_cards(card_count, grp, cards_scene)
+
+    grp.knob('exp_scale').setRange(1, card_count)
+    refresh_input_range(grp)
+
+    if grp.knob('z_dist') is not None:
+        grp.knob('z_dist').setExpression("Card1.translate.z - Card{}.translate.z".format(card_count))
 
     grp.end()
 
@@ -126,6 +547,7 @@ def _make_internals(card_count, grp):
     input_node = nuke.nodes.Input()
 
     cards_scene = nuke.nodes.Scene()
+    cards_scene.setName(CARDS_SCENE)
     cube_scene = nuke.nodes.Scene()
     cards_tx_geo = nuke.nodes.TransformGeo()
 
@@ -144,30 +566,285 @@ def _make_internals(card_count, grp):
     cards_tx_geo.knob('matrix').setExpression('{}.matrix'.format(cube.name()))
 
     # create cards & inputs
+    seeds, signs = _card_seeds(grp, card_count)
     for i in range(1, card_count + 1):
-        fh = nuke.nodes.FrameHold()
-        rand_frame = nuke.Int_Knob('rand_frame')
-        rand_frame.setVisible(False)
+        _add_card(i, cube, grp, input_node, cards_scene, seeds[i - 1], signs[i - 1])
 
-        fh.addKnob(rand_frame)
-        fh.setInput(0, input_node)
-        # fh.knob('first_frame').setExpression('seq_input ? ')
-        fh.knob('disable').setExpression('![exists parent.input]')
+    cards_tx_geo.setInput(0, cards_scene)
+    cube_scene.setInput(1, cards_tx_geo)
 
-        card = create_card(cube, grp, i)
-        card.knob('image_aspect').setValue(False)
-        card.setInput(0, fh)
-        cards_scene.setInput(i, card)
-        fh.knob('first_frame').setExpression('seq_input ? [topnode this.parent.input].first + {}-1 : [topnode this.parent.input].first + fmod(abs({}.seed) + [topnode this.parent.input].last-[topnode this.parent.input].first, [topnode this.parent.input].last-[topnode this.parent.input].first)'.format(i, card.name()))
+    output_node = nuke.nodes.Output()
+    output_node.setInput(0, cube_scene)
 
-    cards_tx_geo.setInput(0, cards_scene)
+    node_utils.apply_layout(grp.nodes(), origin=(0, 0))
+
+
+def _resize_cards(card_count, grp, cards_scene):
+    """
+    removes the cards above card_count and adds the missing ones, leaving every other card
+    (and its seed) untouched. must be called inside the group context
+    """
+    cards = _cards_by_id(grp)
+
+    for card_idx in sorted(cards, reverse=True):
+        if card_idx <= card_count:
+            break
+
+        card = cards.pop(card_idx)
+        frame_hold = card.input(0)
+        cards_scene.setInput(card_idx, None)
+        nuke.delete(card)
+        if frame_hold is not None:
+            nuke.delete(frame_hold)
+
+    if len(cards) >= card_count:
+        return
+
+    input_node = nuke.allNodes('Input')[0]
+    cube = nuke.toNode('Cube1')
+
+    seeds, signs = _card_seeds(grp, card_count)
+    added = [_add_card(card_idx, cube, grp, input_node, cards_scene, seeds[card_idx - 1], signs[card_idx - 1])
+             for card_idx in range(len(cards) + 1, card_count + 1)]
+
+    if not cards:
+        node_utils.apply_layout(grp.nodes(), origin=(0, 0))
+    else:
+        _place_added_cards(cards, added)
+
+
+def _place_added_cards(cards, added):
+    """
+    continues the row of existing cards (and their FrameHolds) with the added ones, at the same spacing,
+    so growing the box doesn't lay the whole group out again
+    @param cards: {card id: card} of the cards that were already placed
+    @param added: the new cards, in card order
+    """
+    last_idx = max(cards)
+    last = cards[last_idx]
+    step = last.xpos() - cards[last_idx - 1].xpos() if last_idx - 1 in cards else 110
+    step = step or 110
+    frame_hold_y = last.input(0).ypos() if last.input(0) is not None else last.ypos() - 80
+
+    for offset, card in enumerate(added, 1):
+        x = last.xpos() + step * offset
+        card.setXYpos(x, last.ypos())
+        if card.input(0) is not None:
+            card.input(0).setXYpos(x, frame_hold_y)
+
+
+def _add_card(card_idx, cube, grp, input_node, cards_scene, seed=None, sign=None):
+
+    fh = nuke.nodes.FrameHold()
+    rand_frame = nuke.Int_Knob('rand_frame')
+    rand_frame.setVisible(False)
+
+    fh.addKnob(rand_frame)
+    fh.setInput(0, input_node)
+    # fh.knob('first_frame').setExpression('seq_input ? ')
+    fh.knob('disable').setExpression('![exists parent.input]')
+
+    card = create_card(cube, grp, card_idx, seed, sign)
+    card.knob('image_aspect').setValue(False)
+    card.setInput(0, fh)
+    cards_scene.setInput(card_idx, card)
+    # input_first/input_last are kept on the group by refresh_input_range, so no card walks the input tree
+    fh.knob('first_frame').setExpression('seq_input ? input_first + {}-1 : input_first + fmod(abs({}.seed) + input_last-input_first, input_last-input_first)'.format(card_idx, card.name()))
+
+    return card
+
+
+def _cards_by_id(grp):
+    return dict((int(card.knob('card_id').value()), card) for card in grp.nodes() if card.Class() == 'Card')
+
+
+def _make_compact_internals(card_count, grp):
+    """
+    builds a constant number of nodes whatever the card count: a single Card is instanced by a
+    ParticleEmitter onto a BakedPointCloud holding one point per card. positions and scales come from
+    compute_static_layout, like a static layout's.
+
+    the particle simulation starts again on every frame, so all particles are emitted at once and never
+    age: particle n stays on point n and shows frame n of the card's input for good, rather than playing
+    it forward. a TimeWarp in front of the card maps frame n to the frame card n holds in the per-card
+    build, and a ParticleExpression sets particle n's size from a curve keyed on its id. both rely on
+    particle ids and emission counting from 0 in point order. nothing here can be simulated outside of
+    nuke, the stand-in only checks the knobs and keys set.
+    """
+    input_node = nuke.nodes.Input()
+
+    if nuke.toNode('Cube1') is None:
+        cube = create_cube()
+    else:
+        cube = nuke.toNode('Cube1')
+
+    frames = nuke.nodes.TimeWarp()
+    frames.setName(CARD_FRAMES)
+    frames.setInput(0, input_node)
+
+    card = nuke.nodes.Card()
+    card.setInput(0, frames)
+    card.knob('image_aspect').setValue(False)
+    s_knob = card.knob('scaling')
+    s_knob.setExpression("abs({0}.cube.x - {0}.cube.r)".format(cube.name()), 0)
+    s_knob.setExpression("abs({0}.cube.y - {0}.cube.t)".format(cube.name()), 1)
+    s_knob.setExpression("abs({0}.cube.f - {0}.cube.n)".format(cube.name()), 2)
+
+    points = nuke.nodes.BakedPointCloud()
+    points.setName(CARD_POINTS)
+
+    emitter = nuke.nodes.ParticleEmitter()
+    emitter.setName(CARD_EMITTER)
+    emitter.setInput(0, points)
+    emitter.setInput(1, card)
+
+    # particle n comes from point n and starts on frame n, without moving. the size comes from card_scales
+    emitter_settings = (('emit_from', 'points'),
+                        ('emit_order', 'in order'),
+                        ('lifetime', 1000000),
+                        ('velocity', 0),
+                        ('spread', 0),
+                        ('start_at', 'in order'),
+                        ('size', 1.0),
+                        ('size_variation', 0.0))
+    for knob_name, value in emitter_settings:
+        _set_knob(emitter, knob_name, value)
+
+    scales = nuke.nodes.ParticleExpression()
+    scales.setName(CARD_SCALES)
+    scales.setInput(0, emitter)
+    scale_curve = nuke.Double_Knob('scales')
+    scale_curve.setVisible(False)
+    scales.addKnob(scale_curve)
+    _set_knob(scales, 'size', 'scales(id)')
+
+    cards_tx_geo = nuke.nodes.TransformGeo()
+    cards_tx_geo.knob('useMatrix').setValue(True)
+    cards_tx_geo.knob('matrix').setExpression('{}.matrix'.format(cube.name()))
+    cards_tx_geo.setInput(0, scales)
+
+    cube_scene = nuke.nodes.Scene()
+    cube_scene.setInput(0, cube)
     cube_scene.setInput(1, cards_tx_geo)
 
     output_node = nuke.nodes.Output()
     output_node.setInput(0, cube_scene)
 
+    node_utils.apply_layout(grp.nodes(), origin=(0, 0))
+
+    apply_compact_layout(grp)
 
-def run(card_count):
+
+def apply_compact_layout(grp):
+    """
+    regenerates the compact build's points, frame lookup, per-card scales and emitter settings from the
+    group knobs. knobs missing from this version of nuke's nodes are skipped
+    """
+    if grp.knob('input_first') is None:
+        refresh_input_range(grp)
+
+    grp.begin()
+    try:
+        card_count = int(grp.knob('num_cards').value())
+        seeds, signs = _card_seeds(grp, card_count)
+
+        layout = compute_static_layout(
+            nuke.toNode('Cube1').knob('cube').value(),
+            range(1, card_count + 1),
+            seeds,
+            signs,
+            card_count,
+            grp.knob('exp_scale').value(),
+            grp.knob('xyz_var').value(),
+            grp.knob('card_scale').value(),
+            grp.knob('scale_var').value())
+
+        coords = ' '.join('{:.6f}'.format(v) for v in layout['translate'].ravel())
+        _set_knob(nuke.toNode(CARD_POINTS), 'serializePoints', '{} {}'.format(card_count, coords))
+
+        # frame n of the card's input, which particle n shows, is the frame card n holds in the per-card build
+        first = int(grp.knob('input_first').value())
+        held = card_frames(seeds, first, int(grp.knob('input_last').value()),
+                           grp.knob('seq_input') is not None and grp.knob('seq_input').value())
+        if nuke.toNode(CARD_FRAMES) is not None:
+            _set_keys(nuke.toNode(CARD_FRAMES).knob('lookup'), held, first)
+
+        emitter = nuke.toNode(CARD_EMITTER)
+        scales = nuke.toNode(CARD_SCALES)
+        if scales is not None:
+            _set_keys(scales.knob('scales'), layout['uniform_scale'].tolist())
+        else:
+            # built before the per-card scales, the emitter varies the size with its own random numbers
+            _set_knob(emitter, 'size', grp.knob('card_scale').value())
+            _set_knob(emitter, 'size_variation', grp.knob('scale_var').value())
+
+        # the simulation restarts on every frame and emits every particle on its first step, so none of
+        # them ages. groups built before this get the expression on their next update
+        if emitter.knob('start_frame') is not None:
+            emitter.knob('start_frame').setExpression('frame')
+        rate = emitter.knob('rate')
+        if rate is not None:
+            rate.clearAnimated()
+            rate.setValue(card_count)
+    finally:
+        grp.end()
+
+
+def _set_keys(knob, values, start=0):
+    # replaces the knob's animation with one key per value, on frames start, start + 1, ...
+    if knob is None:
+        return
+    knob.clearAnimated()
+    knob.setAnimated()
+    knob.animation(0).addKey([nuke.AnimationKey(start + idx, value) for idx, value in enumerate(values)])
+    instrument.count('nuke.addKey')
+
+
+def _set_knob(node, knob_name, value):
+    if node is not None and node.knob(knob_name) is not None:
+        node.knob(knob_name).setValue(value)
+
+
+def _is_compact(grp):
+    return grp.knob('compact') is not None and grp.knob('compact').value()
+
+
+def benchmark_layouts(card_counts=(100, 500, 2000)):
+    """
+    builds a fogbox per card count with both the per-card and the compact layout and reports, for each,
+    the build time, the time to paste the group back in (a stand-in for script load time), the
+    number of nodes inside the group and the size of its script. the groups are deleted afterwards.
+    @return: list of dicts, one per build
+    """
+    results = []
+
+    for card_count in card_counts:
+        for compact in (False, True):
+            start = time.time()
+            grp = run(card_count, compact)
+            build_time = time.time() - start
+
+            script = node_copy.serialise_nodes([grp])
+            node_count = len(grp.nodes())
+            nuke.delete(grp)
+
+            start = time.time()
+            pasted = node_copy.paste_script(script)
+            load_time = time.time() - start
+            for node in pasted:
+                nuke.delete(node)
+
+            result = {'cards': card_count, 'compact': compact, 'build': build_time, 'load': load_time,
+                      'nodes': node_count, 'script_bytes': len(script)}
+            results.append(result)
+            logger.info("{cards} cards, compact={compact}: build {build:.2f}s, load {load:.2f}s, "
+                        "{nodes} nodes, {script_bytes} bytes".format(**result))
+
+    return results
+
+
+@instrumented()
+def run(card_count, compact=False):
 
     # create group
     grp = nuke.createNode('Group')
@@ -177,6 +854,10 @@ def run(card_count):
     seq_input.setValue(False)
     seq_input.setTooltip('set the input images to be assigned sequentially to each card from front to back')
 
+    master_seed = nuke.Int_Knob('master_seed', 'seed')
+    master_seed.setValue(randint(0, 99999))
+    master_seed.setTooltip('every card\'s seed is generated from this value, so the same seed gives the same layout')
+
     num_cards = nuke.Int_Knob('num_cards')
     num_cards.setValue(card_count)
     num_cards.setTooltip('modify the number of cards in the box')
@@ -200,27 +881,41 @@ def run(card_count):
     exp_scale.setRange(1.0, float(card_count))
     exp_scale.setTooltip('scale the cards towards the origin card in z, non-linearly')
 
+    static_layout = nuke.Boolean_Knob('static_layout', 'static layout')
+    static_layout.setValue(False)
+    static_layout.setTooltip('compute the card placement once in python instead of per-card expressions.\n'
+                             'recomputed whenever one of the controls above changes')
+
+    compact_knob = nuke.Boolean_Knob('compact', 'compact build')
+    compact_knob.setValue(compact)
+    compact_knob.setEnabled(False)
+    compact_knob.setTooltip('a single card instanced over a point cloud, for very high card counts.\n'
+                            'the frames the cards hold are worked out when the build is updated, run update '
+                            'again after changing the input\'s frame range')
+
+    grp.addKnob(master_seed)
     grp.addKnob(seq_input)
     grp.addKnob(num_cards)
     grp.addKnob(card_scale)
     grp.addKnob(card_var_scale)
     grp.addKnob(xyz_var)
     grp.addKnob(exp_scale)
+    grp.addKnob(static_layout)
+    grp.addKnob(compact_knob)
 
-    grp.knob('knobChanged').setValue("""
-n = nuke.thisNode()
-k = nuke.thisKnob()
-if k.name() == 'num_cards':
-    print "changing card numbers to {}".format(k.value())
-    # ce_fogbox._make_internals(k.value(), n)
-    ce_fogbox.update()
-""")
+    grp.knob('knobChanged').setValue(KNOB_CHANGED)
 
     grp.begin()
+    try:
+        if compact:
+            _make_compact_internals(num_cards.value(), grp)
+        else:
+            _make_internals(num_cards.value(), grp)
+    finally:
+        grp.end()
 
-    _make_internals(num_cards.value(), grp)
-
-    grp.end()
+    if compact:
+        return grp
 
     card_z_dist = nuke.Double_Knob('z_dist')
     card_z_dist.setVisible(False)
@@ -228,5 +923,7 @@ if k.name() == 'num_cards':
 
     grp.addKnob(card_z_dist)
 
+    refresh_input_range(grp)
+
     return grp
 
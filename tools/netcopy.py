@@ -6,24 +6,82 @@ copies the selected nodes to a network share so other artists can then selct and
 
 import nuke
 import os
+import functools
+import time
+import tempfile
+import logging
 import Qt.QtGui as QtGui
-from Qt.QtWidgets import QWidget, QVBoxLayout, QListWidget, QLabel, QPushButton, QListWidgetItem
-from nukescripts import panels
+from Qt import QtCore
+from Qt.QtWidgets import QWidget, QVBoxLayout, QListView, QLabel
+
+from utils.buffer_store import BufferStore, EXTENSIONS, decompress_file
+from utils.instrument import instrumented
+
+# os from python 3.5, else the scandir backport. scandir is looked up on the module at each call, so
+# utils.instrument counts it
+if hasattr(os, 'scandir'):
+    _scandir = os
+else:
+    try:
+        import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+logger = logging.getLogger(__name__)
 
 net_copy_dir = "add/custom/dir/here"
 
+# buffer storage settings: compression ('zlib' or 'lzma') and how much history each user keeps
+compression = 'zlib'
+max_history = 20
+max_history_age = 7 * 24 * 60 * 60
+max_history_bytes = 500 * 1024 * 1024
 
+# user the plain .nkcp buffers written before the store existed are listed under
+LEGACY_USER = ''
+
+
+@instrumented()
 def netcopy():
     # get selected nodes and write them to disk using a predefined, $USER-centric name
     if not nuke.selectedNodes():
         nuke.message("No nodes selected for copying")
         return
-    path = os.path.join(net_copy_dir, build_filename())
-    nuke.nodeCopy(path)
 
+    handle, tmp_path = tempfile.mkstemp(suffix='.nkcp')
+    os.close(handle)
+    try:
+        nuke.nodeCopy(tmp_path)
+        with open(tmp_path, 'rb') as f:
+            data = f.read()
+    finally:
+        os.remove(tmp_path)
 
+    # the history entry doubles as the panel's index of the buffer
+    user = os.getenv('USER')
+    store = get_store()
+    store.put(data, user, author=user, nodes=len(nuke.selectedNodes()), script=nuke.root().name())
+    store.evict(user, max_entries=max_history, max_age=max_history_age, max_bytes=max_history_bytes)
+
+
+@instrumented()
 def netpaste(buffer_name):
-    nuke.nodePaste(buffer_name)
+    # buffers from the store are compressed, plain .nkcp files can be pasted as they are
+    if not buffer_name.endswith(tuple(EXTENSIONS.values())):
+        nuke.nodePaste(buffer_name)
+        return
+
+    handle, tmp_path = tempfile.mkstemp(suffix='.nkcp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(decompress_file(buffer_name))
+        nuke.nodePaste(tmp_path)
+    finally:
+        os.remove(tmp_path)
+
+
+def get_store():
+    return BufferStore(net_copy_dir, compression)
 
 
 def build_filename():
@@ -34,10 +92,214 @@ def build_filename():
     return filename
 
 
-def get_list_of_copy_files():
-    # sort by modification time
-    mtime = lambda x: os.stat(os.path.join(net_copy_dir, x)).st_mtime
-    return list(sorted(os.listdir(net_copy_dir), key=mtime, reverse=True))
+def list_legacy_buffers(directory):
+    """
+    lists the plain .nkcp buffers netcopy wrote to directory before buffers went into the store, as
+    history entries like the store's so the panel can show them alongside
+    @rtype: list of dict
+    """
+    entries = []
+
+    # scandir gets the file type without an extra stat, but only exists from python 3.5 (or as a backport)
+    if _scandir is not None:
+        files = ((entry.name, entry.stat()) for entry in _scandir.scandir(directory) if entry.is_file())
+    else:
+        files = ((name, os.stat(os.path.join(directory, name))) for name in os.listdir(directory)
+                 if os.path.isfile(os.path.join(directory, name)))
+
+    for name, stat in files:
+        if name.startswith('.') or not name.endswith('.nkcp'):
+            continue
+        entries.append({
+            'digest': name,
+            'user': LEGACY_USER,
+            'author': name[:-len('_copy.nkcp')] if name.endswith('_copy.nkcp') else name,
+            'time': stat.st_mtime,
+            'size': stat.st_size,
+            'stored_size': stat.st_size,
+            'path': name,
+        })
+
+    return entries
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ManifestWatcher(QtCore.QObject):
+    """
+    watches the store's manifests (the sidecar index of every buffer) and emits a user's history
+    whenever their manifest changes. QFileSystemWatcher is backed by inotify on linux, which doesn't
+    see changes made by other machines on a network mount, so the manifests are also polled.
+    only the manifests directory and the manifests themselves are ever listed or stat'ed, the copy
+    directory is only listed again for plain .nkcp buffers (as LEGACY_USER) when its mtime changes.
+    meant to be moved to its own thread, so a slow share never blocks the panel
+    """
+
+    historyChanged = QtCore.Signal(str, list)
+    historyRemoved = QtCore.Signal(str)
+    # why the store can't be read, or '' once it can be again
+    errorChanged = QtCore.Signal(str)
+
+    def __init__(self, store, poll_interval=5000):
+        QtCore.QObject.__init__(self)
+        self.store = store
+        self.poll_interval = poll_interval
+        self.mtimes = {}
+        self.root_mtime = None
+        self.error = ''
+        self.fs_watcher = None
+        self.timer = None
+
+    def start(self):
+        # created here so they live in the watcher's thread
+        self.fs_watcher = QtCore.QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(self.check)
+        self.fs_watcher.fileChanged.connect(self.check)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.timer.start(self.poll_interval)
+
+        self.check()
+
+    @QtCore.Slot()
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+
+    def check(self, *args):
+        # an unreachable share is reported and retried on the next poll, it never stops the watcher
+        error = ''
+        try:
+            if not os.path.isdir(self.store.root):
+                error = 'NetCopy directory {} is not available'.format(self.store.root)
+            else:
+                self._check()
+        except (IOError, OSError) as e:
+            error = 'Could not list the NetCopy buffers: {}'.format(e)
+
+        if error != self.error:
+            self.error = error
+            if error:
+                logger.warning(error)
+            self.errorChanged.emit(error)
+
+    def _check(self):
+        root_mtime = _mtime(self.store.root)
+        if root_mtime != self.root_mtime:
+            self.root_mtime = root_mtime
+            self.historyChanged.emit(LEGACY_USER, list_legacy_buffers(self.store.root))
+
+        if os.path.isdir(self.store.manifests_dir) and self.store.manifests_dir not in self.fs_watcher.directories():
+            self.fs_watcher.addPath(self.store.manifests_dir)
+
+        users = set(self.store.users())
+
+        for user in users:
+            manifest = self.store.manifest_path(user)
+            mtime = _mtime(manifest)
+            if mtime == self.mtimes.get(user):
+                continue
+
+            self.mtimes[user] = mtime
+            # manifests are replaced by a rename, which drops the watch on the old file
+            if manifest not in self.fs_watcher.files():
+                self.fs_watcher.addPath(manifest)
+            self.historyChanged.emit(user, self.store.history(user))
+
+        for user in set(self.mtimes) - users:
+            del self.mtimes[user]
+            self.historyRemoved.emit(user)
+
+
+class BufferListModel(QtCore.QAbstractListModel):
+    """
+    list model over the store's history entries, newest first. histories are applied as diffs, so
+    the rows of unchanged buffers are never rebuilt
+    """
+
+    def __init__(self, parent=None):
+        QtCore.QAbstractListModel.__init__(self, parent)
+        self.entries = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        entry = self.entries[index.row()]
+
+        if role == QtCore.Qt.DisplayRole:
+            return '{}  {}  {} nodes  ({:.1f} KB)'.format(
+                entry.get('author', entry['user']),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['time'])),
+                entry.get('nodes', '?'),
+                entry['size'] / 1024.0)
+
+        if role == QtCore.Qt.ToolTipRole:
+            return '{}\n{:.1f} KB stored'.format(entry.get('script', ''), entry['stored_size'] / 1024.0)
+
+        if role == QtCore.Qt.BackgroundRole and index.row() % 2 == 1:
+            # give bg a slightly different shade
+            return QtGui.QColor('#222222')
+
+        return None
+
+    def path(self, index):
+        return os.path.join(net_copy_dir, self.entries[index.row()]['path'])
+
+    def apply_history(self, user, history):
+        """
+        brings user's rows in line with their history: removes and inserts only what changed
+        """
+        new = dict((entry['digest'], entry) for entry in history)
+
+        row = len(self.entries) - 1
+        while row >= 0:
+            entry = self.entries[row]
+            if entry['user'] == user:
+                latest = new.get(entry['digest'])
+                if latest is None or latest['time'] != entry['time']:
+                    # gone, or copied again and moving to the top
+                    self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+                    del self.entries[row]
+                    self.endRemoveRows()
+                else:
+                    del new[entry['digest']]
+                    if latest != entry:
+                        self.entries[row] = latest
+                        index = self.index(row)
+                        self.dataChanged.emit(index, index)
+            row -= 1
+
+        for entry in new.values():
+            row = self._insert_row(entry['time'])
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self.entries.insert(row, entry)
+            self.endInsertRows()
+
+    def remove_user(self, user):
+        self.apply_history(user, [])
+
+    def _insert_row(self, entry_time):
+        # entries are sorted newest first
+        lo, hi = 0, len(self.entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entries[mid]['time'] > entry_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
 
 
 class NetPasteWidget(QWidget):
@@ -48,60 +310,59 @@ class NetPasteWidget(QWidget):
         # create the main widget window
         self.setLayout(QVBoxLayout())
 
-        # create the List Widget
-        self.myList = QListWidget()
-        self.update()
+        # create the List View
+        self.model = BufferListModel(self)
+        self.myList = QListView()
+        self.myList.setModel(self.model)
+        self.myList.setUniformItemSizes(True)
         self.myList.setWindowTitle("NetPaste Buffer Select")
-        self.myList.itemClicked.connect(self.clicked)
+        self.myList.clicked.connect(self.clicked)
 
         # create the display label
         self.list_label = QLabel("Available NetPaste Buffers")
 
-        # create the button to refresh
-        self.refresh_btn = QPushButton("Refresh")
-        self.refresh_btn.clicked.connect(self.refresh)
-
         # add the widgets
         self.layout().addWidget(self.list_label)
         self.layout().addWidget(self.myList)
-        self.layout().addWidget(self.refresh_btn)
-
-    def refresh(self):
-        # remove all existing items in the list
-        self.myList.clear()
-        # add everything in the netpaste loc dir
-        self.update()
-
-    def clicked(self, item):
-        netpaste(os.path.join(net_copy_dir, item.text()))
-
-    def update(self):
-        idx = 1
-        for each in get_list_of_copy_files():
-            new_item = QListWidgetItem()
-            new_item.setText(each)
-            if idx % 2 == 0:
-                # give bg a slightly different shade
-                new_item.setBackground(QtGui.QColor('#222222'))
-            idx += 1
-            self.myList.addItem(new_item)
+
+        # keep the list up to date from a watcher on its own thread. the watcher can't have a parent in
+        # another thread, so it's stopped when the widget goes, whether it was closed or not
+        self.watch_thread = QtCore.QThread(self)
+        self.watcher = ManifestWatcher(get_store())
+        self.watcher.moveToThread(self.watch_thread)
+        self.watcher.historyChanged.connect(self.model.apply_history)
+        self.watcher.historyRemoved.connect(self.model.remove_user)
+        self.watcher.errorChanged.connect(self.show_error)
+        self.watch_thread.started.connect(self.watcher.start)
+        self.watch_thread.finished.connect(self.watcher.deleteLater)
+        self.destroyed.connect(functools.partial(_stop_watcher, self.watcher, self.watch_thread))
+        self.watch_thread.start()
+
+    def clicked(self, index):
+        netpaste(self.model.path(index))
+
+    def show_error(self, error):
+        self.list_label.setText(error or "Available NetPaste Buffers")
 
     def closeEvent(self, event):
+        _stop_watcher(self.watcher, self.watch_thread)
+
         global np
         if np is not None:
             np = None
 
 
-# standard Nuke-fu to persist the window
-np = None
+def _stop_watcher(watcher, thread, *args):
+    # stops the watcher's timer in its own thread, then the thread. safe to call more than once
+    if not thread.isRunning():
+        return
+    QtCore.QMetaObject.invokeMethod(watcher, 'stop', QtCore.Qt.BlockingQueuedConnection)
+    thread.quit()
+    thread.wait()
 
-moduleName = __name__
-if moduleName == '__main__':
-    moduleName = ''
-else:
-    moduleName += '.'
 
-panels.registerWidgetAsPanel(moduleName + 'NetPasteWidget', 'NetPaste Browser', 'com.mattgreig.NetPasteWidget')
+# standard Nuke-fu to persist the window. the dockable panel is registered by menu.py
+np = None
 
 
 def display_netpaste_buffer():
@@ -114,5 +375,3 @@ def display_netpaste_buffer():
 
     else:
         np.activateWindow()
-
-
@@ -0,0 +1,182 @@
+"""
+nk_analyze
+
+command line tool that reports on .nk scripts without nuke: node counts by class, gizmo usage, Read file
+dependencies, expression-heavy nodes and fogbox card counts. scripts are streamed through
+nk_script.iter_nodes, so memory use doesn't grow with script size, and spread over a process pool.
+
+usage: python -m tools.nk_analyze script.nk [script.nk ...] [--jobs N] [--json] [--gizmo-path DIR ...]
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+from collections import Counter
+from multiprocessing import Pool
+
+from utils import nk_script
+
+logger = logging.getLogger(__name__)
+
+READ_CLASSES = ('Read', 'ReadGeo', 'ReadGeo2', 'DeepRead')
+
+# nodes with at least this many expressions are reported
+EXPRESSION_THRESHOLD = 10
+
+# {{...}} knob values that aren't animation curves
+_RE_EXPRESSION = re.compile(r'\{\{(?!\s*curve\b)')
+
+# set in each worker by _init_worker
+_library = None
+
+
+def analyze(script_path, library=None):
+    """
+    @param library: nk_script.GizmoLibrary used to tell gizmos from other classes
+    @return: dict report of the script
+    """
+    classes = Counter()
+    gizmos = Counter()
+    reads = []
+    expressions = []
+    fogboxes = {}
+
+    with open(script_path) as f:
+        for node in nk_script.iter_nodes(f):
+            classes[node.node_class] += 1
+            if library is not None and node.node_class in library:
+                gizmos[node.node_class] += 1
+
+            knobs = dict(node.knobs())
+
+            if node.node_class in READ_CLASSES and 'file' in knobs:
+                reads.append({'node': node.name, 'file': knobs['file'].strip('"'),
+                              'first': _int(knobs.get('first')), 'last': _int(knobs.get('last'))})
+
+            count = sum(len(_RE_EXPRESSION.findall(value)) for value in knobs.values())
+            if count >= EXPRESSION_THRESHOLD:
+                expressions.append({'node': node.name, 'class': node.node_class, 'expressions': count})
+
+            if 'num_cards' in knobs:
+                fogboxes[node.name] = {'node': node.name, 'num_cards': _int(knobs['num_cards']),
+                                       'compact': knobs.get('compact') == 'true', 'cards': 0}
+            elif node.node_class in ('Card', 'Card2') and node.parent in fogboxes:
+                fogboxes[node.parent]['cards'] += 1
+
+    expressions.sort(key=lambda entry: entry['expressions'], reverse=True)
+
+    return {
+        'script': script_path,
+        'nodes': sum(classes.values()),
+        'classes': dict(classes),
+        'gizmos': dict(gizmos),
+        'reads': reads,
+        'expression_heavy': expressions,
+        'fogboxes': [fogboxes[name] for name in sorted(fogboxes)],
+    }
+
+
+def analyze_scripts(script_paths, gizmo_paths=None, jobs=None):
+    """
+    analyzes scripts in parallel, yielding reports as they finish. a script that can't be read gives
+    a report with an 'error' entry instead of stopping the run
+    @param jobs: number of processes, one per cpu when None
+    @return: generator of dict reports
+    """
+    if gizmo_paths is None:
+        gizmo_paths = nk_script.default_gizmo_paths()
+
+    pool = Pool(jobs, _init_worker, (gizmo_paths,))
+    try:
+        for report in pool.imap_unordered(_analyze_worker, script_paths):
+            yield report
+    finally:
+        pool.close()
+        pool.join()
+
+
+def summarize(reports):
+    """
+    @return: totals over reports: node counts by class, gizmo usage and the scripts failing to parse
+    """
+    classes = Counter()
+    gizmos = Counter()
+    failed = []
+    for report in reports:
+        if 'error' in report:
+            failed.append(report['script'])
+            continue
+        classes.update(report['classes'])
+        gizmos.update(report['gizmos'])
+    return {'scripts': len(reports), 'classes': dict(classes), 'gizmos': dict(gizmos), 'failed': failed}
+
+
+def format_report(report):
+    if 'error' in report:
+        return '{}: {}'.format(report['script'], report['error'])
+
+    lines = ['{} ({} nodes)'.format(report['script'], report['nodes'])]
+    for node_class, count in sorted(report['classes'].items(), key=lambda item: -item[1]):
+        lines.append('  {:<24} {}'.format(node_class, count))
+    if report['gizmos']:
+        lines.append('  gizmos: ' + ', '.join('{} x{}'.format(g, n) for g, n in sorted(report['gizmos'].items())))
+    for read in report['reads']:
+        lines.append('  read {node}: {file} [{first}-{last}]'.format(**read))
+    for entry in report['expression_heavy']:
+        lines.append('  {node} ({class}): {expressions} expressions'.format(**entry))
+    for fogbox in report['fogboxes']:
+        built = 'compact' if fogbox['compact'] else '{} cards built'.format(fogbox['cards'])
+        lines.append('  fogbox {}: {} cards ({})'.format(fogbox['node'], fogbox['num_cards'], built))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report on Nuke scripts without Nuke.')
+    parser.add_argument('scripts', nargs='+', help='scripts to analyze')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='processes to use (default: one per cpu)')
+    parser.add_argument('--json', action='store_true', help='write the reports as json')
+    parser.add_argument('--gizmo-path', action='append', dest='gizmo_paths',
+                        help='directory to search for .gizmo files, can be repeated (default: NUKE_PATH and ~/.nuke)')
+    args = parser.parse_args(argv)
+
+    reports = []
+    for report in analyze_scripts(args.scripts, args.gizmo_paths, args.jobs):
+        reports.append(report)
+        if not args.json:
+            print(format_report(report))
+
+    summary = summarize(reports)
+    if args.json:
+        json.dump({'reports': reports, 'summary': summary}, sys.stdout, indent=2)
+    else:
+        logger.info('{} scripts, {} nodes'.format(summary['scripts'], sum(summary['classes'].values())))
+        for script in summary['failed']:
+            logger.warning('failed to parse {}'.format(script))
+
+    return 1 if summary['failed'] else 0
+
+
+def _init_worker(gizmo_paths):
+    global _library
+    _library = nk_script.GizmoLibrary(gizmo_paths)
+
+
+def _analyze_worker(script_path):
+    try:
+        return analyze(script_path, _library)
+    except (IOError, OSError, ValueError, IndexError) as e:
+        return {'script': script_path, 'error': str(e)}
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+nk_diff
+
+command line tool that diffs the node graphs of two .nk scripts without nuke. nodes are matched by full
+name and class and only nodes whose block or inputs hash differently are compared knob by knob, so large
+scripts with few changes diff quickly. animation curves are compared key by key as numbers, so a curve
+rewritten with different formatting isn't reported as changed.
+
+usage: python -m tools.nk_diff old.nk new.nk [--tolerance 1e-6] [--include-position]
+"""
+
+import argparse
+import hashlib
+import logging
+import sys
+from collections import Counter, OrderedDict, namedtuple
+
+from utils import nk_script
+
+logger = logging.getLogger(__name__)
+
+# knobs that only move the node around the DAG
+POSITION_KNOBS = ('xpos', 'ypos', 'selected')
+
+# one difference between two scripts. kind is one of:
+# added, removed, knob, expression, animation, connection
+Change = namedtuple('Change', 'node kind detail')
+
+
+def read_graph(script_path, ignore=POSITION_KNOBS):
+    """
+    @return: {(full name, class): (digest, inputs, knobs)} for every node of the script
+    """
+    graph = {}
+    with open(script_path) as f:
+        for node in nk_script.iter_nodes(f):
+            knobs = [(name, value) for name, value in node.knobs() if name not in ignore]
+            digest = hashlib.md5(repr((knobs, node.inputs)).encode('utf-8')).hexdigest()
+            graph[(node.name, node.node_class)] = (digest, node.inputs, knobs)
+    return graph
+
+
+def diff_graphs(old, new, tolerance=1e-6):
+    """
+    @param old, new: graphs from L{read_graph}
+    @return: list of L{Change}, in node order
+    """
+    changes = []
+
+    for key in sorted(set(old) | set(new)):
+        name, node_class = key
+        if key not in new:
+            changes.append(Change(name, 'removed', node_class))
+            continue
+        if key not in old:
+            changes.append(Change(name, 'added', node_class))
+            continue
+
+        old_digest, old_inputs, old_knobs = old[key]
+        new_digest, new_inputs, new_knobs = new[key]
+        if old_digest == new_digest:
+            continue
+
+        changes.extend(diff_knobs(name, old_knobs, new_knobs, tolerance))
+
+        for idx in range(max(len(old_inputs), len(new_inputs))):
+            was = old_inputs[idx] if idx < len(old_inputs) else None
+            now = new_inputs[idx] if idx < len(new_inputs) else None
+            if was != now:
+                changes.append(Change(name, 'connection', 'input {}: {} -> {}'.format(idx, was, now)))
+
+    return changes
+
+
+def diff_knobs(node_name, old, new, tolerance=1e-6):
+    """
+    knobs written more than once in a block, like addUserKnob, are compared as ordered multisets:
+    values found on one side only are reported as removed or added, wherever they sit in the block
+    @param old, new: [(knob name, value), ...] of the same node, in script order
+    @return: list of L{Change}
+    """
+    changes = []
+    old = _group_knobs(old)
+    new = _group_knobs(new)
+
+    for knob in sorted(set(old) | set(new)):
+        old_values = old.get(knob, [])
+        new_values = new.get(knob, [])
+        if old_values == new_values:
+            continue
+
+        if len(old_values) > 1 or len(new_values) > 1:
+            changes.extend(_diff_repeated(node_name, knob, old_values, new_values))
+            continue
+
+        was = old_values[0] if old_values else None
+        now = new_values[0] if new_values else None
+
+        if was is None or now is None:
+            changes.append(Change(node_name, 'knob', '{}: {} -> {}'.format(knob, _short(was), _short(now))))
+            continue
+
+        was_channels = nk_script.knob_channels(was)
+        now_channels = nk_script.knob_channels(now)
+
+        for idx in range(max(len(was_channels), len(now_channels))):
+            a = was_channels[idx] if idx < len(was_channels) else None
+            b = now_channels[idx] if idx < len(now_channels) else None
+            label = knob if max(len(was_channels), len(now_channels)) == 1 else '{}[{}]'.format(knob, idx)
+
+            if _is_curve(a) and _is_curve(b):
+                frames = diff_curves(nk_script.parse_curve(a), nk_script.parse_curve(b), tolerance)
+                if frames:
+                    changes.append(Change(node_name, 'animation', '{}: keys changed at {}'.format(
+                        label, _frames(frames))))
+            elif _is_curve(a) or _is_curve(b):
+                changes.append(Change(node_name, 'animation', '{}: {} -> {}'.format(
+                    label, 'animated' if _is_curve(a) else _short(a), 'animated' if _is_curve(b) else _short(b))))
+            elif _is_expression(a) or _is_expression(b):
+                if a != b:
+                    changes.append(Change(node_name, 'expression', '{}: {} -> {}'.format(label, _short(a), _short(b))))
+            elif not _same_number(a, b, tolerance):
+                changes.append(Change(node_name, 'knob', '{}: {} -> {}'.format(label, _short(a), _short(b))))
+
+    return changes
+
+
+def _group_knobs(knobs):
+    # {knob name: [values in script order]}
+    grouped = OrderedDict()
+    for name, value in knobs:
+        grouped.setdefault(name, []).append(value)
+    return grouped
+
+
+def _diff_repeated(node_name, knob, old_values, new_values):
+    # the nth copy of a value on one side matches the nth copy on the other, so a user knob inserted
+    # mid-block is one addition rather than a change to every knob after it
+    changes = []
+    for verb, values, others in (('removed', old_values, new_values), ('added', new_values, old_values)):
+        unmatched = Counter(values) - Counter(others)
+        for value in values:
+            if unmatched[value] > 0:
+                unmatched[value] -= 1
+                changes.append(Change(node_name, 'knob', '{}: {} {}'.format(knob, verb, _short(value))))
+    return changes
+
+
+def diff_curves(old, new, tolerance=1e-6):
+    """
+    @return: sorted frames at which two curves' keys differ, or exist in only one of them
+    """
+    return sorted(frame for frame in set(old) | set(new)
+                  if frame not in old or frame not in new or abs(old[frame] - new[frame]) > tolerance)
+
+
+def diff_scripts(old_path, new_path, tolerance=1e-6, ignore=POSITION_KNOBS):
+    """
+    @return: list of L{Change} from old_path to new_path
+    """
+    return diff_graphs(read_graph(old_path, ignore), read_graph(new_path, ignore), tolerance)
+
+
+def format_changes(changes):
+    return '\n'.join('{:<10} {}  {}'.format(change.kind, change.node, change.detail) for change in changes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff the node graphs of two Nuke scripts.')
+    parser.add_argument('old', help='original script')
+    parser.add_argument('new', help='changed script')
+    parser.add_argument('--tolerance', type=float, default=1e-6,
+                        help='numbers and keys closer than this are the same (default: 1e-6)')
+    parser.add_argument('--include-position', action='store_true', help='report nodes moved in the DAG')
+    args = parser.parse_args(argv)
+
+    ignore = () if args.include_position else POSITION_KNOBS
+    changes = diff_scripts(args.old, args.new, args.tolerance, ignore)
+
+    if changes:
+        print(format_changes(changes))
+    logger.info('{} changes'.format(len(changes)))
+
+    # like diff: 1 when the scripts differ
+    return 1 if changes else 0
+
+
+def _is_curve(channel):
+    return channel is not None and channel.lstrip('{').startswith('curve')
+
+
+def _is_expression(channel):
+    return channel is not None and channel.startswith('{')
+
+
+def _same_number(a, b, tolerance):
+    if a is None or b is None:
+        return a == b
+    try:
+        return abs(float(a) - float(b)) <= tolerance
+    except ValueError:
+        return a == b
+
+
+def _frames(frames):
+    return ', '.join('%g' % frame for frame in frames[:10]) + (' ...' if len(frames) > 10 else '')
+
+
+def _short(value, length=60):
+    if value is None:
+        return '(unset)'
+    value = ' '.join(value.split())
+    return value if len(value) <= length else value[:length - 3] + '...'
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+preflight
+
+checks every file the script reads - Read, ReadGeo and DeepRead nodes, including those inside groups -
+is on disk with the full frame range the node reads, before the script goes to the farm
+"""
+
+import logging
+
+import nuke
+
+from utils import dependency_check
+from utils.instrument import instrumented
+
+logger = logging.getLogger(__name__)
+
+READ_CLASSES = ('Read', 'ReadGeo', 'ReadGeo2', 'DeepRead')
+
+
+def collect_reads():
+    """
+    @return: (node name, file path, first, last) for every enabled read node in the script
+    """
+    reads = []
+    for node in nuke.allNodes(recurseGroups=True):
+        if node.Class() not in READ_CLASSES:
+            continue
+        if node.knob('disable') and node['disable'].value():
+            continue
+
+        # nuke.filename evaluates any tcl in the file knob but leaves the frame pattern alone
+        path = nuke.filename(node)
+        first = int(node['first'].value()) if node.knob('first') else None
+        last = int(node['last'].value()) if node.knob('last') else None
+        reads.append((node.fullName(), path, first, last))
+    return reads
+
+
+@instrumented()
+def preflight(verbose=False):
+    """
+    <usage: preflight()>
+    checks the script's file dependencies and shows a report of anything missing, incomplete or zero bytes
+    @param verbose: list the dependencies that passed as well
+    @return: list of dependency_check.DependencyReport, failures first
+    """
+    dependencies = dependency_check.collect(collect_reads())
+    reports = dependency_check.check(dependencies)
+
+    report = dependency_check.format_report(reports, verbose)
+    logger.info(report)
+
+    if all(dependency_check.is_ok(r) for r in reports):
+        nuke.message('Preflight passed: {} dependencies found'.format(len(reports)))
+    else:
+        nuke.message(report)
+
+    return reports
@@ -0,0 +1,122 @@
+"""
+version update
+
+bumps Reads to the latest version on disk. every path is resolved through one shared path.VersionIndex,
+so each folder is listed once however many Reads point into it. the changes are previewed before being
+applied in a single undo step
+"""
+
+import logging
+from collections import namedtuple
+
+import nuke
+
+from utils.path import VersionIndex, extract_version, version_to_string
+from utils.instrument import instrumented
+
+logger = logging.getLogger(__name__)
+
+ReadUpdate = namedtuple('ReadUpdate', 'name old_path new_path old_range new_range')
+
+
+def find_updates(nodes=None):
+    """
+    finds the Reads that have a newer version on disk
+    @param nodes: Reads to check, the selected Reads or every Read in the script when None
+    @rtype: list of L{ReadUpdate}
+    """
+    if nodes is None:
+        nodes = [node for node in nuke.selectedNodes() if node.Class() == 'Read'] or nuke.allNodes('Read')
+
+    index = VersionIndex()
+    updates = []
+
+    for node in nodes:
+        old_path = node['file'].value()
+        if not old_path or '[' in old_path:
+            # expression driven paths are left alone
+            continue
+
+        new_path = index.find_latest(old_path)
+        if new_path is None or _version_key(new_path) <= _version_key(old_path):
+            # only newer versions: not another user's copy of the same take, nor an older version when
+            # the current one isn't on disk yet
+            continue
+
+        old_range = (int(node['first'].value()), int(node['last'].value()))
+        new_range = index.frame_range(new_path)
+        if new_range[0] is None:
+            new_range = old_range
+
+        updates.append(ReadUpdate(node.name(), old_path, new_path, old_range, new_range))
+
+    return updates
+
+
+def _version_key(filepath):
+    # (version, take), ignoring the user initials
+    version = extract_version(filepath)
+    return version.version or 0, version.take or 0
+
+
+def format_preview(updates):
+    """
+    @return: one line per update, eg. Read1: v003 -> v005 (1001-1040 -> 1001-1052)
+    """
+    lines = []
+    for update in updates:
+        line = '{}: {} -> {}'.format(update.name,
+                                     version_to_string(extract_version(update.old_path)),
+                                     version_to_string(extract_version(update.new_path)))
+        if update.old_range != update.new_range:
+            line += '  ({}-{} -> {}-{})'.format(*(update.old_range + update.new_range))
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def apply_updates(updates):
+    """
+    sets the new paths and frame ranges in a single undo step
+    """
+    undo = nuke.Undo()
+    undo.begin('Update Reads to latest')
+    try:
+        for update in updates:
+            node = nuke.toNode(update.name)
+            if node is None:
+                logger.warning('{} no longer exists, skipping'.format(update.name))
+                continue
+
+            first, last = update.new_range
+            node['file'].setValue(update.new_path)
+            # widen before narrowing so first never has to pass last
+            for knob in ('origlast', 'last'):
+                node[knob].setValue(max(last, node[knob].value()))
+            for knob in ('origfirst', 'first'):
+                node[knob].setValue(first)
+            for knob in ('origlast', 'last'):
+                node[knob].setValue(last)
+    finally:
+        undo.end()
+
+
+@instrumented()
+def update_reads_to_latest(nodes=None):
+    """
+    <usage: update_reads_to_latest()>
+    previews the Reads (selected, or all) with a newer version on disk and updates them when confirmed
+    @return: the updates applied
+    """
+    updates = find_updates(nodes)
+    if not updates:
+        nuke.message('All Reads are at their latest version')
+        return []
+
+    panel = nuke.Panel('Update {} Reads to latest'.format(len(updates)))
+    panel.setWidth(700)
+    panel.addMultilineTextInput('changes', format_preview(updates))
+    if not panel.show():
+        return []
+
+    apply_updates(updates)
+    return updates
@@ -0,0 +1,218 @@
+"""
+bbox_scan
+
+frame-range aware bbox scanner. samples each node's bbox over a frame range - strided, then refined
+around the worst frame found - and reports the nodes whose bbox grows furthest past their format.
+results are cached per node against a hash of the node and everything upstream of it, so a rescan
+only samples the nodes that changed since the last one.
+"""
+
+import hashlib
+import logging
+from collections import namedtuple
+
+import nuke
+
+logger = logging.getLogger(__name__)
+
+# peak bbox of a node: bbox area / format area, the frame it peaks at and the bbox (x, y, w, h) there
+BBoxResult = namedtuple('BBoxResult', 'name node_class ratio frame bbox')
+
+# knobs that don't change what a node outputs
+_IGNORED_KNOBS = ('xpos', 'ypos', 'selected', 'tile_color', 'note_font', 'note_font_size', 'label')
+
+
+class BBoxScanner(object):
+    """
+    scans the DAG for extreme bboxes over a frame range, keeping results between scans
+    """
+
+    def __init__(self, stride=10):
+        """
+        @param stride: distance between the frames sampled in the first pass, refined down to 1 around the peak
+        """
+        self.stride = max(1, int(stride))
+        # {node full name: (upstream hash, frame range, BBoxResult)}
+        self._cache = {}
+
+    def scan(self, first=None, last=None, nodes=None):
+        """
+        runs iter_scan to the end
+        @return: list of L{BBoxResult}, one per node
+        """
+        for _ in self.iter_scan(first, last, nodes):
+            pass
+        return self.results(nodes)
+
+    def iter_scan(self, first=None, last=None, nodes=None):
+        """
+        scans in small steps, so it can be driven by a progress bar or split across idle callbacks.
+        the current frame is restored when the scan ends or is abandoned
+        @return: generator of (frames done, frames to sample), counted over every pass. the count to sample
+                 starts at the most the refinement passes can take and only comes down, so done / total never drops
+        """
+        if first is None:
+            first = int(nuke.root()['first_frame'].value())
+        if last is None:
+            last = int(nuke.root()['last_frame'].value())
+        if nodes is None:
+            nodes = nuke.allNodes()
+        if last < first:
+            raise ValueError('empty frame range {}-{}'.format(first, last))
+
+        frame_range = (first, last, self.stride)
+        hashes = upstream_hashes(nodes)
+
+        stale = []
+        for node in nodes:
+            cached = self._cache.get(node.fullName())
+            if cached is None or cached[0] != hashes[node.fullName()] or cached[1] != frame_range:
+                stale.append(node)
+
+        if not stale:
+            return
+
+        logger.debug('{} of {} nodes to rescan'.format(len(stale), len(nodes)))
+
+        peaks = dict((node.fullName(), (-1.0, None, None)) for node in stale)
+        by_name = dict((node.fullName(), node) for node in stale)
+        frames = dict((frame, stale) for frame in _strided(first, last, self.stride))
+
+        # each refinement pass samples at most two frames per node, and no more than the range holds
+        refine_cap = min(2 * len(stale), last - first + 1)
+        passes_left = _refinement_passes(self.stride)
+
+        original_frame = nuke.frame()
+        try:
+            stride = self.stride
+            done = 0
+            while frames:
+                total = done + len(frames) + passes_left * refine_cap
+                for frame in sorted(frames):
+                    nuke.frame(frame)
+                    for node in frames[frame]:
+                        ratio, bbox = _bbox_ratio(node)
+                        if ratio > peaks[node.fullName()][0]:
+                            peaks[node.fullName()] = (ratio, frame, bbox)
+                    done += 1
+                    yield done, total
+
+                if stride == 1:
+                    break
+                passes_left -= 1
+
+                # refine around each node's peak with half the stride
+                stride = max(1, stride // 2)
+                frames = {}
+                for name, (ratio, peak_frame, bbox) in peaks.items():
+                    for frame in (peak_frame - stride, peak_frame + stride):
+                        if first <= frame <= last:
+                            frames.setdefault(frame, []).append(by_name[name])
+        finally:
+            nuke.frame(original_frame)
+
+        for name, (ratio, frame, bbox) in peaks.items():
+            node = by_name[name]
+            self._cache[name] = (hashes[name], frame_range, BBoxResult(name, node.Class(), ratio, frame, bbox))
+
+    def results(self, nodes=None):
+        """
+        @return: the latest result of every node scanned (or of nodes)
+        @rtype: list of L{BBoxResult}
+        """
+        if nodes is None:
+            return [cached[2] for cached in self._cache.values()]
+        return [self._cache[node.fullName()][2] for node in nodes if node.fullName() in self._cache]
+
+    def clear(self):
+        self._cache.clear()
+
+
+def worst_offenders(results, max_tolerance, sort_key='ratio', limit=None):
+    """
+    @param max_tolerance: how far past its format area (0.1 = 10%) a bbox can grow before being reported
+    @param sort_key: BBoxResult field to sort by, largest first
+    @return: the results over tolerance, sorted
+    """
+    offenders = [r for r in results if r.ratio > 1.0 + max_tolerance]
+    offenders.sort(key=lambda r: getattr(r, sort_key), reverse=True)
+    return offenders[:limit] if limit else offenders
+
+
+def format_report(results):
+    """
+    @return: a text table of results
+    """
+    lines = ['{:<40} {:<16} {:>8} {:>7}  {}'.format('node', 'class', 'ratio', 'frame', 'bbox')]
+    for r in results:
+        lines.append('{:<40} {:<16} {:>8.2f} {:>7}  {}'.format(r.name, r.node_class, r.ratio, r.frame,
+                                                                 '%d, %d, %d, %d' % r.bbox))
+    return '\n'.join(lines)
+
+
+def upstream_hashes(nodes):
+    """
+    hashes each node's class and knobs together with the hashes of its inputs, so a node's hash changes
+    whenever it or anything upstream of it changes. a group or gizmo also folds in the hashes of its Output
+    nodes, so edits inside it change its hash too
+    @return: {node full name: hex digest}
+    """
+    hashes = {}
+
+    for node in nodes:
+        # iterative post-order walk, long chains would exceed the recursion limit
+        stack = [(node, False)]
+        while stack:
+            current, inputs_done = stack.pop()
+            name = current.fullName()
+            if name in hashes:
+                continue
+
+            inputs = [current.input(idx) for idx in range(current.inputs())] + _group_outputs(current)
+            if not inputs_done:
+                stack.append((current, True))
+                stack.extend((upstream, False) for upstream in inputs if upstream is not None)
+                continue
+
+            h = hashlib.md5(current.Class().encode('utf-8'))
+            h.update(_knob_script(current).encode('utf-8'))
+            for upstream in inputs:
+                h.update((hashes[upstream.fullName()] if upstream is not None else '-').encode('utf-8'))
+            hashes[name] = h.hexdigest()
+
+    return hashes
+
+
+def _group_outputs(node):
+    # what a group's output is computed from starts at its Output nodes
+    if not isinstance(node, nuke.Group):
+        return []
+    return [child for child in node.nodes() if child.Class() == 'Output']
+
+
+def _knob_script(node):
+    script = node.writeKnobs(nuke.WRITE_NON_DEFAULT_ONLY | nuke.TO_SCRIPT)
+    return '\n'.join(line for line in script.split('\n') if line.strip().split(' ', 1)[0] not in _IGNORED_KNOBS)
+
+
+def _bbox_ratio(node):
+    bbox = node.bbox()
+    fmt = node.format()
+    area = float(fmt.width() * fmt.height()) or 1.0
+    return bbox.w() * bbox.h() / area, (bbox.x(), bbox.y(), bbox.w(), bbox.h())
+
+
+def _refinement_passes(stride):
+    # the stride is halved after every pass until it reaches 1
+    passes = 0
+    while stride > 1:
+        stride //= 2
+        passes += 1
+    return passes
+
+
+def _strided(first, last, stride):
+    frames = list(range(first, last + 1, stride))
+    if frames[-1] != last:
+        frames.append(last)
+    return frames
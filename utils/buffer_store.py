@@ -0,0 +1,277 @@
+"""
+buffer_store
+
+compressed, content-addressed storage for copy/paste buffers on a shared directory.
+
+    root/objects/<2 first chars of digest>/<sha1 digest>.z (zlib) or .xz (lzma)
+    root/manifests/<user>.json
+
+identical buffers are stored once, whoever copies them. every write goes to a temp file in the target
+directory and is renamed into place, so readers never see a partial file. each user only ever writes
+their own manifest, which keeps the history of what they copied and drives eviction.
+"""
+
+import binascii
+import errno
+import hashlib
+import json
+import os
+import time
+import zlib
+import logging
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'zlib': '.z', 'lzma': '.xz'}
+
+
+class BufferStore(object):
+    """Stores, retrieves and evicts compressed buffers under a root directory."""
+
+    def __init__(self, root, compression='zlib'):
+        """
+        @param root: shared directory holding the store
+        @param compression: 'zlib' or 'lzma' - lzma falls back to zlib when the module isn't available
+        """
+        if compression == 'lzma' and lzma is None:
+            logger.warning('lzma is not available, buffers will be compressed with zlib.')
+            compression = 'zlib'
+
+        self.root = root
+        self.compression = compression
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifests_dir = os.path.join(root, 'manifests')
+
+    def put(self, data, user, **metadata):
+        """
+        stores data (bytes) unless an identical buffer is already stored, and records it in user's history
+        @param metadata: extra json-friendly values saved with the history entry
+        @return: the history entry
+        @rtype: dict
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        path = self._store_object(digest, data)
+
+        entry = dict(metadata)
+        entry.update({
+            'digest': digest,
+            'user': user,
+            'time': time.time(),
+            'size': len(data),
+            'stored_size': os.path.getsize(path),
+            'path': os.path.relpath(path, self.root),
+        })
+
+        history = [e for e in self.history(user) if e['digest'] != digest]
+        history.insert(0, entry)
+        self._write_manifest(user, history)
+
+        # another artist's eviction may have deleted the object before the manifest referred to it
+        if self.object_path(digest) is None:
+            self._store_object(digest, data)
+
+        return entry
+
+    def _store_object(self, digest, data):
+        path = self.object_path(digest)
+        if path is None:
+            path = self._object_path(digest, self.compression)
+            _atomic_write(path, _compress(data, self.compression))
+        return path
+
+    def get(self, digest):
+        """
+        @return: the decompressed buffer
+        @rtype: bytes
+        """
+        path = self.object_path(digest)
+        if path is None:
+            raise KeyError('No buffer stored for {}'.format(digest))
+
+        with open(path, 'rb') as f:
+            return _decompress(f.read(), path)
+
+    def object_path(self, digest):
+        """
+        @return: the path of the stored object for digest, whichever compression it was written with, or None
+        """
+        for compression in EXTENSIONS:
+            path = self._object_path(digest, compression)
+            if os.path.exists(path):
+                return path
+
+        return None
+
+    def history(self, user):
+        """
+        @return: the entries copied by user, newest first
+        @rtype: list of dict
+        """
+        try:
+            with open(self.manifest_path(user)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return []
+
+    def users(self):
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        return [name[:-len('.json')] for name in os.listdir(self.manifests_dir) if name.endswith('.json')]
+
+    def entries(self):
+        """
+        @return: every user's history entries, newest first
+        @rtype: list of dict
+        """
+        result = []
+        for user in self.users():
+            result.extend(self.history(user))
+        return sorted(result, key=lambda e: e['time'], reverse=True)
+
+    def evict(self, user, max_entries=None, max_age=None, max_bytes=None):
+        """
+        trims user's history - keeping the newest entries - to at most max_entries entries, no entry older than
+        max_age seconds and at most max_bytes of (uncompressed) buffers, then deletes the objects that no
+        history refers to any more
+        @return: the evicted entries
+        """
+        now = time.time()
+        kept = []
+        evicted = []
+        total = 0
+
+        for entry in self.history(user):
+            total += entry['size']
+            if ((max_entries is not None and len(kept) >= max_entries) or
+                    (max_age is not None and now - entry['time'] > max_age) or
+                    (max_bytes is not None and total > max_bytes)):
+                evicted.append(entry)
+            else:
+                kept.append(entry)
+
+        if not evicted:
+            return []
+
+        self._write_manifest(user, kept)
+
+        # objects are shared by everyone who copied the same buffer, so every manifest is read again here,
+        # as late as possible, and nothing is deleted if one of them can't be read
+        referenced = self._referenced_digests()
+        if referenced is None:
+            logger.warning('Not deleting evicted buffers, a manifest in {} could not be read'.format(self.manifests_dir))
+            return evicted
+
+        for entry in evicted:
+            if entry['digest'] not in referenced:
+                self._delete_object(entry['digest'])
+
+        return evicted
+
+    def _referenced_digests(self):
+        """
+        @return: the digests any user's manifest refers to, or None when a manifest exists but can't be read
+        @rtype: set of str
+        """
+        referenced = set()
+        for user in self.users():
+            path = self.manifest_path(user)
+            try:
+                with open(path) as f:
+                    referenced.update(e['digest'] for e in json.load(f))
+            except (IOError, OSError):
+                # a manifest deleted since the listing refers to nothing
+                if os.path.exists(path):
+                    return None
+            except (ValueError, KeyError, TypeError):
+                return None
+        return referenced
+
+    def _delete_object(self, digest):
+        path = self.object_path(digest)
+        try:
+            if path is not None:
+                os.remove(path)
+        except OSError as e:
+            logger.warning('Could not delete {}: {}'.format(path, e))
+
+    def _object_path(self, digest, compression):
+        return os.path.join(self.objects_dir, digest[:2], digest + EXTENSIONS[compression])
+
+    def manifest_path(self, user):
+        return os.path.join(self.manifests_dir, '{}.json'.format(user))
+
+    def _write_manifest(self, user, history):
+        _atomic_write(self.manifest_path(user), json.dumps(history, indent=1).encode('utf-8'))
+
+
+def decompress_file(path):
+    """
+    @return: the decompressed contents of a stored object file
+    @rtype: bytes
+    """
+    with open(path, 'rb') as f:
+        return _decompress(f.read(), path)
+
+
+def _compress(data, compression):
+    if compression == 'lzma':
+        return lzma.compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data, path):
+    if path.endswith(EXTENSIONS['lzma']):
+        if lzma is None:
+            raise IOError('{} is lzma compressed but lzma is not available'.format(path))
+        return lzma.decompress(data)
+    return zlib.decompress(data)
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # another artist may have created it in the meantime
+            if not os.path.isdir(directory):
+                raise
+
+    handle, tmp_path = _create_temp(directory)
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _create_temp(directory):
+    """
+    creates a hidden temp file in directory with mode 0666, which the kernel narrows with the user's umask.
+    mkstemp would make it readable by its owner only, and reading the umask means setting it process-wide
+    @return: (os-level handle, path)
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+    for _ in range(100):
+        tmp_path = os.path.join(directory, '.tmp_' + binascii.hexlify(os.urandom(8)).decode('ascii'))
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    raise IOError(errno.EEXIST, 'No free temporary file name in {}'.format(directory))
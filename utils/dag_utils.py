@@ -9,12 +9,31 @@ description:
 a collection of utilities and functions related to operations for the Nuke DAG
 """
 
+import os
+import re
+import logging
+import threading
 import nuke
-from utils.node_utils import which_input
+from utils.node_utils import which_input, DagIndex
+from utils import node_utils
+from utils import node_copy, nk_script, node_defaults, bbox_scan
+from utils.instrument import instrumented
 import path
 
+logger = logging.getLogger(__name__)
 
+# Reads created per trip to the main thread by directory_load, and the width of the grid they're laid out in
+READ_CHUNK = 50
+GRID_WIDTH = 3000
 
+# nodes with no image output to take a bbox from
+_NO_BBOX_CLASSES = ('BackdropNode', 'StickyNote', 'Viewer', 'Root')
+
+# kept between calls of scanForExtremeBBoxRange so unchanged nodes aren't rescanned
+_bbox_scanner = None
+
+
+@instrumented()
 def scanForExtremeBBox(maxTolerance):
     """
     <usage: scanForExtremeBBox(maxTolerance<value between 0.1 to 1)>
@@ -28,30 +47,66 @@ def scanForExtremeBBox(maxTolerance):
     frameArea = nuke.Root().format().width() * nuke.Root().format().height()
     maxFrameArea = frameArea + (frameArea * maxTolerance)
 
+    flagged = []
+    cleared = []
+
     for node in nuke.allNodes():
         # if bboxArea exceeds frameArea + tolerance - flag it by setting the node colour to yellow
         node_format_dimensions = node.format().width() * node.format().height()
         max_node_area = node_format_dimensions + (node_format_dimensions * maxTolerance)
         nodeBBoxArea = node.bbox().w() * node.bbox().h()
         if nodeBBoxArea > max_node_area:
-            # set the node colour to yellow
-            node["tile_color"].setValue(3942580479)
+            flagged.append(node)
 
-        elif nodeBBoxArea < maxFrameArea and node["tile_color"].value() == 3942580479:
+        elif nodeBBoxArea < maxFrameArea and node["tile_color"].value() == warningColor:
             # what if node WAS yellow, but adjustments make the bbox ok? Change back to default colour
-            # get the default colour by quickly creating a node of the same class, getting the tile_color value,
-            # then deleting it
+            cleared.append(node)
 
-            tmpNode = nuke.createNode(node.Class())
-            defaultColour = tmpNode["tile_color"].value()
-            node["tile_color"].setValue(defaultColour)
-
-            # now delete the temp node
-            nuke.delete(tmpNode)
+    _flag_nodes(flagged, cleared, warningColor)
 
     return None
 
 
+@instrumented()
+def scanForExtremeBBoxRange(maxTolerance, first=None, last=None, stride=10, limit=20):
+    """
+    <usage: scanForExtremeBBoxRange(maxTolerance<value between 0.1 to 1)>
+    like scanForExtremeBBox, but samples every node's bbox over the frame range (root range by default) and
+    reports the worst offenders with the frame they peak at. nodes unchanged since the last scan are not resampled
+    @return: list of bbox_scan.BBoxResult over tolerance, worst first
+    """
+    warningColor = 3942580479 # yellow
+
+    global _bbox_scanner
+    if _bbox_scanner is None or _bbox_scanner.stride != stride:
+        _bbox_scanner = bbox_scan.BBoxScanner(stride)
+
+    nodes = [node for node in nuke.allNodes() if node.Class() not in _NO_BBOX_CLASSES]
+
+    task = nuke.ProgressTask('Scanning bboxes')
+    try:
+        for done, total in _bbox_scanner.iter_scan(first, last, nodes):
+            if task.isCancelled():
+                return []
+            task.setProgress(int(100.0 * done / total))
+    finally:
+        del task
+
+    results = _bbox_scanner.results(nodes)
+    offenders = bbox_scan.worst_offenders(results, maxTolerance)
+    offending = set(r.name for r in offenders)
+
+    flagged = [node for node in nodes if node.fullName() in offending]
+    cleared = [node for node in nodes
+               if node.fullName() not in offending and node['tile_color'].value() == warningColor]
+    _flag_nodes(flagged, cleared, warningColor)
+
+    if offenders:
+        nuke.message(bbox_scan.format_report(offenders[:limit]))
+
+    return offenders
+
+
 def displayBBoxInfoForNode(node):
     """
     takes a node and returns a display string containing its bbox
@@ -59,6 +114,7 @@ def displayBBoxInfoForNode(node):
     return "%s: %s" % (node.name(), _BBoxDimensionString(node.bbox()))
 
 
+@instrumented()
 def replace_gizmos():
     """
     <usage>: duplicates all gizmos in a script to a group node
@@ -76,48 +132,120 @@ def replace_gizmos():
         if type(each) is nuke.Gizmo:
             scriptgizmos.append(each)
 
+    # index the connections once for the whole script
+    index = DagIndex()
+
     # now we have the gizmos - go through and replace them
     # TODO: implement a try-catch block here
     for gizmo in scriptgizmos:
-        convert_to_group(gizmo)
+        convert_to_group(gizmo, index)
+        index.remove(gizmo)
         nuke.delete(gizmo)  # note - can be fixed with an undo
 
 
-def convert_to_group(gizmo):
+@instrumented()
+def replace_gizmos_batch():
+    """
+    <usage>: converts every gizmo in the script to a group, like replace_gizmos, but in bulk:
+    each gizmo definition is converted once with makeGroup() and pasted in one go for its other
+    instances, which then read their own knob values. all the rewiring comes from one DagIndex.
+    runs as a single undo step, behind a progress bar that can be cancelled between definitions
+    @return: list of the new group nodes
+    """
+    gizmos_by_class = {}
+    class_order = []
+    for each in nuke.allNodes():
+        if type(each) is nuke.Gizmo:
+            if each.Class() not in gizmos_by_class:
+                gizmos_by_class[each.Class()] = []
+                class_order.append(each.Class())
+            gizmos_by_class[each.Class()].append(each)
+
+    total = sum(len(gizmos) for gizmos in gizmos_by_class.values())
+    if not total:
+        return []
+
+    index = DagIndex()
+    taken = set(node.name() for node in nuke.allNodes())
+    groups = []
+
+    task = nuke.ProgressTask('Converting gizmos to groups')
+    undo = nuke.Undo()
+    undo.begin('Convert gizmos to groups')
+
+    try:
+        for gizmo_class in class_order:
+            if task.isCancelled():
+                break
+
+            task.setMessage(gizmo_class)
+            gizmos = gizmos_by_class[gizmo_class]
+
+            template = gizmos[0].makeGroup()
+            names = []
+            for gizmo in gizmos:
+                names.append(node_copy.unique_name(nk_script.group_name(gizmo.name()), taken))
+                taken.add(names[-1])
+
+            template.setName(names[0])
+            new_groups = [template]
+            if len(gizmos) > 1:
+                new_groups += node_copy.paste_copies(node_copy.serialise_nodes([template]), names[1:])
+
+            for idx, (gizmo, newGrpNode) in enumerate(zip(gizmos, new_groups)):
+                if idx > 0:
+                    # copies start out with the first instance's values
+                    newGrpNode.readKnobs(_instance_knobs(gizmo))
+
+                _swap_in_group(gizmo, newGrpNode, index)
+                index.remove(gizmo)
+                nuke.delete(gizmo)
+
+                groups.append(newGrpNode)
+                task.setProgress(int(100.0 * len(groups) / total))
+
+    finally:
+        undo.end()
+        del task
+
+    return groups
+
+
+def convert_to_group(gizmo, index=None):
     """
     <usage>: function takes a gizmo Type and performs copy to group
     while preserving all knob values and input(s)/output(s)
+    index: optional DagIndex of the script, built here when not given
     """
+    if index is None:
+        index = DagIndex()
 
     # copy gizmo to group
     newGrpNode = gizmo.makeGroup()
 
     # give the group a name to identify it's origins
-    newGrpName = gizmo.name() + "_grp"
+    newGrpName = nk_script.group_name(gizmo.name())
     newGrpNode.setName(newGrpName)
 
-    # set the new groups position to an offset of it's original gizmo pos
-    newGrpNode.setXpos(gizmo.xpos())
-    newGrpNode.setYpos(gizmo.ypos())
+    _swap_in_group(gizmo, newGrpNode, index)
 
-    # get number of inputs
-    numInputs = gizmo.inputs()
-    idx = 0
+    return newGrpNode
 
-    # iterate through inputs and assign new connections
-    while idx < numInputs:
-        newGrpNode.setInput(idx, gizmo.input(idx))
-        idx += 1
 
-    # do the same for outputs
-    outputs = gizmo.dependent()
+def _swap_in_group(gizmo, newGrpNode, index):
+    """
+    helper for convert_to_group() and replace_gizmos_batch(): puts the group where the gizmo is, with
+    the gizmo's inputs, and connects everything the gizmo fed to the group instead
+    """
+    # set the new groups position to it's original gizmo pos
+    newGrpNode.setXYpos(gizmo.xpos(), gizmo.ypos())
+
+    # iterate through inputs and assign new connections
+    for idx in range(gizmo.inputs()):
+        index.connect(newGrpNode, idx, gizmo.input(idx))
 
-    # iterate through outputs
-    for connNode in outputs:
-        # find the input that's connected to the original gizmo
-        connectedIdx = which_input(gizmo, connNode)
-        # connect it to the new Group node
-        connNode.setInput(connectedIdx, newGrpNode)
+    # do the same for outputs - connect every input fed by the original gizmo to the new Group node
+    index.replace(gizmo, newGrpNode)
 
 
 def postageStampsToggle():
@@ -137,14 +265,8 @@ def resetNodesToDefaultColours(nodes):
     """
 
     try:
-        for node in nodes:
-            # apply only to those nodes that are yellow
-            if node['tile_color'].value() == 3942580479:
-                # get tmp node based on class
-                tmpNode = nuke.createNode(node.Class())
-                defaultColour = tmpNode["tile_color"].value()
-                node["tile_color"].setValue(defaultColour)
-                nuke.delete(tmpNode)
+        # apply only to those nodes that are yellow
+        node_defaults.reset_tile_colors([node for node in nodes if node['tile_color'].value() == 3942580479])
 
     except TypeError:
         print "ERROR! argument must be a list, even if it's a single element"
@@ -192,39 +314,59 @@ def lutList():
 
 def changeColorPanel():
     """
-    displays all current read nodes and their existing colorspace
-    select a colorspace to change to, and then select the read nodes
-    you wish to change, and click OK
+    displays all current read nodes and their existing colorspace in the colorspace manager,
+    where they can be filtered, grouped by sequence and changed in bulk
     """
-    panel = nuke.Panel('Change Colorspace')
-
-    #add pulldown for choice of colorspace
-    luts = ' '.join(lutList())
-    spaces = panel.addEnumerationPulldown("new colorspace", luts)
-
-    for each in nuke.allNodes("Read"):
-        readFileName = each["file"].value().split('/').pop().split('.').pop(0)
-        panel.addBooleanCheckBox("%s :[%s]" % (readFileName, each["colorspace"].value()), False)
-
-    ret = panel.show()
-
-    for each in nuke.allNodes("Read"):
-        readFileName = each["file"].value().split('/').pop().split('.').pop(0)
-        if panel.value("%s :[%s]" % (readFileName, each["colorspace"].value())):
-            each["colorspace"].setValue(panel.value("new colorspace"))
+    from tools import colorspace_manager
+    colorspace_manager.display_colorspace_manager()
 
 
+@instrumented()
 def directory_load():
+    """
+    <usage: directory_load()>
+    imports every sequence and movie under a directory as Reads. the directory is scanned and every
+    frame range resolved on a worker thread, then the Reads are created in chunks on the main thread
+    behind a cancellable progress bar, laid out in a grid below the existing nodes
+    """
 
     user_path = nuke.getInput('Path to files:', 'path')
 
     if user_path:
-        results = _parse_dir(user_path)
-        _create_reads(results)
+        worker = threading.Thread(target=_directory_load_worker, args=(user_path,))
+        worker.daemon = True
+        worker.start()
 
 
 # Helper Methods
 
+def _flag_nodes(flagged, cleared, warningColor):
+    # apply all the colour changes in one undo step
+    defaultColours = node_defaults.default_tile_colors(cleared)
+
+    undo = nuke.Undo()
+    undo.begin('Flag extreme bboxes')
+    try:
+        for node in flagged:
+            # set the node colour to yellow
+            node["tile_color"].setValue(warningColor)
+        for node, defaultColour in defaultColours:
+            node["tile_color"].setValue(defaultColour)
+    finally:
+        undo.end()
+
+
+def _instance_knobs(gizmo):
+    """
+    helper for replace_gizmos_batch(): every knob value of a gizmo, as a script a group can readKnobs() from
+    """
+    skip = ('name', 'xpos', 'ypos', 'selected')
+    script = gizmo.writeKnobs(nuke.WRITE_ALL | nuke.TO_SCRIPT)
+    # values can span several lines, so the knobs are parsed rather than filtered line by line
+    return '\n'.join('{} {}'.format(name, value) for name, value in nk_script.parse_knobs(script.split('\n'))
+                     if name not in skip)
+
+
 def _parse_dir(dir_path):
 
     results = []
@@ -237,39 +379,103 @@ def _parse_dir(dir_path):
     return results
 
 
-def _create_reads(results):
+def _directory_load_worker(dir_path):
+    # runs off the main thread: everything touching nuke goes through executeInMainThread
+    reads, empty = _resolve_reads(_parse_dir(dir_path))
+
+    skipped = ''
+    if empty:
+        skipped = '\n{} sequences with no frames on disk are skipped.'.format(len(empty))
+        logger.warning('skipping sequences with no frames on disk: {}'.format(', '.join(empty)))
+
+    if not reads:
+        nuke.executeInMainThread(nuke.message, ('No sequences found to import.' + skipped,))
+        return
+
+    if not nuke.executeInMainThreadWithResult(nuke.ask, ('About to import {} read nodes.{}'.format(len(reads), skipped),)):
+        return
 
-    movs = ['mov', 'mp4', 'mkv']
-    count = 0
-    seqs = []
-    files = []
+    origin = nuke.executeInMainThreadWithResult(_grid_origin)
+
+    # one undo group across every chunk and the layout, so the whole import is undone in one step
+    undo = nuke.Undo()
+    nuke.executeInMainThreadWithResult(undo.begin, ('Import Reads',))
+
+    created = []
+    task = nuke.ProgressTask('Importing Reads')
+    try:
+        for start in range(0, len(reads), READ_CHUNK):
+            if task.isCancelled():
+                break
+            task.setMessage('{} of {}'.format(start, len(reads)))
+            task.setProgress(int(100.0 * start / len(reads)))
+            created.extend(nuke.executeInMainThreadWithResult(_create_reads, (reads[start:start + READ_CHUNK],)))
+
+        # unconnected Reads are each their own cluster, so the layout packs them into a grid
+        nuke.executeInMainThreadWithResult(node_utils.apply_layout, (created, origin),
+                                           {'max_width': GRID_WIDTH})
+    finally:
+        del task
+        nuke.executeInMainThreadWithResult(undo.end)
+
+
+def _resolve_reads(results):
+    """
+    @return: ([(file, first, last) for each sequence and movie], [sequences with no frames on disk]).
+             first and last are None for movies. every frame range is read from the directory listings up
+             front rather than lazily in the UI thread
+    """
+
+    movs = ['.mov', '.mp4', '.mkv']
+    index = path.VersionIndex()
+    reads = []
+    empty = []
 
     for result in results:
 
         if result.is_sequence():
             if '.checkpoint' not in result.extension():
-                count += 1
-                seqs.append(result)
-
-        if result.is_file() and any(ext in result.basename() for ext in movs):
-            count += 1
-            files.append(result)
-
-    if count > 0:
-        if nuke.ask('About to import {} read nodes.'.format(count)):
-            # proceed
-            for task in seqs:
-                new_read = nuke.createNode('Read')
-                new_read.knob('file').setValue(task.pattern(frame_pattern='%04d'))
-                new_read.knob('first').setValue(task.start_frame())
-                new_read.knob('last').setValue(task.end_frame())
-
-            for task in files:
-                new_read = nuke.createNode('Read')
-                new_read.knob('file').fromUserText(task.reference_path())
-
-    else:
-        nuke.message('No sequences found to import.')
+                file_path = result.pattern(frame_pattern='%04d')
+                first, last = index.frame_range(file_path)
+                if first is None:
+                    # a Read made from it would only show errors
+                    empty.append(file_path)
+                else:
+                    reads.append((file_path, first, last))
+
+        elif result.extension() in movs:
+            reads.append((result.reference_path(), None, None))
+
+    return reads, empty
+
+
+def _grid_origin():
+    # below and left aligned with whatever is already in the DAG
+    nodes = nuke.allNodes()
+    if not nodes:
+        return 0, 0
+    return min(n.xpos() for n in nodes), max(n.ypos() + n.screenHeight() for n in nodes) + 150
+
+
+def _create_reads(reads):
+    """
+    creates a chunk of Reads, inside the undo group opened by _directory_load_worker
+    @return: the Reads created
+    """
+    created = []
+
+    for file_path, first, last in reads:
+        new_read = nuke.nodes.Read()
+        if first is None:
+            # movies: nuke reads the range from the file
+            new_read.knob('file').fromUserText(file_path)
+        else:
+            new_read.knob('file').setValue(file_path)
+            new_read.knob('first').setValue(first)
+            new_read.knob('last').setValue(last)
+        created.append(new_read)
+
+    return created
 
 
 def _BBoxDimensionString(bboxInfo):
@@ -0,0 +1,222 @@
+"""
+dependency check
+
+checks that the files a script reads are on disk with the frames it needs. every path is resolved to a
+L{Sequence} or L{File}, each directory involved is listed once and the listings run concurrently, so
+hundreds of Reads spread over a few dozen directories check in about the time of the slowest listing.
+no nuke dependency - tools.preflight collects the paths from the script
+"""
+
+import os
+import logging
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from utils.path import path_object
+
+# os from python 3.5, else the scandir backport. scandir is looked up on the module at each call, so
+# utils.instrument counts it
+if hasattr(os, 'scandir'):
+    _scandir = os
+else:
+    try:
+        import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+logger = logging.getLogger(__name__)
+
+# directory listings are io bound, more threads than cores is fine
+THREADS = 16
+
+# result of checking one path
+# missing: frames in first-last that aren't on disk
+# outside: frames on disk that first-last doesn't reach
+# empty: zero-byte frames (or [None] for a zero-byte single file)
+DependencyReport = namedtuple('DependencyReport', 'path nodes first last exists missing outside empty')
+
+
+class Dependency(object):
+    """
+    a path read by one or more nodes, with the frame range they read
+    """
+
+    __slots__ = ('path', 'first', 'last', 'nodes')
+
+    def __init__(self, path, first=None, last=None):
+        self.path = path
+        self.first = first
+        self.last = last
+        self.nodes = []
+
+    def add(self, node_name, first=None, last=None):
+        """
+        records another node reading this path, widening the frame range to cover it
+        """
+        self.nodes.append(node_name)
+        if first is not None:
+            self.first = first if self.first is None else min(self.first, first)
+        if last is not None:
+            self.last = last if self.last is None else max(self.last, last)
+
+
+def collect(reads):
+    """
+    dedupes (node name, path, first, last) tuples into one L{Dependency} per path
+    @rtype: list of L{Dependency}
+    """
+    dependencies = {}
+    for node_name, path, first, last in reads:
+        if not path:
+            continue
+        dependency = dependencies.get(path)
+        if dependency is None:
+            dependency = dependencies[path] = Dependency(path)
+        dependency.add(node_name, first, last)
+    return list(dependencies.values())
+
+
+def check(dependencies, threads=THREADS):
+    """
+    @type dependencies: list of L{Dependency}
+    @return: one report per dependency, failures first
+    @rtype: list of L{DependencyReport}
+    """
+    objects = [(dependency, path_object(dependency.path)) for dependency in dependencies]
+    directories = sorted(set(os.path.dirname(dependency.path) for dependency in dependencies))
+
+    pool = ThreadPool(max(1, min(threads, len(directories))))
+    try:
+        listings = dict(zip(directories, pool.map(list_directory, directories)))
+    finally:
+        pool.close()
+        pool.join()
+
+    reports = []
+    for dependency, path_obj in objects:
+        listing = listings[os.path.dirname(dependency.path)]
+        if path_obj.is_sequence():
+            reports.append(_check_sequence(dependency, path_obj, listing))
+        else:
+            reports.append(_check_file(dependency, listing))
+
+    reports.sort(key=lambda report: (is_ok(report), report.path))
+    return reports
+
+
+def is_ok(report):
+    return report.exists and not report.missing and not report.empty
+
+
+def list_directory(directory):
+    """
+    @return: {file name: size in bytes}, or None if the directory can't be listed
+    """
+    try:
+        if _scandir is not None:
+            listing = {}
+            for entry in _scandir.scandir(directory or '.'):
+                try:
+                    listing[entry.name] = entry.stat().st_size
+                except OSError:
+                    # broken link, or removed since listing
+                    listing[entry.name] = 0
+            return listing
+
+        return dict((name, _size(os.path.join(directory, name))) for name in os.listdir(directory or '.'))
+    except OSError as e:
+        logger.debug('unable to list {}: {}'.format(directory, e))
+        return None
+
+
+def format_report(reports, verbose=False):
+    """
+    @param verbose: include the dependencies that passed
+    @return: text summary of reports
+    """
+    lines = []
+    for report in reports:
+        if is_ok(report) and not verbose:
+            continue
+
+        if not report.exists:
+            status = 'MISSING'
+        elif report.missing or report.empty:
+            status = 'INCOMPLETE'
+        else:
+            status = 'ok'
+
+        lines.append('{}  {}  ({})'.format(status, report.path, ', '.join(report.nodes)))
+        if report.missing:
+            lines.append('    missing frames: {}'.format(frame_ranges(report.missing)))
+        if report.empty and report.empty != [None]:
+            lines.append('    zero-byte frames: {}'.format(frame_ranges(report.empty)))
+        elif report.empty:
+            lines.append('    zero-byte file')
+        if report.outside:
+            lines.append('    frames on disk outside {}-{}: {}'.format(report.first, report.last,
+                                                                      frame_ranges(report.outside)))
+
+    failed = sum(1 for report in reports if not is_ok(report))
+    lines.append('{} of {} dependencies failed'.format(failed, len(reports)))
+    return '\n'.join(lines)
+
+
+def frame_ranges(frames):
+    """
+    @return: frames collapsed into ranges, eg. [1, 2, 3, 7] -> '1-3, 7'
+    """
+    ranges = []
+    start = previous = None
+    for frame in sorted(frames):
+        if previous is not None and frame == previous + 1:
+            previous = frame
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else '{}-{}'.format(start, previous))
+        start = previous = frame
+    if start is not None:
+        ranges.append(str(start) if start == previous else '{}-{}'.format(start, previous))
+    return ', '.join(ranges)
+
+
+def _check_sequence(dependency, seq, listing):
+    prefix = seq.basename() + '.'
+    extension = seq.extension()
+
+    frames = {}
+    for name, size in (listing or {}).items():
+        if name.startswith(prefix) and name.endswith(extension):
+            frame = name[len(prefix):len(name) - len(extension)]
+            if frame.isdigit():
+                frames[int(frame, 10)] = size
+
+    first, last = dependency.first, dependency.last
+    if first is None or last is None:
+        # no range given, check for holes between the first and last frames on disk
+        first = min(frames) if frames else None
+        last = max(frames) if frames else None
+
+    if frames:
+        wanted = range(first, last + 1)
+        missing = [frame for frame in wanted if frame not in frames]
+        outside = sorted(frame for frame in frames if frame < first or frame > last)
+        empty = sorted(frame for frame, size in frames.items() if size == 0 and first <= frame <= last)
+    else:
+        missing, outside, empty = [], [], []
+
+    return DependencyReport(dependency.path, dependency.nodes, first, last, bool(frames), missing, outside, empty)
+
+
+def _check_file(dependency, listing):
+    size = (listing or {}).get(os.path.basename(dependency.path))
+    exists = size is not None
+    return DependencyReport(dependency.path, dependency.nodes, dependency.first, dependency.last,
+                            exists, [], [], [None] if size == 0 else [])
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
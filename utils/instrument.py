@@ -0,0 +1,224 @@
+"""
+instrument
+
+opt-in instrumentation for the tool entry points. a function decorated with @instrumented records,
+per call, its wall time and how many filesystem calls (glob, stat, listdir, scandir) and nuke API calls
+(createNode, nodeCopy, allNodes, ..., and the knob calls counted with count()) were made while it ran. calls are written either as a chrome trace
+(open in chrome://tracing or perfetto) or as json lines to a rotating log.
+
+nothing is patched or recorded until enable() is called, or ISOTOPE_INSTRUMENT is set in the environment:
+
+    ISOTOPE_INSTRUMENT=trace    chrome trace, to ISOTOPE_INSTRUMENT_PATH or ~/isotope_trace.json
+    ISOTOPE_INSTRUMENT=log      rotating log, to ISOTOPE_INSTRUMENT_PATH or ~/isotope_instrument.log
+
+counts are process wide, so calls made by other threads while a function runs are counted against it.
+the functions are counted by replacing them on their module, so only calls looked up through it are seen:
+call os.stat(), not a stat bound by 'from os import stat' before instrumentation started. knob methods
+(valueAt, setValueAt, ...) are built in to nuke and can't be replaced, the tools count them with count().
+"""
+
+import functools
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+TRACE = 'trace'
+LOG = 'log'
+
+DEFAULT_PATHS = {TRACE: '~/isotope_trace.json', LOG: '~/isotope_instrument.log'}
+
+# rotating log size and backups
+LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# (module, function) counted once patched. scandir is the python 2 backport, skipped when it isn't installed
+FS_CALLS = (('glob', 'glob'), ('glob', 'iglob'), ('os', 'stat'), ('os', 'listdir'), ('os', 'scandir'),
+            ('scandir', 'scandir'))
+NUKE_CALLS = (('nuke', 'createNode'), ('nuke', 'nodeCopy'), ('nuke', 'nodePaste'), ('nuke', 'allNodes'),
+              ('nuke', 'toNode'), ('nuke', 'frame'))
+
+counts = Counter()
+
+_mode = None
+_writer = None
+_patched = []
+_lock = threading.Lock()
+
+
+def enable(mode=TRACE, path=None):
+    """
+    starts recording instrumented calls
+    @param mode: TRACE or LOG
+    @param path: file written to, DEFAULT_PATHS[mode] when None
+    """
+    global _mode, _writer
+
+    if mode not in DEFAULT_PATHS:
+        raise ValueError('unknown instrumentation mode {}, expected one of {}'.format(mode, sorted(DEFAULT_PATHS)))
+
+    disable()
+
+    path = os.path.expanduser(path or DEFAULT_PATHS[mode])
+    _writer = _TraceWriter(path) if mode == TRACE else _LogWriter(path)
+    _mode = mode
+
+    _patch(FS_CALLS, 'fs')
+    _patch(NUKE_CALLS, 'nuke')
+
+    logger.info('instrumenting to {}'.format(path))
+
+
+def disable():
+    """
+    stops recording and restores everything patched
+    """
+    global _mode, _writer
+
+    for owner, attr, original in reversed(_patched):
+        setattr(owner, attr, original)
+    del _patched[:]
+
+    if _writer is not None:
+        _writer.close()
+    _writer = None
+    _mode = None
+
+
+def is_enabled():
+    return _mode is not None
+
+
+def count(key, n=1):
+    """
+    counts n calls the instrumentation can't patch, eg. count('nuke.valueAt', 16) after reading a matrix.
+    nothing is counted until instrumentation is enabled
+    @param key: category.call, like the patched calls' keys
+    """
+    if _mode is not None:
+        counts[key] += n
+
+
+def instrumented(name=None):
+    """
+    decorator recording each call of the function when instrumentation is enabled
+    @param name: name of the trace event, module.function when None
+    """
+    def decorator(func):
+        event_name = name or '{}.{}'.format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _mode is None:
+                return func(*args, **kwargs)
+
+            before = counts.copy()
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.time() - start
+                calls = counts.copy()
+                calls.subtract(before)
+                _record(event_name, start, duration, dict((k, v) for k, v in calls.items() if v))
+
+        return wrapper
+
+    return decorator
+
+
+def _record(name, start, duration, calls):
+    with _lock:
+        if _writer is not None:
+            try:
+                _writer.write(name, start, duration, calls)
+            except (IOError, OSError) as e:
+                logger.warning('unable to record {}: {}'.format(name, e))
+
+
+def _patch(calls, category):
+    for module_name, attr in calls:
+        owner = _resolve(module_name)
+        original = getattr(owner, attr, None) if owner is not None else None
+        if original is None:
+            continue
+
+        key = '{}.{}'.format(category, attr)
+        try:
+            setattr(owner, attr, _counting(original, key))
+        except (TypeError, AttributeError):
+            logger.debug('{}.{} can\'t be patched, not counted'.format(module_name, attr))
+            continue
+        _patched.append((owner, attr, original))
+
+
+def _counting(func, key):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counts[key] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _resolve(module_name):
+    # None when the module isn't importable
+    try:
+        return __import__(module_name)
+    except ImportError:
+        return None
+
+
+class _TraceWriter(object):
+    """
+    appends complete ('X') events to a chrome trace. the trace format allows the closing bracket to be
+    left off, so events are appended as they happen and a crash loses nothing
+    """
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a')
+        if new:
+            self._file.write('[\n')
+        self._pid = os.getpid()
+
+    def write(self, name, start, duration, calls):
+        event = {'name': name, 'cat': 'isotope', 'ph': 'X', 'pid': self._pid,
+                 'tid': threading.current_thread().ident,
+                 'ts': int(start * 1e6), 'dur': int(duration * 1e6), 'args': calls}
+        self._file.write(json.dumps(event) + ',\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _LogWriter(object):
+    """
+    one json line per call to a rotating log
+    """
+
+    def __init__(self, path):
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS)
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def write(self, name, start, duration, calls):
+        record = logging.LogRecord(__name__, logging.INFO, __file__, 0, json.dumps({
+            'name': name, 'time': start, 'duration': round(duration, 6), 'user': os.getenv('USER'),
+            'calls': calls}), None, None)
+        self._handler.emit(record)
+
+    def close(self):
+        self._handler.close()
+
+
+if os.getenv('ISOTOPE_INSTRUMENT'):
+    try:
+        enable(os.getenv('ISOTOPE_INSTRUMENT'), os.getenv('ISOTOPE_INSTRUMENT_PATH'))
+    except (ValueError, IOError, OSError) as e:
+        logger.warning('instrumentation not enabled: {}'.format(e))
@@ -0,0 +1,225 @@
+"""
+layout
+
+layered (Sugiyama style) graph layout for the DAG. works on plain hashable ids and (upstream, downstream)
+edges with no nuke dependency - node_utils.apply_layout maps nodes in and writes the positions back.
+
+each connected cluster is laid out on its own:
+ - layers: a node sits one row below its lowest input
+ - edges spanning several rows get a placeholder in every row they cross, so they take part in ordering
+ - ordering: alternate downward and upward barycenter sweeps to cut down edge crossings
+ - placement: nodes are pulled towards the mean position of their inputs without overlapping
+
+then clusters are packed left to right, wrapping into shelves once a row of clusters passes max_width.
+everything is linear in the number of nodes and edges per sweep.
+"""
+
+from collections import defaultdict, namedtuple
+
+# barycenter sweeps (each one downward and upward) and placement passes
+SWEEPS = 4
+PLACEMENT_PASSES = 2
+
+# a laid out cluster: its node ids and (left, top, right, bottom) bounds, without node size
+Cluster = namedtuple('Cluster', 'nodes bounds')
+
+
+class _Dummy(object):
+    """placeholder for an edge crossing a layer"""
+    __slots__ = ()
+
+
+def layered_layout(nodes, edges, spacing=(110, 80), origin=(0, 0), clusters=None, cluster_gap=150, max_width=None):
+    """
+    @param nodes: node ids
+    @param edges: (upstream, downstream) id pairs. edges to ids not in nodes are ignored
+    @param spacing: (x, y) distance between neighbouring node positions
+    @param clusters: {node id: cluster key} to lay out groups separately, connected components when None
+    @param cluster_gap: space left between clusters
+    @param max_width: wrap clusters onto a new shelf past this width, one row of clusters when None
+    @return: ({node id: (x, y)}, [L{Cluster}, ...])
+    """
+    nodes = list(nodes)
+    node_set = set(nodes)
+    inputs = defaultdict(list)
+    outputs = defaultdict(list)
+    for upstream, downstream in edges:
+        if upstream in node_set and downstream in node_set and upstream != downstream:
+            inputs[downstream].append(upstream)
+            outputs[upstream].append(downstream)
+
+    if clusters is None:
+        groups = _components(nodes, inputs, outputs)
+    else:
+        by_key = defaultdict(list)
+        for node in nodes:
+            by_key[clusters.get(node)].append(node)
+        groups = list(by_key.values())
+
+    positions = {}
+    laid_out = []
+    x, y, shelf_height = origin[0], origin[1], 0
+    for group in groups:
+        local = _layout_cluster(group, inputs, outputs, spacing)
+        width = max(p[0] for p in local.values())
+        height = max(p[1] for p in local.values())
+
+        if max_width is not None and x > origin[0] and x - origin[0] + width > max_width:
+            x, y, shelf_height = origin[0], y + shelf_height + cluster_gap, 0
+
+        for node, (lx, ly) in local.items():
+            positions[node] = (x + lx, y + ly)
+        laid_out.append(Cluster(group, (x, y, x + width, y + height)))
+
+        x += width + cluster_gap
+        shelf_height = max(shelf_height, height)
+
+    return positions, laid_out
+
+
+def _components(nodes, inputs, outputs):
+    seen = set()
+    groups = []
+    for node in nodes:
+        if node in seen:
+            continue
+        seen.add(node)
+        group = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            group.append(current)
+            for other in inputs[current] + outputs[current]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        groups.append(group)
+    return groups
+
+
+def _layout_cluster(group, inputs, outputs, spacing):
+    """
+    @return: {node id: (x, y)} relative to the cluster's top left
+    """
+    member = set(group)
+    layers = _assign_layers(group, inputs, outputs, member)
+
+    # edges in the cluster, with back edges of any cycle dropped and long edges split by dummies
+    rows = defaultdict(list)
+    for node in group:
+        rows[layers[node]].append(node)
+
+    ups = defaultdict(list)
+    downs = defaultdict(list)
+    for node in group:
+        for upstream in inputs[node]:
+            if upstream not in member or layers[upstream] >= layers[node]:
+                continue
+            previous = upstream
+            for layer in range(layers[upstream] + 1, layers[node]):
+                dummy = _Dummy()
+                rows[layer].append(dummy)
+                ups[dummy].append(previous)
+                downs[previous].append(dummy)
+                previous = dummy
+            ups[node].append(previous)
+            downs[previous].append(node)
+
+    order = [rows[layer] for layer in range(len(rows))]
+    _reduce_crossings(order, ups, downs)
+    xs = _place(order, ups, downs, spacing[0])
+
+    positions = {}
+    for layer, row in enumerate(order):
+        for node in row:
+            if not isinstance(node, _Dummy):
+                positions[node] = (xs[node], layer * spacing[1])
+    return positions
+
+
+def _assign_layers(group, inputs, outputs, member):
+    # longest path from the sources, in topological order. nodes left over are on a cycle,
+    # they're released one at a time so their back edges point upwards and get dropped
+    remaining = dict((node, sum(1 for up in inputs[node] if up in member)) for node in group)
+    layers = {}
+    ready = [node for node in group if remaining[node] == 0]
+    pending = list(reversed(group))
+
+    while len(layers) < len(group):
+        if not ready:
+            while pending[-1] in layers:
+                pending.pop()
+            ready.append(pending.pop())
+
+        node = ready.pop()
+        if node in layers:
+            continue
+        layers[node] = max([layers[up] + 1 for up in inputs[node] if up in layers] or [0])
+        for downstream in outputs[node]:
+            if downstream in remaining and downstream not in layers:
+                remaining[downstream] -= 1
+                if remaining[downstream] == 0:
+                    ready.append(downstream)
+
+    return layers
+
+
+def _reduce_crossings(order, ups, downs):
+    for _ in range(SWEEPS):
+        for layer in range(1, len(order)):
+            _sort_by_barycenter(order[layer], order[layer - 1], ups)
+        for layer in range(len(order) - 2, -1, -1):
+            _sort_by_barycenter(order[layer], order[layer + 1], downs)
+
+
+def _sort_by_barycenter(row, fixed_row, neighbours):
+    index = dict((node, idx) for idx, node in enumerate(fixed_row))
+    keys = {}
+    for idx, node in enumerate(row):
+        linked = [index[other] for other in neighbours[node] if other in index]
+        # nodes with no neighbours in the fixed row keep their place
+        keys[node] = float(sum(linked)) / len(linked) if linked else float(idx)
+    row.sort(key=keys.__getitem__)
+
+
+def _place(order, ups, downs, spacing):
+    xs = {}
+    for row in order:
+        for idx, node in enumerate(row):
+            xs[node] = idx * spacing
+
+    for _ in range(PLACEMENT_PASSES):
+        for layer in range(1, len(order)):
+            _pull_towards(order[layer], ups, xs, spacing)
+        for layer in range(len(order) - 2, -1, -1):
+            _pull_towards(order[layer], downs, xs, spacing)
+
+    left = min(xs.values()) if xs else 0
+    for node in xs:
+        xs[node] -= left
+    return xs
+
+
+def _pull_towards(row, neighbours, xs, spacing):
+    # move each node to the mean of its neighbours, then push apart left to right and
+    # right to left so the row keeps its order and spacing, centred on where it wanted to be
+    wanted = []
+    for node in row:
+        linked = [xs[other] for other in neighbours[node]]
+        wanted.append(float(sum(linked)) / len(linked) if linked else xs[node])
+
+    forward = []
+    for idx, x in enumerate(wanted):
+        forward.append(x if idx == 0 else max(x, forward[-1] + spacing))
+    backward = [0] * len(wanted)
+    for idx in range(len(wanted) - 1, -1, -1):
+        x = wanted[idx]
+        backward[idx] = x if idx == len(wanted) - 1 else min(x, backward[idx + 1] - spacing)
+
+    for idx, node in enumerate(row):
+        xs[node] = int(round((forward[idx] + backward[idx]) / 2.0))
+
+    # averaging the two passes can squeeze neighbours together, restore the spacing
+    for idx in range(1, len(row)):
+        if xs[row[idx]] < xs[row[idx - 1]] + spacing:
+            xs[row[idx]] = xs[row[idx - 1]] + spacing
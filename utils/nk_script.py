@@ -0,0 +1,520 @@
+"""
+nk_script
+
+low-level helpers for reading and rewriting Nuke script (.nk / .nkcp) text.
+nothing in here imports nuke, so it can be used on the farm or from the command line.
+
+everything goes through one tokenizer: iter_blocks splits a script into statements, node blocks
+included, and a node block's knob lines are split by iter_knobs. parse_knobs, rewrite_top_level_knobs,
+expand_gizmos and iter_nodes are all built on those two.
+"""
+
+import os
+import re
+
+# node classes whose contents are written after their block and closed with 'end_group'
+GROUP_CLASSES = ('Group', 'LiveGroup')
+
+# class given to clone blocks ('clone node7f1a2b|Blur|123 {' or 'clone $C7f1a2b {'), whose class isn't written
+CLONE_CLASS = 'clone'
+
+# suffix given to a group replacing a gizmo, shared by dag_utils.convert_to_group and the offline expansion
+GROUP_SUFFIX = '_grp'
+
+# 'Blur {', ' Blur {' inside a group, 'clone $C7f1a2b {'
+_RE_NODE_OPEN = re.compile(r'^(\s*)(clone [^{]+?|[A-Za-z_][\w.]*) \{\s*$')
+
+
+def brace_delta(line):
+    """
+    returns the change in curly-brace depth across a line of .nk text,
+    ignoring braces that are escaped or inside double quotes
+    @param line: str
+    @return: int
+    """
+    depth = 0
+    in_quote = False
+    escaped = False
+
+    for char in line:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '"':
+            in_quote = not in_quote
+        elif in_quote:
+            continue
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+
+    return depth
+
+
+def group_name(gizmo_name):
+    """
+    @return: the name given to the group that replaces the gizmo gizmo_name
+    """
+    return gizmo_name + GROUP_SUFFIX
+
+
+def opens_group(node_class):
+    """
+    @return: True if the block of node_class is followed by the nodes inside it, up to an end_group
+    """
+    return node_class in GROUP_CLASSES or node_class == 'Gizmo'
+
+
+class Block(object):
+    """
+    one statement of a script: a node block (class, knobs, closing brace) or any
+    other line or brace-balanced run of lines (push, set, end_group, layout xml, ...)
+    """
+
+    __slots__ = ('node_class', 'lines', 'indent')
+
+    def __init__(self, node_class, lines, indent=''):
+        self.node_class = node_class
+        self.lines = lines
+        self.indent = indent
+
+    def is_node(self):
+        return self.node_class is not None
+
+    def knobs(self):
+        """
+        @return: the knobs of a node block, in script order
+        @rtype: list of (name, value)
+        """
+        if not self.is_node():
+            return []
+        return parse_knobs(self.lines[1:-1])
+
+    def knob(self, name, default=None):
+        """
+        @return: the last value set for the knob in the block, or default
+        """
+        value = default
+        for knob_name, knob_value in self.knobs():
+            if knob_name == name:
+                value = knob_value
+        return value
+
+    def text(self):
+        return '\n'.join(self.lines)
+
+
+def node_header(line):
+    """
+    @return: (indent, class) if the line opens a node block, CLONE_CLASS as the class of a clone, otherwise None
+    """
+    match = _RE_NODE_OPEN.match(line)
+    if match is None:
+        return None
+
+    node_class = match.group(2)
+    return match.group(1), CLONE_CLASS if node_class.startswith(CLONE_CLASS + ' ') else node_class
+
+
+def block_class(line):
+    """
+    returns the class name if the line opens a node block at the top level of a script (ie. 'Blur {'), otherwise None
+    """
+    header = node_header(line)
+    if header is None or header[0]:
+        return None
+    return header[1]
+
+
+def iter_blocks(lines):
+    """
+    groups the lines of a script into L{Block}s, holding no more than one block in memory
+    @param lines: iterable of str, such as an open file
+    @return: generator of L{Block}
+    """
+    current = None
+    depth = 0
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        if current is None:
+            delta = brace_delta(line)
+            if delta <= 0:
+                yield Block(None, [line])
+                continue
+
+            header = node_header(line)
+            if header is not None:
+                current = Block(header[1], [line], header[0])
+            else:
+                current = Block(None, [line])
+            depth = delta
+            continue
+
+        current.lines.append(line)
+        depth += brace_delta(line)
+
+        if depth <= 0:
+            yield current
+            current = None
+
+    if current is not None:
+        yield current
+
+
+def iter_knobs(lines):
+    """
+    splits the knob lines of a node block (without its opening and closing lines) into knobs.
+    values spanning several lines are joined with newlines
+    @return: generator of (name, value, index of the knob's first line, index after its last line)
+    """
+    current = None
+    depth = 0
+
+    for idx, line in enumerate(lines):
+        if depth > 0 and current is not None:
+            current[1] += '\n' + line
+        else:
+            if current is not None:
+                yield tuple(current + [idx])
+                current = None
+            parts = line.strip().split(' ', 1)
+            if parts[0]:
+                current = [parts[0], parts[1] if len(parts) > 1 else '', idx]
+
+        depth += brace_delta(line)
+
+    if current is not None:
+        yield tuple(current + [len(lines)])
+
+
+def parse_knobs(lines):
+    """
+    parses the knob lines of a node block (without its opening and closing lines).
+    values spanning several lines are joined with newlines
+    @rtype: list of (name, value)
+    """
+    return [(name, value) for name, value, first, end in iter_knobs(lines)]
+
+
+def rewrite_knobs(block, rewrite):
+    """
+    calls rewrite(node_class, knob_name, value) for every knob of a node block. rewrite returns the new
+    value for the knob, or None to leave it untouched
+    @return: the block's lines, rewritten
+    """
+    lines = block.lines
+    if not block.is_node() or len(lines) < 2:
+        return list(lines)
+
+    knob_lines = lines[1:-1]
+    rewritten = [lines[0]]
+    done = 0
+
+    for name, value, first, end in iter_knobs(knob_lines):
+        new_value = rewrite(block.node_class, name, value)
+        if new_value is None:
+            continue
+        rewritten.extend(knob_lines[done:first])
+        rewritten.append('{} {} {}'.format(block.indent, name, new_value))
+        done = end
+
+    rewritten.extend(knob_lines[done:])
+    rewritten.append(lines[-1])
+    return rewritten
+
+
+def split_header(lines):
+    """
+    splits nodeCopy output into its header (version, cut_paste_input, ...) and the rest of the script,
+    from the first stack command or node block on
+    @return: (header lines, body lines)
+    """
+    lines = list(lines)
+    for idx, line in enumerate(lines):
+        if line.startswith('push ') or block_class(line) is not None:
+            return lines[:idx], lines[idx:]
+    return lines, []
+
+
+def rewrite_top_level_knobs(lines, rewrite):
+    """
+    walks the lines of a script and calls rewrite(node_class, knob_name, value) for every knob of a
+    node sitting at the top level of the script (ie. not inside a pasted group).
+    rewrite returns the new value for the knob, or None to leave it untouched.
+    @param lines: iterable of str (without line endings)
+    @return: generator of rewritten lines
+    """
+    group_depth = 0
+
+    for block in iter_blocks(lines):
+        if not block.is_node():
+            if block.lines[0].strip() == 'end_group':
+                group_depth -= 1
+            for line in block.lines:
+                yield line
+            continue
+
+        if group_depth == 0 and not block.indent:
+            for line in rewrite_knobs(block, rewrite):
+                yield line
+        else:
+            for line in block.lines:
+                yield line
+
+        if opens_group(block.node_class):
+            group_depth += 1
+
+
+# -- knob values --
+
+def knob_channels(value):
+    """
+    splits a knob value into its channels: '{1 {curve x1 0 1} 3}' -> ['1', '{curve x1 0 1}', '3'].
+    a single curve or expression written as {{...}} is one channel
+    """
+    value = value.strip()
+    if not (value.startswith('{') and value.endswith('}')):
+        return [value]
+
+    inner = value[1:-1].strip()
+    items = []
+    depth = 0
+    current = []
+    for char in inner:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        if char.isspace() and depth == 0:
+            if current:
+                items.append(''.join(current))
+                current = []
+            continue
+        current.append(char)
+    if current:
+        items.append(''.join(current))
+
+    return items or [value]
+
+
+def parse_curve(value):
+    """
+    @param value: a '{curve ...}' channel
+    @return: {frame: value} of its keys. interpolation and tangent tokens are skipped
+    """
+    tokens = value.strip('{}').split()[1:]
+    keys = {}
+    frame = 1.0
+    skip = False
+    for token in tokens:
+        if skip:
+            skip = False
+            continue
+        if token.startswith('x'):
+            frame = float(token[1:])
+        elif token[0].isalpha():
+            # tangent tokens carry their value (s0.5), or take the next one (s 0.5)
+            skip = len(token) == 1 and token in 'stuv'
+        else:
+            try:
+                keys[frame] = float(token)
+            except ValueError:
+                continue
+            frame += 1
+    return keys
+
+
+class GizmoLibrary(object):
+    """
+    finds .gizmo files on a search path - the class name of a gizmo is its file name - and caches their
+    definitions, split into the knob lines of the Gizmo block and the nodes inside it
+    """
+
+    def __init__(self, search_paths):
+        self.paths = {}
+        self._definitions = {}
+
+        # first match wins, as on the nuke plugin path
+        for search_path in search_paths:
+            for directory, dirnames, filenames in os.walk(search_path):
+                for filename in filenames:
+                    if filename.endswith('.gizmo'):
+                        self.paths.setdefault(filename[:-len('.gizmo')], os.path.join(directory, filename))
+
+    def __contains__(self, node_class):
+        return node_class in self.paths
+
+    def definition(self, node_class):
+        """
+        @return: (knob lines of the Gizmo block, lines of its contents up to and including end_group)
+        """
+        if node_class not in self._definitions:
+            header = None
+            body = []
+
+            with open(self.paths[node_class]) as f:
+                for block in iter_blocks(f):
+                    if header is not None:
+                        body.extend(block.lines)
+                    elif block.node_class in ('Gizmo', 'Group'):
+                        header = [line for line in block.lines[1:-1] if line.strip().split(' ', 1)[0] != 'name']
+
+            if header is None:
+                raise ValueError('{} does not define a gizmo'.format(self.paths[node_class]))
+
+            self._definitions[node_class] = (header, body)
+
+        return self._definitions[node_class]
+
+
+def default_gizmo_paths():
+    """
+    @return: the directories nuke would look for gizmos in: NUKE_PATH, then ~/.nuke
+    """
+    paths = [p for p in os.getenv('NUKE_PATH', '').split(os.pathsep) if p]
+    paths.append(os.path.join(os.path.expanduser('~'), '.nuke'))
+    return [p for p in paths if os.path.isdir(p)]
+
+
+def expand_gizmos(lines, library, counts=None, _expanding=()):
+    """
+    rewrites a script so every gizmo found in library becomes an inline Group holding the gizmo's
+    contents, with the instance's own knob values and a name from group_name(). gizmos used
+    inside gizmos are expanded too.
+    @param lines: iterable of script lines
+    @param library: L{GizmoLibrary}
+    @param counts: optional dict, incremented per expanded gizmo class
+    @return: generator of the rewritten lines
+    """
+    for block in iter_blocks(lines):
+        node_class = block.node_class
+
+        if node_class is None or node_class not in library or node_class in _expanding:
+            for line in block.lines:
+                yield line
+            continue
+
+        if counts is not None:
+            counts[node_class] = counts.get(node_class, 0) + 1
+
+        header, body = library.definition(node_class)
+        indent = block.indent
+
+        yield indent + 'Group {'
+        for line in header:
+            yield indent + line
+        for line in rewrite_knobs(block, lambda node_class, knob, value: group_name(value) if knob == 'name' else None)[1:-1]:
+            yield line
+        yield indent + '}'
+
+        for line in expand_gizmos(body, library, counts, _expanding + (node_class,)):
+            yield indent + line
+
+
+# -- node graph --
+
+# classes with no inputs unless the script says otherwise, nuke leaves 'inputs 0' out for them
+ZERO_INPUT_CLASSES = ('Read', 'ReadGeo', 'ReadGeo2', 'DeepRead', 'Constant', 'CheckerBoard2', 'ColorBars',
+                      'ColorWheel', 'Input', 'BackdropNode', 'StickyNote', 'Camera', 'Camera2', 'Axis', 'Axis2',
+                      'Light', 'Light2', 'BakedPointCloud', 'Cube', 'Sphere', 'Cylinder')
+
+# blocks that aren't nodes of the graph and leave the stack alone
+_NON_GRAPH_CLASSES = ('Root',)
+
+
+class ScriptNode(object):
+    """
+    a node of a parsed script: its full name (Group1.Blur1), class, the full names of its
+    inputs (None for a disconnected input) and the L{Block} it was read from
+    """
+
+    __slots__ = ('name', 'node_class', 'inputs', 'block')
+
+    def __init__(self, name, node_class, inputs, block):
+        self.name = name
+        self.node_class = node_class
+        self.inputs = inputs
+        self.block = block
+
+    @property
+    def parent(self):
+        """
+        @return: full name of the group holding the node, '' at the top level
+        """
+        return self.name.rpartition('.')[0]
+
+    def knobs(self):
+        return self.block.knobs()
+
+    def knob(self, name, default=None):
+        return self.block.knob(name, default)
+
+
+def input_count(node_class, inputs_knob):
+    """
+    @param inputs_knob: value of the node's 'inputs' knob ('2', '1+1' with masks), None if not written
+    @return: number of inputs the node takes off the stack
+    """
+    if inputs_knob is None:
+        return 0 if node_class in ZERO_INPUT_CLASSES else 1
+    return sum(int(part) for part in inputs_knob.split('+') if part.strip().isdigit())
+
+
+def iter_nodes(lines):
+    """
+    replays a script's stack commands (push, set, inputs, groups) to connect its nodes, yielding each node
+    as soon as its block is read - only the stack and the names of saved stack entries are kept in memory
+    @param lines: iterable of str, such as an open file
+    @return: generator of L{ScriptNode}
+    """
+    stack = []
+    variables = {}
+    # one (group name, outer stack) per group being read
+    groups = []
+    prefix = ''
+    unnamed = 0
+
+    for block in iter_blocks(lines):
+        first = block.lines[0].strip()
+
+        if block.node_class is None:
+            command = first.split(' ')
+            if command[0] == 'push' and len(command) > 1:
+                target = command[1]
+                stack.append(None if target == '0' else variables.get(target.lstrip('$')))
+            elif command[0] == 'set' and len(command) > 1:
+                variables[command[1]] = stack[-1] if stack else None
+            elif command[0] == 'end_group' and groups:
+                group, stack = groups.pop()
+                prefix = group.rpartition('.')[0]
+                prefix = prefix + '.' if prefix else ''
+                stack.append(group)
+            continue
+
+        node_class = block.node_class
+        if node_class in _NON_GRAPH_CLASSES:
+            continue
+
+        knobs = dict(block.knobs())
+        name = knobs.get('name')
+        if name is None:
+            unnamed += 1
+            name = '{}_{}'.format(node_class, unnamed)
+        name = prefix + name
+
+        count = input_count(node_class, knobs.get('inputs'))
+        inputs = [stack.pop() if stack else None for _ in range(count)]
+
+        yield ScriptNode(name, node_class, inputs, block)
+
+        if opens_group(node_class):
+            # the group's contents follow on a stack of their own, the group is pushed at end_group
+            groups.append((name, stack))
+            stack = []
+            prefix = name + '.'
+        else:
+            stack.append(name)
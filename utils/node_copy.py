@@ -0,0 +1,148 @@
+"""
+node_copy
+
+duplicates nodes by serialising the whole selection once with nuke.nodeCopy, rewriting the
+script text (names, positions) and pasting it back in a single nuke.nodePaste.
+connections between the copied nodes are kept, inputs from outside the selection are left unconnected.
+clones don't always write their name, so they're duplicated one at a time and come out unconnected.
+"""
+
+import os
+import tempfile
+import logging
+
+import nuke
+from utils import nk_script
+
+logger = logging.getLogger(__name__)
+
+
+def duplicate_nodes(nodes, suffix='_duplicate', offset=(-200, 0)):
+    """
+    duplicates the given nodes, including all animation, in one copy/paste operation
+    @param nodes: list of nuke.Node sharing the same group context
+    @param suffix: appended to the original node names, numbered if the name is already taken
+    @param offset: (x, y) DAG offset applied to the duplicates
+    @return: list of new nodes, in the same order as nodes
+    """
+    if not nodes:
+        return []
+
+    taken = set(node.name() for node in nuke.allNodes())
+    new_names = {}
+
+    def rewrite(node_class, knob, value):
+        if knob == 'name':
+            new_name = unique_name(value + suffix, taken)
+            taken.add(new_name)
+            new_names[value] = new_name
+            return new_name
+        if knob == 'xpos':
+            return str(int(float(value)) + offset[0])
+        if knob == 'ypos':
+            return str(int(float(value)) + offset[1])
+        return None
+
+    # a 'clone $C...' block only holds its position, so a clone's copy can't be found by name after the paste
+    clones = [node for node in nodes if node.clones()]
+    others = [node for node in nodes if not node.clones()]
+
+    if others:
+        script = serialise_nodes(others)
+        paste_script('\n'.join(nk_script.rewrite_top_level_knobs(script.split('\n'), rewrite)))
+
+    duplicates = dict((name, nuke.toNode(new_name)) for name, new_name in new_names.items())
+
+    for node in clones:
+        script = serialise_nodes([node])
+        pasted = paste_script('\n'.join(nk_script.rewrite_top_level_knobs(script.split('\n'), rewrite)))[0]
+        if pasted.name() != new_names.get(node.name()):
+            new_name = unique_name(node.name() + suffix, taken)
+            taken.add(new_name)
+            pasted.setName(new_name)
+        duplicates[node.name()] = pasted
+
+    return [duplicates[node.name()] for node in nodes]
+
+
+def paste_copies(script, names):
+    """
+    pastes one copy of a script holding a single top-level node per name in names, in a single paste.
+    the script's header is written once, followed by its stack commands and node block for every copy
+    @param script: .nk text, as returned by serialise_nodes
+    @param names: the names to give the copies - they must not be taken already
+    @return: list of the new nodes, in the same order as names
+    """
+    header, body = nk_script.split_header(script.split('\n'))
+    copies = list(header)
+
+    for name in names:
+        copies.extend(nk_script.rewrite_top_level_knobs(body, lambda node_class, knob, value: name if knob == 'name' else None))
+
+    paste_script('\n'.join(copies))
+
+    return [nuke.toNode(name) for name in names]
+
+
+def serialise_nodes(nodes):
+    """
+    returns the .nk text for the given nodes. the user's selection and clipboard are left untouched
+    @rtype: str
+    """
+    previous = nuke.selectedNodes()
+    _select(nodes, previous)
+
+    handle, tmp_path = tempfile.mkstemp(suffix='.nk')
+    os.close(handle)
+
+    try:
+        nuke.nodeCopy(tmp_path)
+        with open(tmp_path) as f:
+            script = f.read()
+    finally:
+        os.remove(tmp_path)
+        _select(previous, nodes)
+
+    return script
+
+
+def paste_script(script):
+    """
+    pastes .nk text into the current group context with nothing selected, so no
+    pasted node is connected to the existing DAG
+    @return: list of the pasted nodes
+    """
+    _select([], nuke.selectedNodes())
+
+    handle, tmp_path = tempfile.mkstemp(suffix='.nk')
+    with os.fdopen(handle, 'w') as f:
+        f.write(script)
+
+    try:
+        nuke.nodePaste(tmp_path)
+    finally:
+        os.remove(tmp_path)
+
+    return nuke.selectedNodes()
+
+
+def unique_name(name, taken):
+    """
+    returns name, or name followed by the lowest free number, so that it isn't in taken
+    @type taken: set of str
+    """
+    if name not in taken:
+        return name
+
+    idx = 1
+    while '{}{}'.format(name, idx) in taken:
+        idx += 1
+
+    return '{}{}'.format(name, idx)
+
+
+def _select(nodes, deselect):
+    for node in deselect:
+        node['selected'].setValue(False)
+    for node in nodes:
+        node['selected'].setValue(True)
@@ -0,0 +1,111 @@
+"""
+node_defaults
+
+registry of each node class's default tile_color. a class's default is read once per session from a
+temporary node created with undo disabled, instead of creating and deleting a node for every reset.
+the registry can also be kept on disk between sessions, per nuke version, with enable_persistent_cache().
+"""
+
+import json
+import os
+import logging
+
+import nuke
+
+logger = logging.getLogger(__name__)
+
+# {node class: default tile_color}
+_tile_colors = {}
+
+# path of the json file the registry is kept in between sessions, None when it isn't kept
+_cache_path = None
+
+
+def enable_persistent_cache(path=None):
+    """
+    loads the defaults saved by previous sessions and saves new ones as they are found
+    @param path: json file, defaults to $ISOTOPE_NODE_DEFAULTS or ~/.nuke/isotope_node_defaults.json
+    """
+    global _cache_path
+
+    _cache_path = path or os.getenv('ISOTOPE_NODE_DEFAULTS') or \
+        os.path.join(os.path.expanduser('~'), '.nuke', 'isotope_node_defaults.json')
+
+    for node_class, value in _read_cache().get(nuke.NUKE_VERSION_STRING, {}).items():
+        _tile_colors.setdefault(node_class, value)
+
+
+def default_tile_color(node_class):
+    """
+    @return: the tile_color a new node of node_class gets
+    @rtype: int
+    """
+    if node_class not in _tile_colors:
+        _tile_colors[node_class] = _read_default_tile_color(node_class)
+        if _cache_path is not None:
+            _write_cache()
+
+    return _tile_colors[node_class]
+
+
+def reset_tile_colors(nodes):
+    """
+    sets every node's tile_color back to its class default, as a single undo step
+    """
+    colors = default_tile_colors(nodes)
+
+    undo = nuke.Undo()
+    undo.begin('Reset node colours')
+    try:
+        for node, color in colors:
+            node['tile_color'].setValue(color)
+    finally:
+        undo.end()
+
+
+def default_tile_colors(nodes):
+    """
+    @return: each node with the default tile_color of its class
+    @rtype: list of (L{nuke.Node}, int)
+    """
+    return [(node, default_tile_color(node.Class())) for node in nodes]
+
+
+def clear():
+    """
+    forgets every default read so far, ie. after changing knob defaults
+    """
+    _tile_colors.clear()
+
+
+def _read_default_tile_color(node_class):
+    # nuke.nodes doesn't connect or place the node the way createNode does, and with undo
+    # disabled the temporary node never shows up in the undo history
+    nuke.Undo.disable()
+    try:
+        tmp_node = getattr(nuke.nodes, node_class)()
+        try:
+            return int(tmp_node['tile_color'].value())
+        finally:
+            nuke.delete(tmp_node)
+    finally:
+        nuke.Undo.enable()
+
+
+def _read_cache():
+    try:
+        with open(_cache_path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_cache():
+    cache = _read_cache()
+    cache[nuke.NUKE_VERSION_STRING] = _tile_colors
+
+    try:
+        with open(_cache_path, 'w') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    except (IOError, OSError) as e:
+        logger.warning('Could not save node defaults to {}: {}'.format(_cache_path, e))
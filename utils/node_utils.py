@@ -12,17 +12,23 @@ a collection of utilities and functions related to operations on Nuke Node class
 import nuke
 import logging
 
+from utils import layout
+
 logger = logging.getLogger(__name__)
 
 
-def which_input(inputNode, outputNode):
+def which_input(inputNode, outputNode, index=None):
     """
     given two nodes, it will return the index of outputNode.inputs()
     to which the inputNode is connected
     @param inputNode: the node for which outputNode is a dependent
     @param outputNode: the node for which inputNode is immediately upstream
+    @param index: optional L{DagIndex} to look the connection up in, instead of scanning outputNode's inputs
     @return: None
     """
+    if index is not None:
+        return index.which_input(inputNode, outputNode)
+
     numInputs = outputNode.inputs()
     idx = 0
     while idx < numInputs:
@@ -31,8 +37,98 @@ def which_input(inputNode, outputNode):
         if outputNode.input(idx) is not None:
             if outputNode.input(idx).name() == inputNode.name():
                 return idx
-        else:
-            idx += 1
+        idx += 1
+
+
+class DagIndex(object):
+    """
+    index of every connection in the DAG, built in one pass over the nodes.
+    maps each node to the (downstream node, input index) edges leaving it, and to its inputs,
+    so rewiring doesn't need dependent() or a scan of every input per lookup
+    """
+
+    def __init__(self, nodes=None):
+        """
+        @param nodes: the nodes to index, defaults to nuke.allNodes() in the current context
+        """
+        if nodes is None:
+            nodes = nuke.allNodes()
+
+        self._downstream = {}
+        self._inputs = {}
+
+        for node in nodes:
+            inputs = [node.input(idx) for idx in range(node.inputs())]
+            self._inputs[node.fullName()] = inputs
+
+            for idx, upstream in enumerate(inputs):
+                if upstream is not None:
+                    self._downstream.setdefault(upstream.fullName(), []).append((node, idx))
+
+    def downstream(self, node):
+        """
+        @return: the (downstream node, input index) edges fed by node
+        @rtype: list of (L{nuke.Node}, int)
+        """
+        return list(self._downstream.get(node.fullName(), []))
+
+    def upstream(self, node, idx=0):
+        """
+        @return: the node connected to node's input idx, or None
+        """
+        inputs = self._inputs.get(node.fullName())
+        if inputs is None:
+            return node.input(idx)
+        if idx < len(inputs):
+            return inputs[idx]
+        return None
+
+    def which_input(self, inputNode, outputNode):
+        for node, idx in self._downstream.get(inputNode.fullName(), []):
+            if node.fullName() == outputNode.fullName():
+                return idx
+        return None
+
+    def connect(self, node, idx, upstream):
+        """
+        sets node's input idx to upstream (which may be None), and updates the index to match
+        """
+        name = node.fullName()
+        inputs = self._inputs.setdefault(name, [])
+        previous = inputs[idx] if idx < len(inputs) else None
+
+        node.setInput(idx, upstream)
+
+        if previous is not None:
+            edges = self._downstream.get(previous.fullName(), [])
+            edges[:] = [edge for edge in edges if not (edge[0].fullName() == name and edge[1] == idx)]
+
+        inputs.extend([None] * (idx + 1 - len(inputs)))
+        inputs[idx] = upstream
+        if upstream is not None:
+            self._downstream.setdefault(upstream.fullName(), []).append((node, idx))
+
+    def replace(self, old, new):
+        """
+        connects everything fed by old to new instead, and updates the index to match
+        """
+        edges = self._downstream.pop(old.fullName(), [])
+
+        for node, idx in edges:
+            node.setInput(idx, new)
+            self._inputs[node.fullName()][idx] = new
+
+        self._downstream.setdefault(new.fullName(), []).extend(edges)
+
+    def remove(self, node):
+        """
+        forgets node, which is about to be deleted
+        """
+        self._downstream.pop(node.fullName(), None)
+        for upstream in self._inputs.pop(node.fullName(), []):
+            if upstream is not None:
+                edges = self._downstream.get(upstream.fullName(), [])
+                edges[:] = [edge for edge in edges if edge[0].fullName() != node.fullName()]
 
 
 def is_nuke_node(text):
@@ -100,6 +196,64 @@ def layout_nodes(node_list, origin, label=None):
     # add the label
 
 
+def apply_layout(nodes, origin=None, backdrops=False, label=None, clusters=None, spacing=(110, 80), max_width=None):
+    """
+    lays nodes out with the layered layout in utils.layout - inputs above, crossings kept down, each
+    connected cluster (or each group in clusters) laid out separately - and writes every position in one undo step
+    @param nodes: nodes to lay out, only connections between them are considered
+    @param origin: top left of the layout, the top left of the nodes' current positions when None
+    @param backdrops: put a backdrop around each cluster
+    @param label: backdrop label
+    @param clusters: optional {node name: cluster key}
+    @param max_width: wrap clusters onto a new row past this width
+    @return: the backdrops created
+    """
+    nodes = [node for node in nodes if node.Class() != 'BackdropNode']
+    if not nodes:
+        return []
+
+    if origin is None:
+        origin = (min(node.xpos() for node in nodes), min(node.ypos() for node in nodes))
+
+    by_name = dict((node.fullName(), node) for node in nodes)
+    edges = []
+    for node in nodes:
+        for idx in range(node.inputs()):
+            upstream = node.input(idx)
+            if upstream is not None and upstream.fullName() in by_name:
+                edges.append((upstream.fullName(), node.fullName()))
+
+    positions, laid_out = layout.layered_layout(by_name, edges, spacing=spacing, origin=origin,
+                                                clusters=clusters, max_width=max_width)
+
+    created = []
+    undo = nuke.Undo()
+    undo.begin('Layout nodes')
+    try:
+        for name, (x, y) in positions.items():
+            by_name[name].setXYpos(x, y)
+
+        if backdrops:
+            left, top, right, bottom = (-10, -80, 10, 10)
+            for cluster in laid_out:
+                bdX, bdY, bdR, bdB = cluster.bounds
+                bdR += max(by_name[name].screenWidth() for name in cluster.nodes)
+                bdB += max(by_name[name].screenHeight() for name in cluster.nodes)
+                bd = nuke.nodes.BackdropNode(xpos=bdX + left,
+                                             bdwidth=bdR - bdX + right - left,
+                                             ypos=bdY + top,
+                                             bdheight=bdB - bdY + bottom - top,
+                                             note_font_size=42
+                                             )
+                if label is not None:
+                    bd.knob('label').setValue(label)
+                created.append(bd)
+    finally:
+        undo.end()
+
+    return created
+
+
 def has_knob(node, knob_name):
     """Utility function that will return whether a given nuke node
     has a knob that has the given name.
@@ -6,6 +6,7 @@ path-based utilities created by Romain Maurer
 
 
 import datetime
+import fnmatch
 import glob
 import os
 import re
@@ -13,7 +14,6 @@ import shutil
 import uuid
 import logging
 from operator import attrgetter
-from os import stat
 from pwd import getpwuid
 
 
@@ -149,6 +149,104 @@ def find_all_versions(filepath):
     return path_by_version
 
 
+class VersionIndex(object):
+    """Resolves versions for many file paths at once. Every folder is listed at most once
+    for the lifetime of the index, however many paths are looked up in it, so resolving the
+    latest version of hundreds of paths costs one listing per folder instead of a glob per path.
+
+    Paths may be sequences with a frame pattern (%04d, ####, ...), the latest path returned
+    keeps the frame pattern of the path given.
+    """
+
+    def __init__(self):
+        self._listings = {}
+
+    def listdir(self, folder):
+        """
+        @return: the names in folder, or an empty list if it can't be listed
+        @rtype: list of str
+        """
+        listing = self._listings.get(folder)
+        if listing is None:
+            try:
+                listing = os.listdir(folder or os.curdir)
+            except OSError:
+                listing = []
+            self._listings[folder] = listing
+        return listing
+
+    def glob(self, pattern):
+        """Same matches as glob.glob, from the cached listings.
+        @rtype: list of str
+        """
+        folder, name = os.path.split(pattern)
+        if not glob.has_magic(pattern):
+            return [pattern] if name in self.listdir(folder) else []
+
+        folders = self.glob(folder) if glob.has_magic(folder) else [folder]
+
+        results = []
+        for f in folders:
+            names = self.listdir(f)
+            if not name.startswith('.'):
+                names = [n for n in names if not n.startswith('.')]
+            results.extend(os.path.join(f, n) for n in fnmatch.filter(names, name))
+        return results
+
+    def find_all_versions(self, filepath):
+        """Like L{find_all_versions}, from the cached listings.
+        @rtype: dict of {Version: str}
+        """
+        seq = Sequence(filepath)
+        search_pattern = re_version_take_user.sub('_v*', seq.pattern('*') if seq.is_valid() else filepath)
+
+        path_by_version = {}
+        for r in self.glob(search_pattern):
+            if seq.is_valid():
+                # map the frame back to the original frame pattern
+                found = Sequence(r)
+                if not found.is_valid():
+                    continue
+                r = found.pattern(seq.frame_pattern())
+            path_by_version[extract_version(r)] = r
+
+        return path_by_version
+
+    def find_latest(self, filepath):
+        """Like L{find_latest}, from the cached listings.
+        @rtype: str
+        """
+        path_by_version = self.find_all_versions(filepath)
+        if not path_by_version:
+            return None
+
+        # sort by version and then by take
+        latest = max(path_by_version, key=lambda v: (v.version or 0, v.take or 0))
+        return path_by_version[latest]
+
+    def frame_range(self, filepath):
+        """
+        @return: (first, last) frame on disk of a sequence path, or (None, None)
+        """
+        seq = Sequence(filepath)
+        if not seq.is_valid():
+            return None, None
+
+        prefix = seq.basename() + '.'
+        extension = seq.extension()
+
+        frames = []
+        for name in self.listdir(os.path.dirname(filepath)):
+            if name.startswith(prefix) and name.endswith(extension):
+                frame = name[len(prefix):len(name) - len(extension)]
+                if frame.isdigit():
+                    frames.append(int(frame, 10))
+
+        if not frames:
+            return None, None
+        return min(frames), max(frames)
+
+
 def next_available_take(filepath):
     """This function finds the next available take number based on existing file paths.
     Different user initials will not be considered. Only take matters.
@@ -785,7 +883,7 @@ class File(PathInterface):
         return remove_extension(os.path.basename(self._path))
 
     def owner(self):
-        id_ = stat(self._path).st_uid
+        id_ = os.stat(self._path).st_uid
         try:
             return getpwuid(id_).pw_name
         except KeyError:
@@ -0,0 +1,209 @@
+"""
+registry
+
+registers Isotope's menu commands and panels by name without importing the tools behind them. a tool's
+module is imported the first time one of its commands runs or its panel opens, so loading the menus only
+costs the registry itself. tools registered with gui=True (anything importing Qt) are left out entirely
+when nuke has no GUI, ie. in terminal and render sessions.
+
+imports are timed while the menus are installed and on each tool's first use. import_report() formats the
+timings like python's -X importtime, which nuke's own python can't be started with. with ISOTOPE_IMPORTTIME set
+in the environment, the report is logged once the menus are installed and again after each tool's first load.
+"""
+
+import functools
+import logging
+import os
+import sys
+import time
+
+import nuke
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+logger = logging.getLogger(__name__)
+
+# {name: (menu path, module, function, shortcut, gui)}, in registration order
+_commands = {}
+_command_order = []
+
+# (panel id, title, module, widget class)
+_panels = []
+
+# (what was timed, ImportTimer): installing the menus, then each module on its first load
+_timings = []
+
+
+class ImportTimer(object):
+    """
+    context manager timing every module imported while it's active. each import is recorded with its
+    own time, excluding the imports it triggered, and its cumulative time, nested imports first
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._stack = []
+        self._original = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    def total(self):
+        """
+        @return: seconds spent in the top level imports
+        """
+        return sum(cumulative for name, own, cumulative, depth in self.entries if depth == 0)
+
+    def _import(self, name, *args, **kwargs):
+        # args are passed on untouched: level defaults to -1 on python 2 and 0 on python 3
+        globals = args[0] if args else kwargs.get('globals')
+        fromlist = args[2] if len(args) > 2 else kwargs.get('fromlist')
+        level = args[3] if len(args) > 3 else kwargs.get('level', 0)
+
+        # 'from utils import path' imports utils.path, not just utils
+        module = _absolute(name, globals, level)
+        candidates = [module] + ['{}.{}'.format(module, item) for item in fromlist or () if item != '*']
+        candidates = [candidate for candidate in candidates if candidate not in sys.modules]
+        if not candidates and level <= 0:
+            return self._original(name, *args, **kwargs)
+
+        loaded = len(sys.modules)
+        self._stack.append(0.0)
+        start = time.time()
+        try:
+            return self._original(name, *args, **kwargs)
+        finally:
+            cumulative = time.time() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            if len(sys.modules) > loaded:
+                imported = [candidate for candidate in candidates if sys.modules.get(candidate) is not None]
+                self.entries.append((', '.join(imported) or module, cumulative - children, cumulative,
+                                     len(self._stack)))
+
+
+def register_command(menu_path, module, function, shortcut=None, gui=False):
+    """
+    registers a menu command. nothing is imported until it runs
+    @param menu_path: top level nuke menu then the command's path, eg. 'Nuke/Isotope/Preflight'
+    @param module: module of the tool, eg. 'tools.preflight'
+    @param function: name of the function called without arguments, or a callable given the module
+    @param gui: the module needs the GUI (Qt), the command isn't added without one
+    """
+    name = menu_path.split('/', 1)[-1]
+    if name not in _commands:
+        _command_order.append(name)
+    _commands[name] = (menu_path, module, function, shortcut, gui)
+
+
+def register_panel(panel_id, title, module, widget):
+    """
+    registers a dockable panel. the module is imported when the panel is first opened
+    @param widget: name of the QWidget class in module
+    """
+    _panels.append((panel_id, title, module, widget))
+
+
+def install():
+    """
+    adds every registered command and panel to nuke's menus, leaving out the GUI-only ones without a GUI
+    """
+    with ImportTimer() as timer:
+        _install(nuke.GUI)
+    _timings.insert(0, ('menus', timer))
+
+    if os.getenv('ISOTOPE_IMPORTTIME'):
+        logger.info(import_report())
+
+
+def _install(gui):
+    for name in _command_order:
+        menu_path, module, function, shortcut, gui_only = _commands[name]
+        if gui_only and not gui:
+            continue
+        menu, _, path = menu_path.partition('/')
+        nuke.menu(menu).addCommand(path, functools.partial(run, name), shortcut)
+
+    if gui and _panels:
+        from nukescripts import panels
+        for panel_id, title, module, widget in _panels:
+            # the widget expression is only evaluated once the panel is opened
+            panels.registerWidgetAsPanel('__import__("utils.registry").registry.load({!r}).{}'.format(module, widget),
+                                         title, panel_id)
+
+
+def run(name):
+    """
+    runs a registered command, importing its module on first use
+    @return: whatever the command returns
+    """
+    menu_path, module, function, shortcut, gui_only = _commands[name]
+    if gui_only and not nuke.GUI:
+        logger.warning('{} needs the nuke GUI'.format(name))
+        return None
+
+    loaded = load(module)
+    if callable(function):
+        return function(loaded)
+    return getattr(loaded, function)()
+
+
+def load(module):
+    """
+    imports module, timing the import when it's the first one
+    @return: the module
+    """
+    if module in sys.modules:
+        return sys.modules[module]
+
+    # __import__ rather than importlib, so the timer sees the module itself as well as what it imports
+    with ImportTimer() as timer:
+        __import__(module)
+    loaded = sys.modules[module]
+    _timings.append((module, timer))
+
+    if os.getenv('ISOTOPE_IMPORTTIME'):
+        logger.info(format_timings(module, timer))
+    return loaded
+
+
+def import_report():
+    """
+    @return: the timings of the startup and of every tool loaded so far, -X importtime style
+    """
+    return '\n'.join(format_timings(label, timer) for label, timer in _timings)
+
+
+def format_timings(label, timer):
+    lines = ['{}: {:.1f} ms'.format(label, timer.total() * 1000.0),
+             'import time: self [us] | cumulative | imported package']
+    for name, own, cumulative, depth in timer.entries:
+        lines.append('import time: {:>9} | {:>10} | {}{}'.format(
+            int(own * 1e6), int(cumulative * 1e6), '  ' * depth, name))
+    return '\n'.join(lines)
+
+
+def commands():
+    """
+    @return: the registered command names, in registration order
+    """
+    return list(_command_order)
+
+
+def _absolute(name, globals, level):
+    # the module name a relative import resolves to
+    if level <= 0 or not globals:
+        return name
+    package = globals.get('__package__') or globals.get('__name__', '').rpartition('.')[0]
+    for _ in range(level - 1):
+        package = package.rpartition('.')[0]
+    return '{}.{}'.format(package, name) if name else package